@@ -0,0 +1,141 @@
+"""
+Analytics snapshot shared by the dashboard and the analytics JSON APIs
+
+Everything the dashboard shows is derived from two queries: one pass over
+the student_summary table (see summary.py), rolled up in Python, and the
+top-10 list. The result is cached per process for ANALYTICS_CACHE_TTL
+seconds, and dropped as soon as the shared data version changes.
+"""
+
+import time
+import threading
+
+from summary import GRADE_BUCKETS, PERFORMANCE_BUCKETS, COUNTER_KEYS
+
+# Roll the per-class summary rows up to branch x semester
+GROUPED_QUERY = f'''
+    SELECT branch, semester,
+           SUM(student_count) AS count,
+           SUM(sum_percentage) AS sum_perc,
+           MIN(min_percentage) AS min_perc,
+           MAX(max_percentage) AS max_perc,
+           {', '.join(f'SUM({key}) AS {key}' for key in COUNTER_KEYS)}
+    FROM student_summary
+    GROUP BY branch, semester
+'''
+
+TOP_PERFORMERS_QUERY = '''
+    SELECT name, roll_no, percentage, grade
+    FROM students
+    ORDER BY percentage DESC
+    LIMIT 10
+'''
+
+
+def compute_snapshot(connection):
+    """Run the analytics queries and roll the groups up into every dashboard figure"""
+    cursor = connection.cursor(dictionary=True)
+    cursor.execute(GROUPED_QUERY)
+    groups = cursor.fetchall()
+    cursor.execute(TOP_PERFORMERS_QUERY)
+    top_performers = cursor.fetchall()
+    cursor.close()
+
+    return build_snapshot(groups, top_performers)
+
+
+def build_snapshot(groups, top_performers):
+    """Combine (branch, semester) group rows into the snapshot dict"""
+    total = 0
+    total_perc = 0.0
+    lowest = highest = None
+    counters = dict.fromkeys(COUNTER_KEYS, 0)
+    branches = {}
+    semesters = {}
+
+    for group in groups:
+        count = int(group['count'])
+        sum_perc = float(group['sum_perc'] or 0)
+        total += count
+        total_perc += sum_perc
+        for key in COUNTER_KEYS:
+            counters[key] += int(group[key] or 0)
+        if group['min_perc'] is not None:
+            lowest = float(group['min_perc']) if lowest is None else min(lowest, float(group['min_perc']))
+            highest = float(group['max_perc']) if highest is None else max(highest, float(group['max_perc']))
+
+        for index, name in ((branches, group['branch']), (semesters, group['semester'])):
+            entry = index.setdefault(name, [0, 0.0])
+            entry[0] += count
+            entry[1] += sum_perc
+
+    average = total_perc / total if total else None
+
+    return {
+        'total_students': total,
+        'passed_students': counters['passed'],
+        'failed_students': total - counters['passed'],
+        'avg_percentage': round(average, 2) if average is not None else 0,
+        'branch_stats': [
+            {'branch': name, 'count': count, 'avg_perc': sum_perc / count}
+            for name, (count, sum_perc) in branches.items()
+        ],
+        'semester_stats': [
+            {'semester': name, 'count': count, 'avg_perc': sum_perc / count}
+            for name, (count, sum_perc) in sorted(semesters.items())
+        ],
+        'top_performers': top_performers,
+        'grade_distribution': dict({key: counters[key] for key, _, _ in GRADE_BUCKETS}, total=total),
+        'performance_metrics': dict({key: counters[key] for key, _, _ in PERFORMANCE_BUCKETS},
+                                    total=total, average_percentage=average),
+        'at_risk_count': counters['at_risk'],
+        'star_count': counters['star'],
+        'performance_stats': {
+            'overall_avg': average,
+            'lowest_score': lowest,
+            'highest_score': highest,
+        },
+    }
+
+
+class AnalyticsCache:
+    """Per-process snapshot cache keyed on the shared data version"""
+
+    def __init__(self, data_version, ttl=60):
+        self.data_version = data_version
+        self.ttl = ttl
+        self._snapshot = None
+        self._version = None
+        self._expires = 0
+        self._lock = threading.Lock()
+
+    def get(self, connect):
+        """Return a fresh-enough snapshot; `connect()` supplies a DB connection on a miss.
+
+        Returns None if the snapshot had to be rebuilt and no connection was available.
+        """
+        version = self.data_version.current()
+        if self._is_fresh(version):
+            return self._snapshot
+
+        # One rebuild at a time; other requests wait for it instead of piling on the DB
+        with self._lock:
+            if self._is_fresh(version):
+                return self._snapshot
+            connection = connect()
+            if not connection:
+                return None
+            try:
+                snapshot = compute_snapshot(connection)
+            finally:
+                connection.close()
+            self._snapshot, self._version = snapshot, version
+            self._expires = time.monotonic() + self.ttl
+            return snapshot
+
+    def invalidate(self):
+        self._snapshot = None
+
+    def _is_fresh(self, version):
+        return (self._snapshot is not None and self._version == version
+                and time.monotonic() < self._expires)
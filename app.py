@@ -1,29 +1,82 @@
-from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify, send_file
+from flask import Flask, Request, current_app, render_template, request, redirect, url_for, session, flash, jsonify, send_file, g, has_app_context, Response, stream_with_context
+import click
 import mysql.connector
-from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.security import check_password_hash
 from werkzeug.utils import secure_filename
-import os
+import hmac
 import datetime
-from reportlab.lib.pagesizes import A4
-from reportlab.pdfgen import canvas
-from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib import colors
-from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
+import json
 import io
 import base64
+import shutil
+from contextlib import contextmanager
 from PIL import Image as PILImage
-import pandas as pd
 from config import Config
+from db_pool import get_pool, PoolTimeout
+from render_jobs import RenderQueue
+from jobs import JobQueue, throughput
+from job_tasks import TASKS
+from qr_codes import QRCache
+from assets import ASSET_FILES, AssetRegistry
+from fragment_cache import FragmentCache
+from marksheet_signing import sign_marksheet, verify_token, InvalidToken, SigningKeyMissing
+from pdf_cache import PDFCache, marksheet_fingerprint
+from import_staging import ImportStaging
+from excel_import import STREAM_FORMATS
+from grading import SCHEME, calculate_grade, regrade
+from moderation import parse_rule, plan_moderation, moderation_diff, apply_moderation, ModerationFailed
+from data_export import EXPORT_FILTERS, EXPORT_FORMATS, EXPORT_TABLES, stream_csv, stream_ndjson, stream_xlsx
+from data_version import DataVersion
+from analytics import AnalyticsCache
+from summary import AT_RISK_BELOW, STAR_FROM, GRADE_LEGEND, PERFORMANCE_LEGEND, record_students, rebuild_summary
+from bulk_verify import parse_bulk_request, iter_verifications
+from verify_cache import VerifyCache, verification_payload
+from pagination import Keyset, CursorCodec, CursorError, fetch_page
+from records import LISTING, PERFORMER, HISTORY
+from search import search_students, suggest_students
+from migrations import migrate, drop_schema, seed_default_users, check_query_plans, SchemaOutdated, is_missing_table
+from batch_pdf import BATCH_FILTERS, fetch_class_rows, stream_class_zip
+
+class MarksheetRequest(Request):
+    @property
+    def max_content_length(self):
+        # Streaming imports are read in chunks, so they get their own (larger) limit
+        if self.endpoint == 'import_stream':
+            return current_app.config['STREAM_IMPORT_MAX_CONTENT_LENGTH']
+        return super().max_content_length
 
 app = Flask(__name__)
+app.request_class = MarksheetRequest
 try:
     app.config.from_object(Config)
 except Exception as e:
     print(f"Config error: {e}")
     app.config['SECRET_KEY'] = 'fallback-secret-key'
 
+render_queue = RenderQueue(app.config['PDF_JOBS_FOLDER'],
+                           max_workers=app.config['PDF_RENDER_WORKERS'],
+                           job_ttl=app.config['PDF_JOB_TTL'])
+job_queue = JobQueue(app.config['JOBS_DB_PATH'], app.config['JOBS_FOLDER'], TASKS, app.config,
+                     max_workers=app.config['JOB_WORKERS'], job_ttl=app.config['JOB_TTL'])
+pdf_cache = PDFCache(app.config['PDF_CACHE_FOLDER'], app.config['PDF_CACHE_MAX_BYTES'])
+qr_cache = QRCache(app.config['QR_CACHE_FOLDER'])
+asset_registry = AssetRegistry(app.config['UPLOAD_FOLDER'], app.config['ASSET_VERSION_FILE'])
+fragment_cache = FragmentCache(app.config['FRAGMENT_CACHE_SIZE'])
+import_staging = ImportStaging(app.config['IMPORT_STAGING_FOLDER'], app.config['IMPORT_STAGING_TTL'])
+data_version = DataVersion(app.config['DATA_VERSION_FILE'])
+analytics_cache = AnalyticsCache(data_version, app.config['ANALYTICS_CACHE_TTL'])
+cursor_codec = CursorCodec(app.config['SECRET_KEY'])
+if not app.config['MARKSHEET_SIGNING_KEY']:
+    print("Warning: MARKSHEET_SIGNING_KEY is not set; marksheets are printed without a QR code "
+          "and QR codes cannot be verified")
+verify_cache = VerifyCache(data_version, app.config['VERIFY_CACHE_SIZE'],
+                           shared_path=app.config['VERIFY_CACHE_SHARED_PATH'] or None)
+
+# Listing orders; each has a matching index (see migrations.py)
+HISTORY_KEYSET = Keyset('history', [('date_created', 'DESC'), ('id', 'DESC')])
+AT_RISK_KEYSET = Keyset('at_risk', [('percentage', 'ASC'), ('id', 'ASC')])
+STAR_KEYSET = Keyset('star', [('percentage', 'DESC'), ('id', 'DESC')])
+
 # Health check route
 @app.route('/health')
 def health():
@@ -31,21 +84,106 @@ def health():
 
 # Database connection
 def get_db_connection():
+    """Borrow a pooled connection; close() returns it to the pool"""
     try:
-        connection = mysql.connector.connect(
-            host=app.config['MYSQL_HOST'],
-            user=app.config['MYSQL_USER'],
-            password=app.config['MYSQL_PASSWORD'],
-            database=app.config['MYSQL_DATABASE']
-        )
-        return connection
-    except mysql.connector.Error as err:
+        connection = get_pool(app.config).connect()
+    except (mysql.connector.Error, PoolTimeout) as err:
         print(f"Error: {err}")
         return None
 
+    # Remember the connection so it is returned even if the view forgets to
+    if has_app_context():
+        g.setdefault('db_connections', []).append(connection)
+    return connection
+
+@contextmanager
+def db_connection():
+    """Borrow a pooled connection for a `with` block (None if unavailable)"""
+    connection = get_db_connection()
+    try:
+        yield connection
+    finally:
+        if connection:
+            connection.close()
+
+def analytics_snapshot():
+    """The cached analytics snapshot (None without a DB connection)"""
+    try:
+        return analytics_cache.get(get_db_connection)
+    except mysql.connector.ProgrammingError as err:
+        # student_summary arrived in a later migration than the rest of the schema
+        if is_missing_table(err):
+            raise SchemaOutdated() from err
+        raise
+
+@app.errorhandler(SchemaOutdated)
+def schema_outdated(err):
+    if request.path.startswith('/api/'):
+        return jsonify({'success': False, 'message': str(err)}), 503
+    flash(str(err), 'error')
+    return redirect(url_for('index'))
+
+@app.errorhandler(SigningKeyMissing)
+def signing_key_missing(err):
+    return jsonify({'success': False, 'message': str(err)}), 503
+
+def marksheets_changed():
+    """Call after any write to students/subjects so cached data is rebuilt in every worker"""
+    data_version.bump()
+
+def marksheet_qr_url(student, subjects):
+    """Content of a marksheet's QR code: the stateless verification URL for its signed token.
+
+    None without a MARKSHEET_SIGNING_KEY: the PDF is then printed without a QR code.
+    """
+    if not app.config['MARKSHEET_SIGNING_KEY']:
+        return None
+    token = sign_marksheet(student, subjects, app.config['MARKSHEET_SIGNING_KEY'])
+    base_url = app.config['VERIFY_BASE_URL'] or request.host_url
+    return base_url.rstrip('/') + url_for('verify_signed', token=token)
+
+def asset_url(name):
+    """Versioned URL of an uploaded signature/seal image, or None if there isn't one"""
+    asset = asset_registry.get(name)
+    return url_for('serve_asset', name=name, v=asset.etag) if asset else None
+
+def marksheet_fragment(student, subjects):
+    """Rendered marksheet body for the result, print and verify pages (cached per record version)"""
+    return fragment_cache.get(student, subjects,
+                              lambda rows: render_template('marksheet_body.html', student=student, subjects=rows))
+
+@app.teardown_appcontext
+def return_db_connections(exc):
+    for connection in g.pop('db_connections', []):
+        connection.close()
+
+def listing_page_size():
+    """?limit= for listing endpoints, capped at LISTING_MAX_PAGE_SIZE"""
+    limit = request.args.get('limit', app.config['LISTING_PAGE_SIZE'], type=int)
+    return min(max(limit, 1), app.config['LISTING_MAX_PAGE_SIZE'])
+
+def listing_response(keyset, projection, where):
+    """JSON page of students for a keyset-paginated listing (?after=<cursor>&limit=N)"""
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'success': False, 'message': 'Database connection failed'})
+    
+    # Projected dicts: the JSON encoder handles them faster than records
+    cursor = connection.cursor(dictionary=True)
+    try:
+        students, next_cursor = fetch_page(cursor, cursor_codec, keyset, projection.select(), where, [],
+                                           request.args.get('after'), listing_page_size())
+    except CursorError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    finally:
+        cursor.close()
+        connection.close()
+    
+    return jsonify({'success': True, 'students': students, 'next_cursor': next_cursor})
+
 # Initialize database
 def init_db():
-    """Initialize database with correct table structure matching init_db.py"""
+    """Reset the database: drop every table, re-run all migrations and create the default users"""
     try:
         connection = get_db_connection()
         if not connection:
@@ -56,81 +194,22 @@ def init_db():
         
         # Drop all existing tables to ensure clean state
         print("Dropping existing tables...")
-        cursor.execute('SET FOREIGN_KEY_CHECKS = 0')
-        cursor.execute('DROP TABLE IF EXISTS subjects')
-        cursor.execute('DROP TABLE IF EXISTS students')
-        cursor.execute('DROP TABLE IF EXISTS users')
-        cursor.execute('SET FOREIGN_KEY_CHECKS = 1')
+        drop_schema(cursor)
         print("Old tables dropped")
         
-        # Create students table - EXACT structure from init_db.py
-        print("Creating students table...")
-        cursor.execute('''
-            CREATE TABLE students (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                name VARCHAR(255) NOT NULL,
-                roll_no VARCHAR(50) UNIQUE NOT NULL,
-                branch VARCHAR(100) NOT NULL,
-                semester VARCHAR(20) NOT NULL,
-                exam_type VARCHAR(50) NOT NULL,
-                total_marks INT NOT NULL,
-                max_marks INT NOT NULL,
-                percentage DECIMAL(5,2) NOT NULL,
-                grade VARCHAR(10) NOT NULL,
-                remarks TEXT,
-                date_created TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                class_teacher VARCHAR(255),
-                principal VARCHAR(255)
-            )
-        ''')
-        print("Students table created")
-        
-        # Create subjects table - EXACT structure from init_db.py
-        print("Creating subjects table...")
-        cursor.execute('''
-            CREATE TABLE subjects (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                student_id INT,
-                subject_name VARCHAR(255) NOT NULL,
-                marks INT NOT NULL,
-                max_marks INT NOT NULL,
-                grade VARCHAR(10),
-                FOREIGN KEY (student_id) REFERENCES students(id) ON DELETE CASCADE
-            )
-        ''')
-        print("Subjects table created")
-        
-        # Create users table - EXACT structure from init_db.py
-        print("Creating users table...")
-        cursor.execute('''
-            CREATE TABLE users (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                username VARCHAR(100) UNIQUE NOT NULL,
-                password_hash VARCHAR(255) NOT NULL,
-                role VARCHAR(20) NOT NULL DEFAULT 'teacher',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        print("Users table created")
+        # Create every table and index from the migration list
+        print("Applying migrations...")
+        migrate(connection)
+        print("Tables created")
         
-        # Create default users - EXACT same as init_db.py
         print("Creating default users...")
-        admin_password = generate_password_hash('admin123')
-        teacher_password = generate_password_hash('teacher123')
-        
-        cursor.execute(
-            "INSERT INTO users (username, password_hash, role) VALUES (%s, %s, %s)",
-            ('admin', admin_password, 'admin')
-        )
-        cursor.execute(
-            "INSERT INTO users (username, password_hash, role) VALUES (%s, %s, %s)",
-            ('teacher', teacher_password, 'teacher')
-        )
+        seed_default_users(cursor)
         print("Default users created")
         
         connection.commit()
         cursor.close()
         connection.close()
+        marksheets_changed()
         print("Database initialized successfully!")
         return True
         
@@ -144,29 +223,13 @@ def init_db():
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
 
-def calculate_grade(percentage):
-    if percentage >= 90:
-        return 'A+', 'Outstanding Performance'
-    elif percentage >= 80:
-        return 'A', 'Excellent Performance'
-    elif percentage >= 70:
-        return 'B+', 'Very Good Performance'
-    elif percentage >= 60:
-        return 'B', 'Good Performance'
-    elif percentage >= 50:
-        return 'C', 'Satisfactory Performance'
-    elif percentage >= 40:
-        return 'D', 'Needs Improvement'
-    else:
-        return 'F', 'Failed - Requires Re-examination'
-
 # Routes
 @app.route('/')
 def index():
     try:
         if 'user_id' not in session:
             return redirect(url_for('login'))
-        return render_template('index.html')
+        return render_template('index.html', grade_scale=SCHEME.scale)
     except Exception as e:
         return f"Error: {str(e)}", 500
 
@@ -234,23 +297,23 @@ def generate_marksheet():
                 marks = int(marks_list[i])
                 max_marks = int(max_marks_list[i])
                 
-                # Calculate grade for individual subject
-                subject_percentage = (marks / max_marks) * 100
-                subject_grade, _ = calculate_grade(subject_percentage)
-                
                 subjects_data.append({
                     'name': subject,
                     'marks': marks,
-                    'max_marks': max_marks,
-                    'grade': subject_grade
+                    'max_marks': max_marks
                 })
                 
                 total_marks += marks
                 total_max_marks += max_marks
         
-        # Calculate overall percentage and grade
+        # Grade every subject in one lookup
+        subject_grades = SCHEME.grade_array([subject['marks'] / subject['max_marks'] * 100 for subject in subjects_data])
+        for subject, subject_grade in zip(subjects_data, subject_grades):
+            subject['grade'] = subject_grade
+        
+        # Calculate overall percentage and grade (graded as stored, to two decimals)
         percentage = (total_marks / total_max_marks) * 100 if total_max_marks > 0 else 0
-        grade, remarks = calculate_grade(percentage)
+        grade, remarks = calculate_grade(round(percentage, 2))
         # Save to database
         connection = get_db_connection()
         if connection:
@@ -276,51 +339,37 @@ def generate_marksheet():
                 ''', (student_id, subject['name'], subject['marks'], 
                       subject['max_marks'], subject['grade']))
             
+            record_students(cursor, [(branch, semester, exam_type, percentage, grade)])
+            
             connection.commit()
             cursor.close()
             connection.close()
+            marksheets_changed()
             
             # Get signature and seal URLs if they exist
-            teacher_signature_url = None
-            principal_signature_url = None
-            college_seal_url = None
-            
-            if include_signature and class_teacher:
-                teacher_sig_path = os.path.join(app.config['UPLOAD_FOLDER'], 'teachersign.png')
-                if os.path.exists(teacher_sig_path):
-                    teacher_signature_url = url_for('static', filename='uploads/teachersign.png')
-            
-            if include_signature and principal:
-                principal_sig_path = os.path.join(app.config['UPLOAD_FOLDER'], 'principalsign.png')
-                if os.path.exists(principal_sig_path):
-                    principal_signature_url = url_for('static', filename='uploads/principalsign.png')
+            teacher_signature_url = asset_url('teacher_signature') if include_signature and class_teacher else None
+            principal_signature_url = asset_url('principal_signature') if include_signature and principal else None
+            college_seal_url = asset_url('college_seal') if include_seal else None
             
-            if include_seal:
-                seal_path = os.path.join(app.config['UPLOAD_FOLDER'], 'collegeseal.png')
-                if os.path.exists(seal_path):
-                    college_seal_url = url_for('static', filename='uploads/collegeseal.png')
-            
-            return render_template('result.html', 
-                                 student={
-                                     'id': student_id,
-                                     'name': student_name,
-                                     'roll_no': roll_no,
-                                     'branch': branch,
-                                     'semester': semester,
-                                     'exam_type': exam_type,
-                                     'total_marks': total_marks,
-                                     'max_marks': total_max_marks,
-                                     'percentage': round(percentage, 2),
-                                     'grade': grade,
-                                     'remarks': remarks,
-                                     'class_teacher': class_teacher,
-                                     'principal': principal,
-                                     'date': datetime.datetime.now().strftime('%B %d, %Y'),
-                                     'include_signature': include_signature,
-                                     'include_seal': include_seal
-                                 },
-                                 subjects=subjects_data,
-                                 college_name=app.config['COLLEGE_NAME'],
+            student = {
+                'id': student_id,
+                'name': student_name,
+                'roll_no': roll_no,
+                'branch': branch,
+                'semester': semester,
+                'exam_type': exam_type,
+                'total_marks': total_marks,
+                'max_marks': total_max_marks,
+                'percentage': round(percentage, 2),
+                'grade': grade,
+                'remarks': remarks,
+                'class_teacher': class_teacher,
+                'principal': principal,
+                'date_created': datetime.datetime.now()
+            }
+            return render_template('result.html',
+                                 student=student,
+                                 marksheet_html=marksheet_fragment(student, subjects_data),
                                  teacher_signature_url=teacher_signature_url,
                                  principal_signature_url=principal_signature_url,
                                  college_seal_url=college_seal_url)
@@ -332,255 +381,270 @@ def generate_marksheet():
         flash(f'Error generating marksheet: {str(e)}', 'error')
         return redirect(url_for('index'))
 
+def fetch_marksheet(student_id):
+    """(student, subjects) rows for one marksheet; student is None if there is no such record"""
+    connection = get_db_connection()
+    if not connection:
+        raise ConnectionError('Database connection error')
+    
+    cursor = connection.cursor(dictionary=True)
+    cursor.execute('SELECT * FROM students WHERE id = %s', (student_id,))
+    student = cursor.fetchone()
+    cursor.execute('SELECT * FROM subjects WHERE student_id = %s', (student_id,))
+    subjects = cursor.fetchall()
+    cursor.close()
+    connection.close()
+    return student, subjects
+
+def marksheet_pdf_job(student, subjects):
+    """Cached PDF path (or None) and cache key of a marksheet, plus a function that queues its render job"""
+    qr_url = marksheet_qr_url(student, subjects)
+    assets = asset_registry.render_assets()
+    cache_key = marksheet_fingerprint(student, subjects, app.config, qr_url, assets)
+    
+    def queue():
+        pdf_filename = f"marksheet_{student['roll_no']}_{datetime.datetime.now().strftime('%Y%m%d')}.pdf"
+        job_id = render_queue.submit(student, subjects, app.config['COLLEGE_NAME'], pdf_filename,
+                                     pdf_cache, cache_key, qr_cache.png(qr_url), assets)
+        return jsonify({
+            'success': True,
+            'job_id': job_id,
+            'status_url': url_for('render_job_status', job_id=job_id),
+            'download_url': url_for('render_job_download', job_id=job_id)
+        }), 202
+    
+    return pdf_cache.get(student['id'], cache_key), cache_key, queue
+
 @app.route('/download_pdf/<int:student_id>')
 def download_pdf(student_id):
+    """Serve a cached marksheet PDF; on a miss, queue its render job (202, as for /render_pdf)"""
     if 'user_id' not in session:
         return redirect(url_for('login'))
     
     try:
-        # Get student data from database
-        connection = get_db_connection()
-        if not connection:
-            flash('Database connection error!', 'error')
-            return redirect(url_for('index'))
-        
-        cursor = connection.cursor(dictionary=True)
-        
-        # Get student details
-        cursor.execute('SELECT * FROM students WHERE id = %s', (student_id,))
-        student = cursor.fetchone()
-        
-        # Get subjects
-        cursor.execute('SELECT * FROM subjects WHERE student_id = %s', (student_id,))
-        subjects = cursor.fetchall()
-        
-        cursor.close()
-        connection.close()
-        
+        student, subjects = fetch_marksheet(student_id)
         if not student:
             flash('Student record not found!', 'error')
             return redirect(url_for('index'))
         
-        # Generate PDF that matches the web view exactly
-        pdf_filename = f"marksheet_{student['roll_no']}_{datetime.datetime.now().strftime('%Y%m%d')}.pdf"
-        pdf_path = os.path.join('static', 'uploads', pdf_filename)
-        
-        # Create PDF with exact same layout as web view
-        doc = SimpleDocTemplate(pdf_path, pagesize=A4, topMargin=0.5*inch, bottomMargin=0.5*inch, 
-                              leftMargin=0.5*inch, rightMargin=0.5*inch)
-        styles = getSampleStyleSheet()
-        story = []
-        
-        # Create custom styles that match the web view
-        college_header_style = ParagraphStyle(
-            'CollegeHeader',
-            parent=styles['Heading1'],
-            fontSize=24,
-            textColor=colors.HexColor('#2563eb'),  # Blue color like web
-            alignment=TA_CENTER,
-            spaceAfter=5,
-            fontName='Helvetica-Bold'
-        )
-        
-        college_subtitle_style = ParagraphStyle(
-            'CollegeSubtitle',
-            parent=styles['Normal'],
-            fontSize=12,
-            textColor=colors.HexColor('#64748b'),  # Gray color like web
-            alignment=TA_CENTER,
-            spaceAfter=10,
-            fontStyle='italic'
-        )
-        
-        marksheet_title_style = ParagraphStyle(
-            'MarksheetTitle',
-            parent=styles['Heading2'],
-            fontSize=18,
-            fontName='Helvetica-Bold',
-            alignment=TA_CENTER,
-            textColor=colors.black,
-            spaceAfter=5
-        )
-        
-        exam_type_style = ParagraphStyle(
-            'ExamType',
-            parent=styles['Normal'],
-            fontSize=14,
-            alignment=TA_CENTER,
-            textColor=colors.HexColor('#64748b'),
-            spaceAfter=20
-        )
-        
-        # Header section - exactly like web view
-        story.append(Paragraph(app.config['COLLEGE_NAME'], college_header_style))
-        story.append(Paragraph('Academic Excellence Since 1995', college_subtitle_style))
-        story.append(Paragraph('ACADEMIC MARKSHEET', marksheet_title_style))
-        story.append(Paragraph(student['exam_type'], exam_type_style))
-        
-        # Student details section - matching web layout
-        detail_style = ParagraphStyle(
-            'DetailStyle',
-            parent=styles['Normal'],
-            fontSize=11,
-            leftIndent=10,
-            rightIndent=10
-        )
-        
-        # Student details table with exact web layout
-        student_details = [
-            ['<b>Student Name:</b>', student['name'], '<b>Roll Number:</b>', student['roll_no']],
-            ['<b>Branch:</b>', student['branch'], '<b>Semester:</b>', student['semester']],
-            ['<b>Exam Type:</b>', student['exam_type'], '<b>Result Date:</b>', student['date_created'].strftime('%B %d, %Y')]
-        ]
-        
-        detail_table = Table(student_details, colWidths=[1.5*inch, 2.2*inch, 1.5*inch, 1.8*inch])
-        detail_table.setStyle(TableStyle([
-            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 0), (-1, -1), 11),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('LEFTPADDING', (0, 0), (-1, -1), 10),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 10),
-            ('TOPPADDING', (0, 0), (-1, -1), 8),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-        ]))
-        
-        story.append(detail_table)
-        story.append(Spacer(1, 20))
-        
-        # Subjects table - exactly matching web design with blue header
-        header_data = [['S.No.', 'Subject', 'Marks Obtained', 'Maximum Marks', 'Grade']]
-        subject_rows = []
-        
-        for i, subject in enumerate(subjects, 1):
-            subject_rows.append([
-                str(i),
-                subject['subject_name'],
-                str(subject['marks']),
-                str(subject['max_marks']),
-                subject['grade']
-            ])
-        
-        # Add total row
-        total_row = [['TOTAL', '', str(student['total_marks']), str(student['max_marks']), student['grade']]]
-        
-        # Combine all table data
-        table_data = header_data + subject_rows + total_row
-        
-        subjects_table = Table(table_data, colWidths=[0.8*inch, 2.8*inch, 1.2*inch, 1.2*inch, 0.8*inch])
-        subjects_table.setStyle(TableStyle([
-            # Header row styling (blue background like web)
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#3b82f6')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 11),
-            ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
-            
-            # Data rows styling
-            ('FONTNAME', (0, 1), (-1, -2), 'Helvetica'),
-            ('FONTSIZE', (0, 1), (-1, -2), 10),
-            ('ALIGN', (0, 1), (-1, -1), 'CENTER'),
-            
-            # Total row styling (blue background like web)
-            ('BACKGROUND', (0, -1), (-1, -1), colors.HexColor('#3b82f6')),
-            ('TEXTCOLOR', (0, -1), (-1, -1), colors.white),
-            ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, -1), (-1, -1), 11),
-            
-            # Grid and padding
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('TOPPADDING', (0, 0), (-1, -1), 8),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-            ('LEFTPADDING', (0, 0), (-1, -1), 5),
-            ('RIGHTPADDING', (0, 0), (-1, -1), 5),
-        ]))
-        
-        story.append(subjects_table)
-        story.append(Spacer(1, 20))
-        
-        # Result summary section
-        summary_data = [
-            ['<b>Total Marks:</b>', f"{student['total_marks']}/{student['max_marks']}"],
-            ['<b>Percentage:</b>', f"{student['percentage']:.2f}%"],
-            ['<b>Grade:</b>', student['grade']],
-            ['<b>Remarks:</b>', student['remarks']]
-        ]
-        
-        summary_table = Table(summary_data, colWidths=[2*inch, 4*inch])
-        summary_table.setStyle(TableStyle([
-            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 0), (-1, -1), 11),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('LEFTPADDING', (0, 0), (-1, -1), 10),
-            ('TOPPADDING', (0, 0), (-1, -1), 5),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
-        ]))
-        
-        story.append(summary_table)
-        story.append(Spacer(1, 25))
-        
-        # Signatures section (if enabled)
-        if student.get('class_teacher') or student.get('principal'):
-            signature_data = []
-            sig_row = []
-            if student.get('class_teacher'):
-                sig_row.extend(['Class Teacher', '', 'Principal'])
-                name_row = [student.get('class_teacher', ''), '', student.get('principal', '')]
-            else:
-                sig_row.extend(['', '', 'Principal'])
-                name_row = ['', '', student.get('principal', '')]
-                
-            signature_data = [
-                sig_row,
-                name_row,
-                ['_________________', '', '_________________'],
-                ['', '', '']
-            ]
-            
-            signature_table = Table(signature_data, colWidths=[2.5*inch, 1*inch, 2.5*inch])
-            signature_table.setStyle(TableStyle([
-                ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
-                ('FONTSIZE', (0, 0), (-1, -1), 10),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-                ('TOPPADDING', (0, 0), (-1, -1), 5),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
-            ]))
-            
-            story.append(signature_table)
-            story.append(Spacer(1, 15))
-        
-        # Verification section without QR code
-        verification_text = f"""
-        <b>Digital Verification</b><br/>
-        This marksheet is digitally verified and authentic.<br/>
-        <b>Verified by {app.config['COLLEGE_NAME']}</b><br/>
-        Student ID: {student_id}
-        """
-        
-        verification_style = ParagraphStyle(
-            'VerificationStyle',
-            parent=styles['Normal'],
-            fontSize=10,
-            leftIndent=10,
-            alignment=TA_CENTER
-        )
-        
-        story.append(Spacer(1, 10))
-        story.append(Paragraph(verification_text, verification_style))
-        story.append(Spacer(1, 10))
+        pdf_path, cache_key, queue = marksheet_pdf_job(student, subjects)
+        if not pdf_path:
+            # Rendering is never done on the request thread
+            return queue()
         
-        # Build PDF
-        doc.build(story)
-        
-        return send_file(pdf_path, as_attachment=True, download_name=pdf_filename)
+        pdf_filename = f"marksheet_{student['roll_no']}_{datetime.datetime.now().strftime('%Y%m%d')}.pdf"
+        return send_file(pdf_path, as_attachment=True, download_name=pdf_filename,
+                         etag=cache_key, conditional=True, max_age=0)
         
     except Exception as e:
         flash(f'Error generating PDF: {str(e)}', 'error')
         return redirect(url_for('index'))
 
+@app.route('/render_pdf/<int:student_id>', methods=['POST'])
+def render_pdf(student_id):
+    """Queue a marksheet PDF for background rendering, unless it is already in the PDF cache"""
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'message': 'Unauthorized access'}), 401
+    
+    try:
+        student, subjects = fetch_marksheet(student_id)
+        if not student:
+            return jsonify({'success': False, 'message': 'Student record not found'}), 404
+        
+        pdf_path, _, queue = marksheet_pdf_job(student, subjects)
+        if pdf_path:
+            return jsonify({'success': True, 'download_url': url_for('download_pdf', student_id=student_id)})
+        return queue()
+        
+    except ConnectionError as e:
+        return jsonify({'success': False, 'message': str(e)}), 503
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'Error queuing PDF: {str(e)}'}), 500
+
+@app.route('/download_batch_pdf')
+def download_batch_pdf():
+    """Print a whole class: one merged PDF (queued as a render job), or a streamed ZIP of per-student PDFs (?format=zip)"""
+    if 'user_id' not in session:
+        return redirect(url_for('login'))
+    
+    filters = {key: request.args[key] for key in BATCH_FILTERS if request.args.get(key)}
+    output_format = request.args.get('format', 'pdf')
+    if not filters:
+        return jsonify({'success': False, 'message': 'Select at least one of branch, semester or exam_type'}), 400
+    if output_format not in ('pdf', 'zip'):
+        return jsonify({'success': False, 'message': 'format must be pdf or zip'}), 400
+    
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'success': False, 'message': 'Database connection error'}), 503
+    max_students = app.config['PDF_BATCH_MAX_STUDENTS']
+    try:
+        # One extra row tells us the class is over the limit
+        entries = fetch_class_rows(connection, filters, max_students + 1)
+    finally:
+        connection.close()
+    
+    if not entries:
+        return jsonify({'success': False, 'message': 'No students match these filters'}), 404
+    if len(entries) > max_students:
+        return jsonify({'success': False,
+                        'message': f'More than {max_students} students match these filters; narrow them down '
+                                   f'(e.g. add a semester or exam type)'}), 413
+    
+    batch_name = 'marksheets_' + '_'.join(secure_filename(value) for value in filters.values())
+    assets = asset_registry.render_assets()
+    
+    if output_format == 'pdf':
+        # A single document can't be split across processes without a PDF
+        # merger, so the whole class is one background render job: poll
+        # status_url and fetch download_url, as for /render_pdf
+        entries = [(student, subjects, qr_cache.png(marksheet_qr_url(student, subjects)))
+                   for student, subjects in entries]
+        job_id = render_queue.submit_class(entries, app.config['COLLEGE_NAME'], f'{batch_name}.pdf', assets)
+        return jsonify({
+            'success': True,
+            'job_id': job_id,
+            'student_count': len(entries),
+            'status_url': url_for('render_job_status', job_id=job_id),
+            'download_url': url_for('render_job_download', job_id=job_id)
+        }), 202
+    
+    body = stream_class_zip(entries, render_queue.executor(), pdf_cache, app.config, marksheet_qr_url, qr_cache, assets)
+    response = Response(stream_with_context(body), mimetype='application/zip')
+    response.headers['Content-Disposition'] = f'attachment; filename={batch_name}.zip'
+    return response
+
+@app.route('/render_jobs/<job_id>')
+def render_job_status(job_id):
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'message': 'Unauthorized access'}), 401
+    
+    job = render_queue.status(job_id)
+    if not job:
+        return jsonify({'success': False, 'message': 'Unknown job'}), 404
+    
+    return jsonify({'success': True, 'job': job})
+
+@app.route('/render_jobs/<job_id>/download')
+def render_job_download(job_id):
+    if 'user_id' not in session:
+        return redirect(url_for('login'))
+    
+    job = render_queue.status(job_id)
+    if not job:
+        return jsonify({'success': False, 'message': 'Unknown job'}), 404
+    if job['state'] != 'done':
+        return jsonify({'success': False, 'job': job, 'message': 'PDF is not ready yet'}), 409
+    
+    return send_file(render_queue.pdf_path(job_id), as_attachment=True, download_name=job['download_name'])
+
+def get_job(job_id):
+    """Job row if it exists and belongs to the current user (admins see every job)"""
+    job = job_queue.status(job_id)
+    if job and (job['owner_id'] == session.get('user_id') or session.get('role') == 'admin'):
+        return job
+    return None
+
+def job_payload(job):
+    """What the browser sees of a job (parameters stay on the server)"""
+    payload = {key: value for key, value in job.items() if key not in ('params', 'pid')}
+    payload['status_url'] = url_for('job_status', job_id=job['id'])
+    payload['throughput'] = throughput(job)
+    if job['kind'] == 'export_data' and job['state'] == 'done':
+        payload['download_url'] = url_for('job_download', job_id=job['id'])
+    return payload
+
+def queued_job_response(job_id):
+    return jsonify({
+        'success': True,
+        'job_id': job_id,
+        'status_url': url_for('job_status', job_id=job_id),
+        'message': 'Job queued'
+    }), 202
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    """State, progress and (once done) result of a background job"""
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'message': 'Unauthorized access'}), 401
+    
+    job = get_job(job_id)
+    if not job:
+        return jsonify({'success': False, 'message': 'Unknown job'}), 404
+    
+    return jsonify({'success': True, 'job': job_payload(job)})
+
+@app.route('/jobs/<job_id>/events')
+def job_events(job_id):
+    """Server-Sent Events stream of a job's progress.
+    
+    Sends a `progress` event whenever the job changes and a final `done`,
+    `failed` or `cancelled` event. An open stream occupies a worker thread,
+    so the Procfile runs gunicorn with gthread workers rather than sync ones
+    (where each stream would take a whole worker process). The stream
+    ends after JOB_EVENTS_STREAM_SECONDS; EventSource reconnects on its
+    own and gets the current state again.
+    """
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'message': 'Unauthorized access'}), 401
+    
+    if not get_job(job_id):
+        return jsonify({'success': False, 'message': 'Unknown job'}), 404
+    
+    def generate():
+        yield f"retry: {app.config['JOB_EVENTS_RETRY_MS']}\n\n"
+        for job in job_queue.watch(job_id, app.config['JOB_EVENTS_INTERVAL'], app.config['JOB_EVENTS_STREAM_SECONDS']):
+            event = job['state'] if job['state'] in ('done', 'failed', 'cancelled') else 'progress'
+            yield f"event: {event}\ndata: {app.json.dumps(job_payload(job))}\n\n"
+    
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # Don't let a proxy hold events back
+    return response
+
+@app.route('/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'message': 'Unauthorized access'}), 401
+    
+    job = get_job(job_id)
+    if not job:
+        return jsonify({'success': False, 'message': 'Unknown job'}), 404
+    if not job_queue.cancel(job_id):
+        return jsonify({'success': False, 'job': job_payload(job), 'message': f"Job is already {job['state']}"}), 409
+    
+    return jsonify({'success': True, 'job': job_payload(job_queue.status(job_id)), 'message': 'Cancel requested'})
+
+@app.route('/jobs/<job_id>/retry', methods=['POST'])
+def retry_job(job_id):
+    """Run a failed or cancelled job again with the same parameters"""
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'message': 'Unauthorized access'}), 401
+    
+    job = get_job(job_id)
+    if not job:
+        return jsonify({'success': False, 'message': 'Unknown job'}), 404
+    if not job_queue.retry(job_id):
+        return jsonify({'success': False, 'job': job_payload(job), 'message': f"A {job['state']} job cannot be retried"}), 409
+    
+    return queued_job_response(job_id)
+
+@app.route('/jobs/<job_id>/download')
+def job_download(job_id):
+    """File written by a finished export job"""
+    if 'user_id' not in session:
+        return redirect(url_for('login'))
+    
+    job = get_job(job_id)
+    if not job or job['kind'] != 'export_data':
+        return jsonify({'success': False, 'message': 'Unknown job'}), 404
+    if job['state'] != 'done':
+        return jsonify({'success': False, 'job': job_payload(job), 'message': 'Export is not ready yet'}), 409
+    
+    result = job['result']
+    return send_file(job_queue.output_path(job_id, result['format']), as_attachment=True,
+                     download_name=result['download_name'], mimetype=result['mimetype'])
+
 @app.route('/download_html_pdf/<int:student_id>')
 def download_html_pdf(student_id):
     """Generate a print-optimized view of the marksheet that matches the web preview exactly"""
@@ -611,88 +675,116 @@ def download_html_pdf(student_id):
             flash('Student record not found!', 'error')
             return redirect(url_for('index'))
         
-        # Prepare student data for template
-        student_data = {
-            'id': student_id,
-            'name': student['name'],
-            'roll_no': student['roll_no'],
-            'branch': student['branch'],
-            'semester': student['semester'],
-            'exam_type': student['exam_type'],
-            'total_marks': student['total_marks'],
-            'max_marks': student['max_marks'],
-            'percentage': round(student['percentage'], 2),
-            'grade': student['grade'],
-            'remarks': student['remarks'],
-            'class_teacher': student.get('class_teacher', ''),
-            'principal': student.get('principal', ''),
-            'date': student['date_created'].strftime('%B %d, %Y'),
-            'include_signature': True,  # Default to true for PDF
-            'include_seal': True        # Default to true for PDF
-        }
-        
-        # Get signature and seal URLs if they exist
-        teacher_signature_url = None
-        principal_signature_url = None
-        college_seal_url = None
-        
-        if student_data['include_signature'] and student_data['class_teacher']:
-            teacher_sig_path = os.path.join(app.config['UPLOAD_FOLDER'], 'teachersign.png')
-            if os.path.exists(teacher_sig_path):
-                teacher_signature_url = url_for('static', filename='uploads/teachersign.png')
-        
-        if student_data['include_signature'] and student_data['principal']:
-            principal_sig_path = os.path.join(app.config['UPLOAD_FOLDER'], 'principalsign.png')
-            if os.path.exists(principal_sig_path):
-                principal_signature_url = url_for('static', filename='uploads/principalsign.png')
-        
-        if student_data['include_seal']:
-            seal_path = os.path.join(app.config['UPLOAD_FOLDER'], 'collegeseal.png')
-            if os.path.exists(seal_path):
-                college_seal_url = url_for('static', filename='uploads/collegeseal.png')
-        
-        # Render the print-optimized template
-        return render_template('print_marksheet.html',
-                             student=student_data,
-                             subjects=subjects,
-                             college_name=app.config['COLLEGE_NAME'],
+        # Signatures and seal are always included in the print view, as in the PDF
+        teacher_signature_url = asset_url('teacher_signature') if student['class_teacher'] else None
+        principal_signature_url = asset_url('principal_signature') if student['principal'] else None
+        college_seal_url = asset_url('college_seal')
+        
+        # Same page as the generate result, opening the print dialog on load
+        return render_template('result.html',
+                             student=student,
+                             marksheet_html=marksheet_fragment(student, subjects),
                              teacher_signature_url=teacher_signature_url,
                              principal_signature_url=principal_signature_url,
-                             college_seal_url=college_seal_url)
+                             college_seal_url=college_seal_url,
+                             auto_print=True)
         
     except Exception as e:
         flash(f'Error generating print view: {str(e)}', 'error')
         return redirect(url_for('index'))
 
+@app.route('/assets/<name>')
+def serve_asset(name):
+    """Signature/seal image from memory; URLs carry ?v=<etag>, so browsers may cache them for good"""
+    asset = asset_registry.get(name)
+    if not asset:
+        return "Not found", 404
+    
+    response = Response(asset.png, mimetype='image/png')
+    response.set_etag(asset.etag)
+    if request.args.get('v') == asset.etag:
+        response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    else:
+        response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+@app.route('/upload_asset/<name>', methods=['POST'])
+def upload_asset(name):
+    """Replace the teacher signature, principal signature or college seal image"""
+    if 'user_id' not in session or session.get('role') != 'admin':
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 403
+    if name not in ASSET_FILES:
+        return jsonify({'success': False, 'message': 'Unknown asset: use one of ' + ', '.join(ASSET_FILES)}), 404
+    
+    file = request.files.get('file')
+    if not file or not file.filename:
+        return jsonify({'success': False, 'message': 'No file selected'}), 400
+    if not allowed_file(file.filename):
+        return jsonify({'success': False, 'message': 'Only PNG and JPEG images are allowed'}), 400
+    
+    try:
+        asset = asset_registry.store(name, file.stream)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    
+    return jsonify({
+        'success': True,
+        'message': 'Image uploaded successfully',
+        'url': url_for('serve_asset', name=name, v=asset.etag),
+        'width': asset.width,
+        'height': asset.height
+    })
+
 @app.route('/history')
 def history():
     if 'user_id' not in session:
         return redirect(url_for('login'))
     
-    search_query = request.args.get('search', '')
+    search_query = request.args.get('search', '').strip()
+    after = request.args.get('after')
     
     connection = get_db_connection()
     if connection:
-        cursor = connection.cursor(dictionary=True)
-        
-        if search_query:
-            cursor.execute('''
-                SELECT * FROM students 
-                WHERE name LIKE %s OR roll_no LIKE %s 
-                ORDER BY date_created DESC
-            ''', (f'%{search_query}%', f'%{search_query}%'))
-        else:
-            cursor.execute('SELECT * FROM students ORDER BY date_created DESC LIMIT 50')
-        
-        students = cursor.fetchall()
-        cursor.close()
-        connection.close()
+        try:
+            if search_query:
+                students, next_cursor = search_students(connection, cursor_codec, search_query,
+                                                        listing_page_size(), after)
+            else:
+                cursor = connection.cursor()
+                try:
+                    students, next_cursor = fetch_page(cursor, cursor_codec, HISTORY_KEYSET, HISTORY.select(),
+                                                       [], [], after, listing_page_size(), HISTORY)
+                finally:
+                    cursor.close()
+        except CursorError as e:
+            flash(str(e), 'error')
+            return redirect(url_for('history', search=search_query or None))
+        finally:
+            connection.close()
         
-        return render_template('history.html', students=students, search_query=search_query)
+        return render_template('history.html', students=students, search_query=search_query,
+                               next_cursor=next_cursor, is_first_page=not after)
     else:
         flash('Database connection error!', 'error')
         return redirect(url_for('index'))
 
+@app.route('/api/search_suggest')
+def api_search_suggest():
+    """Typeahead for the history search box"""
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'message': 'Unauthorized access'})
+    
+    query = request.args.get('q', '').strip()
+    if len(query) < 2:
+        return jsonify({'success': True, 'suggestions': []})
+    
+    with db_connection() as connection:
+        if not connection:
+            return jsonify({'success': False, 'message': 'Database connection error'})
+        suggestions = suggest_students(connection, query, app.config['SEARCH_SUGGEST_LIMIT'])
+    
+    return jsonify({'success': True, 'suggestions': suggestions})
+
 @app.route('/dashboard')
 def dashboard():
     if 'user_id' not in session:
@@ -702,106 +794,26 @@ def dashboard():
         flash('Access denied! Admin privileges required.', 'error')
         return redirect(url_for('index'))
     
-    connection = get_db_connection()
-    if connection:
-        cursor = connection.cursor(dictionary=True)
-        
-        # Get basic statistics
-        cursor.execute('SELECT COUNT(*) as total_students FROM students')
-        total_students = cursor.fetchone()['total_students']
-        
-        cursor.execute('SELECT COUNT(*) as passed FROM students WHERE grade != "F"')
-        passed_students = cursor.fetchone()['passed']
-        
-        cursor.execute('SELECT AVG(percentage) as avg_percentage FROM students')
-        avg_result = cursor.fetchone()
-        avg_percentage = round(avg_result['avg_percentage'], 2) if avg_result['avg_percentage'] else 0
-        
-        # Branch statistics
-        cursor.execute('''
-            SELECT branch, COUNT(*) as count, AVG(percentage) as avg_perc 
-            FROM students 
-            GROUP BY branch
-        ''')
-        branch_stats = cursor.fetchall()
-        
-        # Top performers
-        cursor.execute('''
-            SELECT name, roll_no, percentage, grade 
-            FROM students 
-            ORDER BY percentage DESC 
-            LIMIT 10
-        ''')
-        top_performers = cursor.fetchall()
-        
-        # Enhanced Analytics Data
-        # Grade distribution
-        cursor.execute('''
-            SELECT 
-                SUM(CASE WHEN percentage >= 90 THEN 1 ELSE 0 END) as a_plus,
-                SUM(CASE WHEN percentage >= 85 AND percentage < 90 THEN 1 ELSE 0 END) as a_grade,
-                SUM(CASE WHEN percentage >= 75 AND percentage < 85 THEN 1 ELSE 0 END) as b_plus,
-                SUM(CASE WHEN percentage >= 65 AND percentage < 75 THEN 1 ELSE 0 END) as b_grade,
-                SUM(CASE WHEN percentage >= 55 AND percentage < 65 THEN 1 ELSE 0 END) as c_grade,
-                SUM(CASE WHEN percentage >= 40 AND percentage < 55 THEN 1 ELSE 0 END) as d_grade,
-                SUM(CASE WHEN percentage < 40 THEN 1 ELSE 0 END) as f_grade
-            FROM students
-        ''')
-        grade_distribution = cursor.fetchone()
-        
-        # Semester-wise performance
-        cursor.execute('''
-            SELECT semester, COUNT(*) as count, AVG(percentage) as avg_perc
-            FROM students 
-            GROUP BY semester
-            ORDER BY semester
-        ''')
-        semester_stats = cursor.fetchall()
-        
-        # At-risk students (below 40%)
-        cursor.execute('''
-            SELECT COUNT(*) as at_risk_count
-            FROM students 
-            WHERE percentage < 40
-        ''')
-        at_risk_count = cursor.fetchone()['at_risk_count']
-        
-        # Star performers (90%+)
-        cursor.execute('''
-            SELECT COUNT(*) as star_count
-            FROM students 
-            WHERE percentage >= 90
-        ''')
-        star_count = cursor.fetchone()['star_count']
-        
-        # Subject-wise performance (sample - you can expand this based on your subject data)
-        cursor.execute('''
-            SELECT 
-                AVG(percentage) as overall_avg,
-                MIN(percentage) as lowest_score,
-                MAX(percentage) as highest_score
-            FROM students
-        ''')
-        performance_stats = cursor.fetchone()
+    snapshot = analytics_snapshot()
+    if snapshot:
+        performance_stats = snapshot['performance_stats']
         
         # Calculate improvement rate (mock data for demo)
-        improvement_rate = 12.5 if total_students > 0 else 0
+        improvement_rate = 12.5 if snapshot['total_students'] > 0 else 0
         consistency_score = min(95, max(60, 100 - (performance_stats['highest_score'] - performance_stats['lowest_score']) / 2)) if performance_stats['highest_score'] else 85
         
-        cursor.close()
-        connection
-        
         return render_template('dashboard.html',
-                             total_students=total_students,
-                             passed_students=passed_students,
-                             failed_students=total_students - passed_students,
-                             avg_percentage=avg_percentage,
-                             branch_stats=branch_stats,
-                             top_performers=top_performers,
-                             grade_distribution=grade_distribution,
-                             semester_stats=semester_stats,
-                             at_risk_count=at_risk_count,
-                             star_count=star_count,
+                             total_students=snapshot['total_students'],
+                             passed_students=snapshot['passed_students'],
+                             failed_students=snapshot['failed_students'],
+                             avg_percentage=snapshot['avg_percentage'],
+                             branch_stats=snapshot['branch_stats'],
+                             top_performers=snapshot['top_performers'],
+                             grade_distribution=snapshot['grade_distribution'],
+                             grade_legend=GRADE_LEGEND,
+                             semester_stats=snapshot['semester_stats'],
+                             at_risk_count=snapshot['at_risk_count'],
+                             star_count=snapshot['star_count'],
                              improvement_rate=improvement_rate,
                              consistency_score=round(consistency_score, 1),
                              performance_stats=performance_stats)
@@ -809,6 +821,21 @@ def dashboard():
         flash('Database connection error!', 'error')
         return redirect(url_for('index'))
 
+def fetch_verification(column, value):
+    """Verification payload for the student whose `column` equals `value` (None if not found)"""
+    with db_connection() as connection:
+        if not connection:
+            raise ConnectionError('Database connection error')
+        cursor = connection.cursor(dictionary=True)
+        cursor.execute(f'SELECT * FROM students WHERE {column} = %s', (value,))
+        student = cursor.fetchone()
+        subjects = []
+        if student:
+            cursor.execute('SELECT * FROM subjects WHERE student_id = %s', (student['id'],))
+            subjects = cursor.fetchall()
+        cursor.close()
+    return verification_payload(student, subjects)
+
 @app.route('/verify', methods=['GET', 'POST'])
 def verify():
     if request.method == 'POST':
@@ -818,90 +845,166 @@ def verify():
             flash('Please enter a verification code!', 'error')
             return render_template('verify.html')
         
-        connection = get_db_connection()
-        if connection:
-            cursor = connection.cursor(dictionary=True)
-            # Try to find by verification code or roll number
-            cursor.execute('SELECT * FROM students WHERE roll_no = %s', (verification_code,))
-            student = cursor.fetchone()
-            
-            if student:
-                cursor.execute('SELECT * FROM subjects WHERE student_id = %s', (student['id'],))
-                subjects = cursor.fetchall()
-                cursor.close()
-                connection.close()
-                
-                return render_template('verify.html', student=student, subjects=subjects,
-                                     college_name=app.config['COLLEGE_NAME'], verified=True)
-            else:
-                cursor.close()
-                connection.close()
-                flash('Invalid verification code or result not found!', 'error')
-                return render_template('verify.html')
-        else:
+        # Try to find by verification code or roll number
+        try:
+            payload = verify_cache.lookup(f'roll:{verification_code}',
+                                          lambda: fetch_verification('roll_no', verification_code))
+        except ConnectionError:
             flash('Database connection error!', 'error')
             return render_template('verify.html')
+        
+        if payload:
+            return render_template('verify.html', student=payload['student'], verified=True,
+                                 marksheet_html=marksheet_fragment(payload['student'], payload['subjects']))
+        else:
+            flash('Invalid verification code or result not found!', 'error')
+            return render_template('verify.html')
     
     # GET request - show verification form
     return render_template('verify.html')
 
 @app.route('/verify/<int:student_id>')
 def verify_result(student_id):
+    try:
+        payload = verify_cache.lookup(f'id:{student_id}', lambda: fetch_verification('id', student_id))
+    except ConnectionError:
+        return render_template('verify.html', error="Database connection error.")
+    
+    if payload:
+        return render_template('verify.html', student=payload['student'],
+                             marksheet_html=marksheet_fragment(payload['student'], payload['subjects']))
+    else:
+        return render_template('verify.html', error="Invalid verification code or result not found.")
+
+@app.route('/verify/signed/<token>')
+def verify_signed(token):
+    """Check a marksheet QR code from its signature alone (no database lookup)"""
+    try:
+        result = verify_token(token, app.config['MARKSHEET_SIGNING_KEY'])
+    except InvalidToken as e:
+        return jsonify({'success': True, 'valid': False, 'message': str(e)})
+    
+    return jsonify({
+        'success': True,
+        'valid': True,
+        **result,
+        'full_record_url': url_for('verify_result', student_id=result['student_id'], _external=True),
+        'message': f"Genuine marksheet issued by {app.config['COLLEGE_NAME']}"
+    })
+
+def verify_api_authorized():
+    """True for a logged-in user or a request carrying the configured VERIFY_API_KEY"""
+    if 'user_id' in session:
+        return True
+    api_key = app.config['VERIFY_API_KEY']
+    return bool(api_key) and hmac.compare_digest(request.headers.get('X-API-Key', ''), api_key)
+
+@app.route('/api/verify_bulk', methods=['POST'])
+def api_verify_bulk():
+    """Verify many marksheets at once.
+    
+    Body: {"roll_numbers": [...]} or {"ids": [...]}, optionally
+    "include_subjects": false. Add ?format=ndjson to stream one JSON result
+    per line instead of a single JSON document. Ids can be enumerated, so
+    they need a login or the VERIFY_API_KEY.
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        column, values = parse_bulk_request(data, app.config['VERIFY_BULK_MAX'])
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    
+    if column == 'id' and not verify_api_authorized():
+        return jsonify({'success': False, 'message': 'Verifying by id requires login or an API key'}), 401
+    
+    include_subjects = data.get('include_subjects', True) is not False
     connection = get_db_connection()
-    if connection:
-        cursor = connection.cursor(dictionary=True)
-        cursor.execute('SELECT * FROM students WHERE id = %s', (student_id,))
-        student = cursor.fetchone()
+    if not connection:
+        return jsonify({'success': False, 'message': 'Database connection error'}), 503
+    
+    chunks = iter_verifications(connection, column, values, app.config['VERIFY_BULK_CHUNK'], include_subjects)
+    
+    if request.args.get('format') == 'ndjson':
+        def generate():
+            try:
+                for results in chunks:
+                    yield ''.join(json.dumps(result, separators=(',', ':')) + '\n' for result in results)
+            finally:
+                chunks.close()
+                connection.close()
         
-        if student:
-            cursor.execute('SELECT * FROM subjects WHERE student_id = %s', (student_id,))
-            subjects = cursor.fetchall()
-            cursor.close()
-            connection.close()
-            
-            return render_template('verify.html', student=student, subjects=subjects,
-                                 college_name=app.config['COLLEGE_NAME'])
-        else:
-            cursor.close()
-            connection.close()
-            return render_template('verify.html', error="Invalid verification code or result not found.")
-    else:
-        return render_template('verify.html', error="Database connection error.")
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    
+    try:
+        results = [result for chunk in chunks for result in chunk]
+    finally:
+        connection.close()
+    
+    verified = sum(1 for result in results if result['verified'])
+    return jsonify({'success': True, 'count': len(results), 'verified_count': verified, 'results': results})
 
-@app.route('/export_data')
+@app.route('/export_data', methods=['GET', 'POST'])
 def export_data():
+    """Stream students and subjects as .xlsx (default), .csv or .ndjson.
+    
+    Optional filters: branch, semester, exam_type. CSV holds one table
+    (?table=students|subjects). A POST writes the file in a background job
+    instead; download it from /jobs/<id>/download once the job is done.
+    """
     if 'user_id' not in session or session.get('role') != 'admin':
+        if request.method == 'POST':
+            return jsonify({'success': False, 'message': 'Admin privileges required'}), 403
         flash('Access denied!', 'error')
         return redirect(url_for('login'))
     
-    try:
-        connection = get_db_connection()
-        if connection:
-            # Export students data
-            df_students = pd.read_sql('SELECT * FROM students', connection)
-            df_subjects = pd.read_sql('SELECT * FROM subjects', connection)
-            connection.close()
-            
-            # Create Excel file
-            excel_filename = f"marksheet_data_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-            excel_path = os.path.join('static', 'uploads', excel_filename)
-            
-            with pd.ExcelWriter(excel_path, engine='openpyxl') as writer:
-                df_students.to_excel(writer, sheet_name='Students', index=False)
-                df_subjects.to_excel(writer, sheet_name='Subjects', index=False)
-            
-            return send_file(excel_path, as_attachment=True, download_name=excel_filename)
-        else:
-            flash('Database connection error!', 'error')
-            return redirect(url_for('dashboard'))
-    except Exception as e:
-        flash(f'Error exporting data: {str(e)}', 'error')
+    export_format = request.args.get('format', 'xlsx')
+    table = request.args.get('table', 'students')
+    filters = {key: request.args[key] for key in EXPORT_FILTERS if request.args.get(key)}
+    if export_format not in EXPORT_FORMATS or table not in EXPORT_TABLES:
+        if request.method == 'POST':
+            return jsonify({'success': False, 'message': 'Unsupported export format'}), 400
+        flash('Unsupported export format!', 'error')
+        return redirect(url_for('dashboard'))
+    
+    if request.method == 'POST':
+        return queued_job_response(job_queue.submit('export_data', {
+            'export_format': export_format, 'table': table, 'filters': filters}, session['user_id']))
+    
+    connection = get_db_connection()
+    if not connection:
+        flash('Database connection error!', 'error')
         return redirect(url_for('dashboard'))
+    
+    batch_size = app.config['EXPORT_BATCH_ROWS']
+    if export_format == 'csv':
+        body = stream_csv(connection, table, filters, batch_size)
+        mimetype, filename = 'text/csv', f'marksheet_{table}'
+    elif export_format == 'ndjson':
+        body = stream_ndjson(connection, filters, batch_size)
+        mimetype, filename = 'application/x-ndjson', 'marksheet_data'
+    else:
+        body = stream_xlsx(connection, filters, batch_size)
+        mimetype, filename = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'marksheet_data'
+    
+    def generate():
+        try:
+            yield from body
+        finally:
+            connection.close()
+    
+    filename += f"_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.{export_format}"
+    response = Response(stream_with_context(generate()), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+    return response
 
 # Excel Import Routes
 @app.route('/import_excel', methods=['POST'])
 def import_excel():
-    """Import student data from Excel file"""
+    """Import student data from Excel file.
+    
+    The workbook is parsed and staged by a background job; its result holds
+    the import id and preview that used to be returned here.
+    """
     if 'user_id' not in session:
         return jsonify({'success': False, 'message': 'Unauthorized access'})
     
@@ -916,83 +1019,108 @@ def import_excel():
         if not (file.filename.endswith('.xlsx') or file.filename.endswith('.xls')):
             return jsonify({'success': False, 'message': 'Invalid file format. Please upload .xlsx or .xls file'})
         
-        # Save uploaded file temporarily
+        # Keep the upload with the job so a failed parse can be retried
         filename = secure_filename(file.filename)
-        upload_path = os.path.join('static', 'uploads', filename)
+        job_id = job_queue.new_job_id()
+        upload_path = job_queue.output_path(job_id, 'upload.' + filename.rsplit('.', 1)[-1].lower())
         file.save(upload_path)
         
-        # Read Excel file
-        try:
-            df = pd.read_excel(upload_path)
-        except Exception as e:
-            os.remove(upload_path)  # Clean up
-            return jsonify({'success': False, 'message': f'Error reading Excel file: {str(e)}'})
-        
-        # Validate Excel structure
-        required_columns = ['Student Name', 'Roll Number', 'Branch', 'Semester', 'Exam Type']
-        missing_columns = [col for col in required_columns if col not in df.columns]
-        
-        if missing_columns:
-            os.remove(upload_path)  # Clean up
-            return jsonify({'success': False, 'message': f'Missing required columns: {", ".join(missing_columns)}'})
-        
-        # Process Excel data
-        students_data = []
-        
-        for index, row in df.iterrows():
-            try:
-                # Extract student info
-                student_info = {
-                    'student_name': str(row['Student Name']).strip(),
-                    'roll_no': str(row['Roll Number']).strip(),
-                    'branch': str(row['Branch']).strip(),
-                    'semester': str(row['Semester']).strip(),
-                    'exam_type': str(row['Exam Type']).strip(),
-                    'subjects': []
-                }
-                
-                # Extract subject marks (columns after the first 5)
-                subject_columns = [col for col in df.columns if col not in required_columns]
-                
-                for subject_col in subject_columns:
-                    marks_value = row[subject_col]
-                    if pd.notna(marks_value) and str(marks_value).strip() != '':
-                        try:
-                            marks = float(marks_value)
-                            if 0 <= marks <= 100:  # Validate marks range
-                                student_info['subjects'].append({
-                                    'name': subject_col,
-                                    'marks': int(marks),
-                                    'max_marks': 100
-                                })
-                        except (ValueError, TypeError):
-                            continue  # Skip invalid marks
-                
-                # Only add student if they have at least one valid subject
-                if student_info['subjects']:
-                    students_data.append(student_info)
-                    
-            except Exception as e:
-                continue  # Skip problematic rows
-        
-        # Clean up uploaded file
-        os.remove(upload_path)
-        
-        if not students_data:
-            return jsonify({'success': False, 'message': 'No valid student data found in Excel file'})
-        
-        return jsonify({
-            'success': True, 
-            'data': students_data,
-            'message': f'Successfully processed {len(students_data)} students'
-        })
+        return queued_job_response(job_queue.submit('import_excel', {
+            'upload_path': upload_path, 'source_name': filename, 'owner_id': session['user_id']},
+            session['user_id'], job_id))
         
     except Exception as e:
         return jsonify({'success': False, 'message': f'Error processing file: {str(e)}'})
 
+def get_staged_import(import_id):
+    """Staged import metadata if it exists and belongs to the current user"""
+    meta = import_staging.meta(import_id)
+    if meta and (meta['owner_id'] == session.get('user_id') or session.get('role') == 'admin'):
+        return meta
+    return None
+
+@app.route('/import_excel/<import_id>')
+def staged_import_preview(import_id):
+    """Summary and one page of rows from a staged import"""
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'message': 'Unauthorized access'})
+    
+    meta = get_staged_import(import_id)
+    if not meta:
+        return jsonify({'success': False, 'message': 'Import not found or expired'}), 404
+    
+    page_size = app.config['IMPORT_PREVIEW_ROWS']
+    page = max(request.args.get('page', 1, type=int), 1)
+    rows = list(import_staging.rows(import_id, offset=(page - 1) * page_size, limit=page_size))
+    
+    return jsonify({'success': True, 'import': meta, 'page': page, 'page_size': page_size, 'rows': rows})
+
+@app.route('/import_excel/<import_id>/commit', methods=['POST'])
+def commit_staged_import(import_id):
+    """Queue a job creating marksheets for every row of a staged import"""
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'message': 'Unauthorized access'})
+    
+    meta = get_staged_import(import_id)
+    if not meta:
+        return jsonify({'success': False, 'message': 'Import not found or expired'}), 404
+    
+    return queued_job_response(job_queue.submit('commit_import', {'import_id': import_id}, session['user_id']))
+
+@app.route('/import_excel/<import_id>/discard', methods=['POST'])
+def discard_staged_import(import_id):
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'message': 'Unauthorized access'})
+    
+    if not get_staged_import(import_id):
+        return jsonify({'success': False, 'message': 'Import not found or expired'}), 404
+    
+    import_staging.discard(import_id)
+    return jsonify({'success': True, 'message': 'Import discarded'})
+
+@app.route('/import_stream', methods=['POST'])
+def import_stream():
+    """Import a very large .xlsx or .csv in bounded chunks, inserting as it reads.
+    
+    Accepts a multipart upload (excel_file) or the raw file as the request
+    body with ?format=csv|xlsx. The upload is saved with a background job
+    (see job_tasks.import_stream), so the import is not cut off by the
+    request timeout; poll the returned status_url for its report.
+    """
+    if 'user_id' not in session:
+        return jsonify({'success': False, 'message': 'Unauthorized access'})
+    
+    upload = request.files.get('excel_file')
+    if upload:
+        file_format = upload.filename.rsplit('.', 1)[-1].lower() if '.' in upload.filename else ''
+        source = upload.stream
+    else:
+        file_format = request.args.get('format', '').lower()
+        source = request.stream
+    
+    if file_format not in STREAM_FORMATS:
+        return jsonify({'success': False, 'message': 'Invalid file format. Please upload .xlsx or .csv file'})
+    
+    try:
+        # Keep the upload with the job so a failed import can be retried
+        job_id = job_queue.new_job_id()
+        upload_path = job_queue.output_path(job_id, f'upload.{file_format}')
+        with open(upload_path, 'wb') as f:
+            shutil.copyfileobj(source, f, 1024 * 1024)
+        
+        return queued_job_response(job_queue.submit('import_stream', {
+            'upload_path': upload_path, 'file_format': file_format}, session['user_id'], job_id))
+    
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'Error processing file: {str(e)}'})
+
 @app.route('/bulk_create_marksheets', methods=['POST'])
 def bulk_create_marksheets():
-    """Create marksheets for multiple students from imported data"""
+    """Create marksheets for multiple students from imported data.
+    
+    The rows are staged and inserted by a background job, as for a staged
+    Excel import; the job's result is the usual created/duplicates/errors report.
+    """
     if 'user_id' not in session:
         return jsonify({'success': False, 'message': 'Unauthorized access'})
     
@@ -1003,83 +1131,9 @@ def bulk_create_marksheets():
         if not students_data:
             return jsonify({'success': False, 'message': 'No student data provided'})
         
-        connection = get_db_connection()
-        if not connection:
-            return jsonify({'success': False, 'message': 'Database connection error'})
-        
-        cursor = connection.cursor()
-        created_count = 0
-        
-        for student_data in students_data:
-            try:
-                # Calculate totals
-                total_marks = sum(subject['marks'] for subject in student_data['subjects'])
-                max_marks = sum(subject['max_marks'] for subject in student_data['subjects'])
-                percentage = (total_marks / max_marks * 100) if max_marks > 0 else 0
-                grade, remarks = calculate_grade(percentage)
-                
-                # Insert student record
-                student_query = '''
-                    INSERT INTO students (name, roll_no, branch, semester, exam_type, 
-                                        total_marks, max_marks, percentage, grade, remarks, 
-                                        created_by, date_created, include_signature, include_seal)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                '''
-                
-                cursor.execute(student_query, (
-                    student_data['student_name'],
-                    student_data['roll_no'],
-                    student_data['branch'],
-                    student_data['semester'],
-                    student_data['exam_type'],
-                    total_marks,
-                    max_marks,
-                    percentage,
-                    grade,
-                    remarks,
-                    session['user_id'],
-                    datetime.datetime.now(),
-                    True,  # include_signature
-                    True   # include_seal
-                ))
-                
-                student_id = cursor.lastrowid
-                
-                # Insert subjects
-                for subject in student_data['subjects']:
-                    subject_query = '''
-                        INSERT INTO subjects (student_id, name, marks, max_marks, grade)
-                        VALUES (%s, %s, %s, %s, %s)
-                    '''
-                    subject_percentage = (subject['marks'] / subject['max_marks'] * 100) if subject['max_marks'] > 0 else 0
-                    subject_grade, _ = calculate_grade(subject_percentage)
-                    
-                    cursor.execute(subject_query, (
-                        student_id,
-                        subject['name'],
-                        subject['marks'],
-                        subject['max_marks'],
-                        subject_grade
-                    ))
-                
-                created_count += 1
-                
-            except mysql.connector.IntegrityError:
-                # Student with this roll number already exists, skip
-                continue
-            except Exception as e:
-                print(f"Error creating marksheet for {student_data.get('student_name', 'Unknown')}: {str(e)}")
-                continue
-        
-        connection.commit()
-        cursor.close()
-        connection.close()
-        
-        return jsonify({
-            'success': True,
-            'created_count': created_count,
-            'message': f'Successfully created {created_count} marksheets'
-        })
+        staged = import_staging.stage(students_data, session['user_id'], 'bulk_create_marksheets')
+        return queued_job_response(job_queue.submit('commit_import', {'import_id': staged['import_id']},
+                                                    session['user_id']))
         
     except Exception as e:
         return jsonify({'success': False, 'message': f'Error creating bulk marksheets: {str(e)}'})
@@ -1092,31 +1146,11 @@ def get_performance_metrics():
         return jsonify({'success': False, 'message': 'Unauthorized access'})
     
     try:
-        connection = get_db_connection()
-        if not connection:
+        snapshot = analytics_snapshot()
+        if not snapshot:
             return jsonify({'success': False, 'message': 'Database connection error'})
         
-        cursor = connection.cursor(dictionary=True)
-        
-        # Get performance distribution
-        query = '''
-            SELECT 
-                SUM(CASE WHEN percentage >= 85 THEN 1 ELSE 0 END) as excellent,
-                SUM(CASE WHEN percentage >= 70 AND percentage < 85 THEN 1 ELSE 0 END) as good,
-                SUM(CASE WHEN percentage >= 55 AND percentage < 70 THEN 1 ELSE 0 END) as average,
-                SUM(CASE WHEN percentage < 55 THEN 1 ELSE 0 END) as poor,
-                COUNT(*) as total,
-                AVG(percentage) as average_percentage
-            FROM students
-        '''
-        
-        cursor.execute(query)
-        metrics = cursor.fetchone()
-        
-        cursor.close()
-        connection.close()
-        
-        return jsonify({'success': True, 'metrics': metrics})
+        return jsonify({'success': True, 'metrics': snapshot['performance_metrics'], 'legend': PERFORMANCE_LEGEND})
         
     except Exception as e:
         return jsonify({'success': False, 'message': f'Error fetching metrics: {str(e)}'})
@@ -1137,12 +1171,7 @@ def get_top_performers():
         cursor = connection.cursor(dictionary=True)
         
         # Build query with filters
-        query = '''
-            SELECT id, name, roll_no, branch, semester, exam_type, 
-                   total_marks, max_marks, percentage, grade
-            FROM students
-            WHERE 1=1
-        '''
+        query = PERFORMER.select() + ' WHERE 1=1'
         params = []
         
         if filters.get('branch') and filters['branch'] != 'all':
@@ -1232,70 +1261,25 @@ def api_at_risk_students():
     if 'user_id' not in session or session.get('role') != 'admin':
         return jsonify({'success': False, 'message': 'Unauthorized'}), 403
     
-    connection = get_db_connection()
-    if connection:
-        cursor = connection.cursor(dictionary=True)
-        cursor.execute('''
-            SELECT name, roll_no, branch, semester, exam_type, percentage
-            FROM students 
-            WHERE percentage < 40
-            ORDER BY percentage ASC
-        ''')
-        students = cursor.fetchall()
-        cursor.close()
-        connection.close()
-        
-        return jsonify({'success': True, 'students': students})
-    
-    return jsonify({'success': False, 'message': 'Database connection failed'})
+    return listing_response(AT_RISK_KEYSET, LISTING,
+                            [f'percentage < {AT_RISK_BELOW:g}'])
 
 @app.route('/api/star_performers')
 def api_star_performers():
     if 'user_id' not in session or session.get('role') != 'admin':
         return jsonify({'success': False, 'message': 'Unauthorized'}), 403
     
-    connection = get_db_connection()
-    if connection:
-        cursor = connection.cursor(dictionary=True)
-        cursor.execute('''
-            SELECT name, roll_no, branch, semester, exam_type, percentage
-            FROM students 
-            WHERE percentage >= 90
-            ORDER BY percentage DESC
-        ''')
-        students = cursor.fetchall()
-        cursor.close()
-        connection.close()
-        
-        return jsonify({'success': True, 'students': students})
-    
-    return jsonify({'success': False, 'message': 'Database connection failed'})
+    return listing_response(STAR_KEYSET, LISTING,
+                            [f'percentage >= {STAR_FROM:g}'])
 
 @app.route('/api/grade_distribution')
 def api_grade_distribution():
     if 'user_id' not in session or session.get('role') != 'admin':
         return jsonify({'success': False, 'message': 'Unauthorized'}), 403
     
-    connection = get_db_connection()
-    if connection:
-        cursor = connection.cursor(dictionary=True)
-        cursor.execute('''
-            SELECT 
-                SUM(CASE WHEN percentage >= 90 THEN 1 ELSE 0 END) as a_plus,
-                SUM(CASE WHEN percentage >= 85 AND percentage < 90 THEN 1 ELSE 0 END) as a_grade,
-                SUM(CASE WHEN percentage >= 75 AND percentage < 85 THEN 1 ELSE 0 END) as b_plus,
-                SUM(CASE WHEN percentage >= 65 AND percentage < 75 THEN 1 ELSE 0 END) as b_grade,
-                SUM(CASE WHEN percentage >= 55 AND percentage < 65 THEN 1 ELSE 0 END) as c_grade,
-                SUM(CASE WHEN percentage >= 40 AND percentage < 55 THEN 1 ELSE 0 END) as d_grade,
-                SUM(CASE WHEN percentage < 40 THEN 1 ELSE 0 END) as f_grade,
-                COUNT(*) as total
-            FROM students
-        ''')
-        data = cursor.fetchone()
-        cursor.close()
-        connection.close()
-        
-        return jsonify({'success': True, 'data': data})
+    snapshot = analytics_snapshot()
+    if snapshot:
+        return jsonify({'success': True, 'data': snapshot['grade_distribution'], 'legend': GRADE_LEGEND})
     
     return jsonify({'success': False, 'message': 'Database connection failed'})
 
@@ -1304,20 +1288,9 @@ def api_semester_stats():
     if 'user_id' not in session or session.get('role') != 'admin':
         return jsonify({'success': False, 'message': 'Unauthorized'}), 403
     
-    connection = get_db_connection()
-    if connection:
-        cursor = connection.cursor(dictionary=True)
-        cursor.execute('''
-            SELECT semester, COUNT(*) as count, AVG(percentage) as avg_perc
-            FROM students 
-            GROUP BY semester
-            ORDER BY semester
-        ''')
-        data = cursor.fetchall()
-        cursor.close()
-        connection.close()
-        
-        return jsonify({'success': True, 'data': data})
+    snapshot = analytics_snapshot()
+    if snapshot:
+        return jsonify({'success': True, 'data': snapshot['semester_stats']})
     
     return jsonify({'success': False, 'message': 'Database connection failed'})
 
@@ -1329,10 +1302,10 @@ def export_at_risk_students():
     connection = get_db_connection()
     if connection:
         cursor = connection.cursor(dictionary=True)
-        cursor.execute('''
+        cursor.execute(f'''
             SELECT name, roll_no, branch, semester, exam_type, percentage
             FROM students 
-            WHERE percentage < 40
+            WHERE percentage < {AT_RISK_BELOW:g}
             ORDER BY percentage ASC
         ''')
         students = cursor.fetchall()
@@ -1369,6 +1342,52 @@ def export_at_risk_students():
     
     return jsonify({'success': False, 'message': 'Database connection failed'})
 
+@app.route('/api/moderate', methods=['POST'])
+def api_moderate():
+    """Apply grace marks to one subject for many students.
+    
+    Body: {"subject": ..., "add": N} plus optional branch, semester and
+    exam_type filters. Returns a diff without changing anything unless
+    "apply": true is given. "after_id" resumes a run that failed part way.
+    """
+    if 'user_id' not in session or session.get('role') != 'admin':
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 403
+    
+    data = request.get_json(silent=True) or {}
+    try:
+        rule = parse_rule(data)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    
+    connection = get_db_connection()
+    if not connection:
+        return jsonify({'success': False, 'message': 'Database connection error'}), 503
+    try:
+        subjects, students = plan_moderation(connection, rule, SCHEME)
+        diff = moderation_diff(subjects, students, SCHEME.failing_grade, app.config['MODERATION_SAMPLE'])
+        if data.get('apply') is not True:
+            return jsonify({'success': True, 'dry_run': True, 'rule': rule, 'diff': diff})
+        
+        applied = apply_moderation(connection, subjects, students, app.config['MODERATION_CHUNK'])
+        if applied:
+            rebuild_summary(connection)
+            marksheets_changed()
+    except ModerationFailed as e:
+        # The chunks before the failure are committed: keep the summary and caches in step with them
+        if e.applied:
+            rebuild_summary(connection)
+            marksheets_changed()
+        return jsonify({'success': False, 'applied': e.applied, 'resume_after_id': e.last_id,
+                        'message': f'Error applying moderation after {e.applied} students: {str(e)}; '
+                                   f'retry with "after_id": {e.last_id} to moderate the rest'}), 500
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'Error applying moderation: {str(e)}'}), 500
+    finally:
+        connection.close()
+    
+    return jsonify({'success': True, 'dry_run': False, 'rule': rule, 'diff': diff,
+                    'message': f'Moderated {applied} students'})
+
 @app.route('/clear_all_data', methods=['POST'])
 def clear_all_data():
     if 'user_id' not in session:
@@ -1378,37 +1397,33 @@ def clear_all_data():
     if session.get('role') != 'admin':
         return jsonify({'success': False, 'message': 'Admin privileges required'})
     
+    # Runs as a background job (see job_tasks.clear_all_data)
     try:
-        connection = get_db_connection()
-        if connection:
-            cursor = connection.cursor()
-            
-            # Delete all subjects first (due to foreign key constraint)
-            cursor.execute('DELETE FROM subjects')
-            subjects_deleted = cursor.rowcount
-            
-            # Delete all students
-            cursor.execute('DELETE FROM students')
-            students_deleted = cursor.rowcount
-            
-            # Reset auto-increment
-            cursor.execute('ALTER TABLE students AUTO_INCREMENT = 1')
-            cursor.execute('ALTER TABLE subjects AUTO_INCREMENT = 1')
-            
-            connection.commit()
-            cursor.close()
-            connection.close()
-            
-            return jsonify({
-                'success': True, 
-                'message': f'Successfully deleted {students_deleted} students and {subjects_deleted} subjects from database'
-            })
-        else:
-            return jsonify({'success': False, 'message': 'Database connection error'})
-            
+        return queued_job_response(job_queue.submit('clear_all_data', {}, session['user_id']))
     except Exception as e:
         return jsonify({'success': False, 'message': f'Error: {str(e)}'})
 
+@app.route('/api/db_pool_stats')
+def api_db_pool_stats():
+    if 'user_id' not in session or session.get('role') != 'admin':
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 403
+    
+    return jsonify({'success': True, 'stats': get_pool(app.config).stats()})
+
+@app.route('/api/verify_cache_stats')
+def api_verify_cache_stats():
+    if 'user_id' not in session or session.get('role') != 'admin':
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 403
+    
+    return jsonify({'success': True, 'stats': verify_cache.stats()})
+
+@app.route('/api/fragment_cache_stats')
+def api_fragment_cache_stats():
+    if 'user_id' not in session or session.get('role') != 'admin':
+        return jsonify({'success': False, 'message': 'Unauthorized'}), 403
+    
+    return jsonify({'success': True, 'stats': fragment_cache.stats()})
+
 # Test endpoint
 @app.route('/test-db')
 def test_db():
@@ -1463,6 +1478,117 @@ def init_database_setup():
         </html>
         """, 500
 
+@app.cli.command('rebuild-summary')
+def rebuild_summary_command():
+    """Recompute student_summary from the students table"""
+    with db_connection() as connection:
+        if not connection:
+            print("Could not connect to database")
+            return
+        classes = rebuild_summary(connection)
+    marksheets_changed()
+    print(f"Rebuilt student_summary: {classes} classes")
+
+@app.cli.command('regrade')
+@click.option('--dry-run', is_flag=True, help='Only count stored grades that disagree with the scheme')
+def regrade_command(dry_run):
+    """Regrade every marksheet under the active grading scheme and rebuild the summary"""
+    with db_connection() as connection:
+        if not connection:
+            print("Could not connect to database")
+            return
+        cursor = connection.cursor()
+        cursor.execute(f'SELECT COUNT(*) FROM students WHERE grade != {SCHEME.case_sql()}')
+        stale = cursor.fetchone()[0]
+        cursor.close()
+        print(f"{stale} students have a grade that differs from the scheme")
+        if dry_run:
+            return
+        
+        students, subjects = regrade(connection, SCHEME)
+        classes = rebuild_summary(connection)
+    marksheets_changed()
+    print(f"Regraded {students} students and {subjects} subjects; rebuilt student_summary: {classes} classes")
+
+@app.cli.command('moderate')
+@click.option('--subject', required=True, help='Subject name, exactly as stored')
+@click.option('--add', type=int, required=True, help='Marks to add (negative to deduct)')
+@click.option('--branch')
+@click.option('--semester')
+@click.option('--exam-type')
+@click.option('--after-id', type=int, default=0, help='Only students with a higher id (resumes a failed run)')
+@click.option('--apply', 'apply_changes', is_flag=True, help='Write the changes (default is a dry run)')
+def moderate_command(subject, add, branch, semester, exam_type, after_id, apply_changes):
+    """Add grace marks in one subject, capped at max_marks, and regrade the students"""
+    rule = parse_rule({'subject': subject, 'add': add, 'branch': branch, 'semester': semester, 'exam_type': exam_type,
+                       'after_id': after_id})
+    with db_connection() as connection:
+        if not connection:
+            print("Could not connect to database")
+            return
+        subjects, students = plan_moderation(connection, rule, SCHEME)
+        diff = moderation_diff(subjects, students, SCHEME.failing_grade, sample_size=20)
+        print(f"{diff['students_changed']} students / {diff['subjects_changed']} subjects change; "
+              f"{diff['grades_changed']} grades change ({diff['newly_passed']} newly pass, {diff['newly_failed']} newly fail)")
+        for transition in diff['grade_transitions']:
+            print(f"  {transition['from']} -> {transition['to']}: {transition['count']}")
+        if not apply_changes:
+            print("Dry run; pass --apply to write these changes")
+            return
+        
+        failed = None
+        try:
+            applied = apply_moderation(connection, subjects, students, app.config['MODERATION_CHUNK'])
+        except ModerationFailed as e:
+            applied, failed = e.applied, e
+        if applied:
+            rebuild_summary(connection)
+    marksheets_changed()
+    print(f"Moderated {applied} students")
+    if failed:
+        print(f"Failed after that: {failed}")
+        print(f"Re-run with --after-id {failed.last_id} to moderate the rest")
+        raise SystemExit(1)
+
+@app.cli.command('verify-qr')
+@click.argument('token')
+def verify_qr_command(token):
+    """Check a scanned marksheet QR code (token or URL) offline"""
+    try:
+        result = verify_token(token, app.config['MARKSHEET_SIGNING_KEY'])
+    except SigningKeyMissing as e:
+        print(e)
+        raise SystemExit(2)
+    except InvalidToken as e:
+        print(f"INVALID: {e}")
+        raise SystemExit(1)
+    print(f"VALID: student {result['student_id']}, roll no {result['roll_no']}, "
+          f"{result['percentage']}% grade {result['grade']} (marks hash {result['marks_digest']})")
+
+@app.cli.command('migrate')
+def migrate_command():
+    """Apply pending schema migrations"""
+    with db_connection() as connection:
+        if not connection:
+            print("Could not connect to database")
+            return
+        applied = migrate(connection)
+    print(f"Applied migrations: {applied}" if applied else "Schema is up to date")
+
+@app.cli.command('check-indexes')
+def check_indexes_command():
+    """EXPLAIN the hot queries and fail if any of them scans all of students"""
+    with db_connection() as connection:
+        if not connection:
+            print("Could not connect to database")
+            raise SystemExit(1)
+        failures = check_query_plans(connection)
+    for name, plan in failures:
+        print(f"Full table scan: {name} ({plan})")
+    if failures:
+        raise SystemExit(1)
+    print("All hot queries use an index")
+
 if __name__ == '__main__':
     try:
         init_db()
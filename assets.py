@@ -0,0 +1,109 @@
+"""
+Registry of the signature and seal images printed on marksheets
+
+The images in UPLOAD_FOLDER are read, validated and scaled down once (at
+startup or when a new one is uploaded) and then kept in memory as PNG
+bytes with a content hash. Pages link to them through /assets/<name>?v=<hash>
+so browsers can cache them for good, and the PDF renderer embeds the same
+bytes without touching the disk.
+
+An upload in one worker bumps ASSET_VERSION_FILE; the other workers see the
+new mtime on their next lookup and reload.
+"""
+
+import io
+import os
+import hashlib
+import threading
+from collections import namedtuple
+
+from PIL import Image, UnidentifiedImageError
+
+from data_version import DataVersion
+
+# name -> (file in UPLOAD_FOLDER, maximum (width, height) kept in memory)
+ASSET_FILES = {
+    'teacher_signature': ('teachersign.png', (600, 200)),
+    'principal_signature': ('principalsign.png', (600, 200)),
+    'college_seal': ('collegeseal.png', (360, 360)),
+}
+
+# Refuse anything larger before decoding it
+MAX_SOURCE_PIXELS = 25_000_000
+
+Asset = namedtuple('Asset', ['name', 'png', 'width', 'height', 'etag'])
+
+
+def prepare_image(source, max_size):
+    """Validate an image file and return it as a scaled-down RGBA PNG (bytes, width, height).
+
+    Raises ValueError if `source` is not a usable image.
+    """
+    try:
+        with Image.open(source) as image:
+            if image.width * image.height > MAX_SOURCE_PIXELS:
+                raise ValueError('Image is too large')
+            image = image.convert('RGBA')
+    except (UnidentifiedImageError, OSError, Image.DecompressionBombError) as e:
+        raise ValueError(f'Not a valid image: {e}')
+
+    image.thumbnail(max_size, Image.LANCZOS)
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG', optimize=True)
+    return buffer.getvalue(), image.width, image.height
+
+
+class AssetRegistry:
+    def __init__(self, folder, version_file):
+        self.folder = folder
+        self.version = DataVersion(version_file)
+        self._assets = {}
+        self._loaded_version = None
+        self._lock = threading.Lock()
+
+    def get(self, name):
+        """The Asset for `name`, or None if it has not been uploaded"""
+        self._ensure_current()
+        return self._assets.get(name)
+
+    def render_assets(self):
+        """{name: (etag, png)} for the PDF renderer (picklable for worker processes)"""
+        self._ensure_current()
+        return {name: (asset.etag, asset.png) for name, asset in self._assets.items()}
+
+    def store(self, name, source):
+        """Validate an uploaded image, save it to UPLOAD_FOLDER and publish it to every worker"""
+        filename, max_size = ASSET_FILES[name]
+        png, _, _ = prepare_image(source, max_size)
+        path = os.path.join(self.folder, filename)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(png)
+        os.replace(tmp_path, path)
+        self.version.bump()
+        self._ensure_current()
+        return self._assets[name]
+
+    def _ensure_current(self):
+        version = self.version.current()
+        if version == self._loaded_version:
+            return
+        with self._lock:
+            if version != self._loaded_version:
+                self._assets = self._load()
+                self._loaded_version = version
+
+    def _load(self):
+        assets = {}
+        for name, (filename, max_size) in ASSET_FILES.items():
+            path = os.path.join(self.folder, filename)
+            if not os.path.exists(path):
+                continue
+            try:
+                png, width, height = prepare_image(path, max_size)
+            except ValueError as e:
+                print(f"Skipping asset {filename}: {e}")
+                continue
+            etag = hashlib.sha256(png).hexdigest()[:16]
+            assets[name] = Asset(name, png, width, height, etag)
+        return assets
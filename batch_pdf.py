@@ -0,0 +1,116 @@
+"""
+Whole-class marksheet generation
+
+Rows for a class are fetched with two set-based queries, then pages are
+rendered in the render process pool and streamed to the client as each one
+finishes.
+"""
+
+import io
+import zipfile
+from concurrent.futures import as_completed
+
+from pdf_cache import marksheet_fingerprint
+from pdf_render import render_marksheet_pdf_bytes
+
+BATCH_FILTERS = ('branch', 'semester', 'exam_type')
+
+
+def fetch_class_rows(connection, filters, limit):
+    """Return [(student, subjects), ...] for every student matching `filters`.
+
+    Uses one query for the students and one for all of their subjects,
+    instead of two queries per student.
+    """
+    where = ' AND '.join(f'st.{column} = %s' for column in filters)
+    params = list(filters.values())
+
+    cursor = connection.cursor(dictionary=True)
+    cursor.execute(f'''
+        SELECT st.* FROM students st
+        WHERE {where}
+        ORDER BY st.roll_no
+        LIMIT %s
+    ''', params + [limit])
+    students = cursor.fetchall()
+
+    subjects_by_student = {student['id']: [] for student in students}
+    if students:
+        cursor.execute(f'''
+            SELECT sub.* FROM subjects sub
+            JOIN students st ON sub.student_id = st.id
+            WHERE {where}
+            ORDER BY sub.student_id, sub.id
+        ''', params)
+        for subject in cursor.fetchall():
+            if subject['student_id'] in subjects_by_student:
+                subjects_by_student[subject['student_id']].append(subject)
+    cursor.close()
+
+    return [(student, subjects_by_student[student['id']]) for student in students]
+
+
+class _ZipStream(io.RawIOBase):
+    """Unseekable sink that lets ZipFile write entries we can yield immediately"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def stream_class_zip(entries, executor, pdf_cache, config, qr_url_for, qr_cache, assets=None):
+    """Yield a ZIP of per-student PDFs, adding each PDF as soon as it is rendered.
+
+    Already-cached marksheets are read from the PDF cache; fresh renders are
+    stored back into it. `qr_url_for(student, subjects)` gives the content of
+    each marksheet's verification QR code; its image comes from `qr_cache`
+    and is only needed for marksheets that have to be rendered. `assets` are
+    the signature and seal images shared by every page.
+    """
+    sink = _ZipStream()
+    archive = zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_STORED)
+    futures = {}
+    try:
+        for student, subjects in entries:
+            qr_url = qr_url_for(student, subjects)
+            cache_key = marksheet_fingerprint(student, subjects, config, qr_url, assets)
+            filename = f"marksheet_{student['roll_no']}.pdf"
+            cached_path = pdf_cache.get(student['id'], cache_key)
+            if cached_path:
+                with open(cached_path, 'rb') as f:
+                    archive.writestr(filename, f.read())
+                yield sink.drain()
+            else:
+                future = executor.submit(render_marksheet_pdf_bytes, student, subjects, config['COLLEGE_NAME'],
+                                         qr_cache.png(qr_url), assets)
+                futures[future] = (student['id'], cache_key, filename)
+
+        for future in as_completed(futures):
+            student_id, cache_key, filename = futures[future]
+            data = future.result()
+            archive.writestr(filename, data)
+            pdf_cache.put(student_id, cache_key, lambda path: _write_bytes(path, data))
+            yield sink.drain()
+
+        archive.close()
+        yield sink.drain()
+    finally:
+        # Client went away or a render failed - drop the remaining work
+        for future in futures:
+            future.cancel()
+
+
+def _write_bytes(path, data):
+    with open(path, 'wb') as f:
+        f.write(data)
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: marksheet PDF render time and allocations
+
+Compares building the ReportLab styles on every render (the old
+download_pdf() behaviour) with reusing the shared marksheet_layout.LAYOUT.
+
+    python benchmarks/bench_pdf_render.py [renders]
+"""
+
+import io
+import os
+import sys
+import time
+import datetime
+import tracemalloc
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from marksheet_layout import LAYOUT, build_layout
+from pdf_render import render_marksheet_pdf
+
+STUDENT = {
+    'id': 1,
+    'name': 'Benchmark Student',
+    'roll_no': 'BENCH001',
+    'branch': 'CSE',
+    'semester': '5',
+    'exam_type': 'End Semester',
+    'total_marks': 412,
+    'max_marks': 500,
+    'percentage': Decimal('82.40'),
+    'grade': 'A',
+    'remarks': 'Excellent Performance',
+    'date_created': datetime.datetime(2024, 6, 1),
+    'class_teacher': 'Class Teacher',
+    'principal': 'Principal',
+}
+SUBJECTS = [
+    {'id': i, 'student_id': 1, 'subject_name': f'Subject {i}', 'marks': 80 + i, 'max_marks': 100, 'grade': 'A'}
+    for i in range(1, 6)
+]
+COLLEGE_NAME = 'Benchmark College'
+
+
+def render(layout):
+    buffer = io.BytesIO()
+    render_marksheet_pdf(STUDENT, SUBJECTS, buffer, COLLEGE_NAME, layout)
+    return buffer.getvalue()
+
+
+def per_render_layout():
+    """Old behaviour: styles rebuilt for every document"""
+    return render(build_layout())
+
+
+def shared_layout():
+    return render(LAYOUT)
+
+
+def measure(label, func, renders):
+    func()  # Warm up fonts and module caches
+
+    started = time.perf_counter()
+    for _ in range(renders):
+        func()
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, 'filename') if stat.size_diff > 0)
+
+    print(f'{label:<22} {elapsed * 1000 / renders:8.2f} ms/pdf   '
+          f'peak {peak / 1024:8.1f} KiB   retained {allocated / 1024:8.1f} KiB')
+    return elapsed
+
+
+def main():
+    renders = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    assert render(LAYOUT).startswith(b'%PDF')
+
+    print(f'{renders} renders of a 5-subject marksheet')
+    before = measure('styles per render', per_render_layout, renders)
+    after = measure('shared layout', shared_layout, renders)
+    print(f'speed-up: {before / after:.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: memory and JSON time of a large student listing
+
+Compares, on the same projected columns, __slots__ records (records.py,
+used for template-rendered pages) with projected dicts (dictionary-cursor
+rows, used for JSON listings), plus the old `SELECT *` dicts as a baseline.
+Rows are synthesized as the tuples mysql-connector returns, so no database
+is needed. Records are serialized by converting each to a dict, which is
+what any encoder for them has to do.
+
+    python benchmarks/bench_records.py [rows]
+"""
+
+import os
+import sys
+import time
+import datetime
+import tracemalloc
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+from records import LISTING
+
+STUDENT_COLUMNS = ('id', 'name', 'roll_no', 'branch', 'semester', 'exam_type', 'total_marks', 'max_marks',
+                   'percentage', 'grade', 'remarks', 'date_created', 'class_teacher', 'principal')
+
+
+def db_tuples(count):
+    """What a `SELECT *` on students returns, one tuple per row"""
+    created = datetime.datetime(2024, 6, 1, 10, 30)
+    return [
+        (i, f'Student {i}', f'BENCH{i:06d}', 'CSE', str(i % 8 + 1), 'End Semester', 150 + i % 350, 500,
+         Decimal(f'{30 + i % 70}.{i % 100:02d}'), 'B', 'Good performance, keep it up', created,
+         'Class Teacher', 'Principal')
+        for i in range(count)
+    ]
+
+
+def projected_tuples(tuples):
+    """What the projected SELECT returns"""
+    indexes = [STUDENT_COLUMNS.index(column) for column in LISTING.columns]
+    return [tuple(row[i] for i in indexes) for row in tuples]
+
+
+def select_all_dicts(tuples):
+    """Old behaviour: cursor(dictionary=True) builds a dict of every column per row"""
+    return [dict(zip(STUDENT_COLUMNS, row)) for row in tuples]
+
+
+def projected_dicts(tuples):
+    return [dict(zip(LISTING.columns, row)) for row in tuples]
+
+
+def record_dicts(rows):
+    columns = LISTING.columns
+    return [{column: getattr(row, column) for column in columns} for row in rows]
+
+
+def measure(label, tuples, build, encode=lambda rows: rows):
+    provider = DefaultJSONProvider(Flask(__name__))
+    provider.dumps({'students': encode(build(tuples))})  # Warm up
+
+    started = time.perf_counter()
+    rows = build(tuples)
+    built = time.perf_counter() - started
+    del rows
+
+    # Timed above without tracing, which would slow the build down
+    tracemalloc.start()
+    rows = build(tuples)
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    started = time.perf_counter()
+    body = provider.dumps({'success': True, 'students': encode(rows)})
+    elapsed = time.perf_counter() - started
+
+    print(f'{label:<24} rows {retained / 1024 / 1024:7.1f} MiB   build {built * 1000:7.1f} ms   '
+          f'json {elapsed * 1000:8.1f} ms   body {len(body) / 1024 / 1024:6.1f} MiB')
+    return retained, built + elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    tuples = db_tuples(count)
+    projected = projected_tuples(tuples)
+
+    print(f'{count} student rows')
+    measure('dicts, SELECT *', tuples, select_all_dicts)
+    dicts = measure('dicts, projected', projected, projected_dicts)
+    records = measure('records, projected', projected, LISTING.rows, record_dicts)
+    print(f'records vs projected dicts: memory {dicts[0] / records[0]:.2f}x smaller, '
+          f'build + json {records[1] / dicts[1]:.2f}x the time')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,217 @@
+"""
+Batched marksheet ingestion
+
+Each chunk is validated row by row, then graded in one pass per chunk
+(one array lookup for the students and one for all of their subjects).
+Students are inserted with one multi-row INSERT per chunk, their ids are
+read back with one query by roll number, and all of the chunk's subjects go
+in with one more multi-row INSERT; the chunk's totals are added to
+student_summary before it commits. Each chunk is its own transaction. If a
+chunk fails (for example a roll number inserted concurrently), it is retried
+row by row so that only the offending rows are reported.
+"""
+
+from itertools import islice
+
+import mysql.connector
+
+from summary import record_students
+
+STUDENT_INSERT = '''
+    INSERT INTO students (name, roll_no, branch, semester, exam_type,
+                          total_marks, max_marks, percentage, grade, remarks,
+                          class_teacher, principal)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+'''
+
+SUBJECT_INSERT = '''
+    INSERT INTO subjects (student_id, subject_name, marks, max_marks, grade)
+    VALUES (%s, %s, %s, %s, %s)
+'''
+
+
+def prepare_marksheet(student_data):
+    """Validate one imported student and compute its totals.
+
+    Returns (student_row, subject_rows) where subject rows do not yet carry
+    the student id, and grades and remarks are None until grade_marksheets()
+    fills them in. Raises ValueError describing the first problem found.
+    """
+    row = {}
+    for field in ('student_name', 'roll_no', 'branch', 'semester', 'exam_type'):
+        value = str(student_data.get(field) or '').strip()
+        if not value:
+            raise ValueError(f'Missing {field}')
+        row[field] = value
+
+    subjects = student_data.get('subjects') or []
+    if not subjects:
+        raise ValueError('No subjects')
+
+    subject_rows = []
+    total_marks = 0
+    max_marks = 0
+    for subject in subjects:
+        name = str(subject.get('name') or '').strip()
+        try:
+            marks = int(subject['marks'])
+            subject_max = int(subject['max_marks'])
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f'Invalid marks for subject {name or "?"}')
+        if not name:
+            raise ValueError('Subject without a name')
+        if subject_max <= 0 or not 0 <= marks <= subject_max:
+            raise ValueError(f'Marks for {name} must be between 0 and {subject_max}')
+
+        subject_rows.append((name, marks, subject_max, None))
+        total_marks += marks
+        max_marks += subject_max
+
+    student_row = (
+        row['student_name'], row['roll_no'], row['branch'], row['semester'], row['exam_type'],
+        total_marks, max_marks, round(total_marks / max_marks * 100, 2), None, None,
+        student_data.get('class_teacher', ''), student_data.get('principal', ''),
+    )
+    return student_row, subject_rows
+
+
+def grade_marksheets(marksheets, scheme):
+    """Fill in grades for prepared (student_row, subject_rows) pairs with two array lookups"""
+    subject_grades = iter(scheme.grade_array([
+        marks / subject_max * 100
+        for _, subject_rows in marksheets
+        for _, marks, subject_max, _ in subject_rows
+    ]))
+    # Students are graded on the percentage as stored (two decimals)
+    grades, remarks = scheme.grade_and_remarks_array([student_row[7] for student_row, _ in marksheets])
+    return [
+        (student_row[:8] + (grade, remark) + student_row[10:],
+         [subject_row[:3] + (next(subject_grades),) for subject_row in subject_rows])
+        for (student_row, subject_rows), grade, remark in zip(marksheets, grades, remarks)
+    ]
+
+
+def new_report():
+    return {'created_count': 0, 'duplicate_count': 0, 'error_count': 0, 'duplicates': [], 'errors': []}
+
+
+def merge_report(total, part, max_reported=None):
+    """Add a chunk's report to a running total, keeping at most max_reported entries per list"""
+    total['created_count'] += part['created_count']
+    for key in ('duplicates', 'errors'):
+        total[f'{key[:-1]}_count'] += len(part[key])
+        room = len(part[key]) if max_reported is None else max(max_reported - len(total[key]), 0)
+        total[key].extend(part[key][:room])
+    return total
+
+
+def bulk_insert_marksheets(connection, students_data, scheme, chunk_size=500, progress=None):
+    """Insert imported students in chunks and return a per-row report.
+
+    `students_data` may be any iterable (e.g. rows streamed from a staged
+    import); only one chunk is held in memory at a time. `progress(rows_done,
+    report)` is called after each committed chunk with the running report.
+    """
+    report = new_report()
+    rows = iter(students_data)
+    start = 0
+    cursor = connection.cursor()
+    try:
+        while True:
+            chunk = list(islice(rows, chunk_size))
+            if not chunk:
+                break
+            _insert_chunk(connection, cursor, chunk, start, scheme, report)
+            start += len(chunk)
+            if progress:
+                progress(start, report)
+    finally:
+        cursor.close()
+    report['duplicate_count'] = len(report['duplicates'])
+    report['error_count'] = len(report['errors'])
+    return report
+
+
+def _insert_chunk(connection, cursor, chunk, offset, scheme, report):
+    # Validate and drop roll numbers repeated within the chunk
+    prepared = []
+    seen = set()
+    for index, student_data in enumerate(chunk, offset):
+        # Spreadsheet row when the data came from a sheet, else 1-based position
+        row = student_data.get('row', index + 1)
+        try:
+            student_row, subject_rows = prepare_marksheet(student_data)
+        except ValueError as e:
+            report['errors'].append({'row': row, 'roll_no': student_data.get('roll_no'), 'error': str(e)})
+            continue
+        if student_row[1] in seen:
+            report['duplicates'].append({'row': row, 'roll_no': student_row[1]})
+            continue
+        seen.add(student_row[1])
+        prepared.append((row, student_row, subject_rows))
+
+    if not prepared:
+        return
+
+    # Skip roll numbers that are already in the database
+    existing = _existing_roll_numbers(cursor, [student_row[1] for _, student_row, _ in prepared])
+    if existing:
+        for row, student_row, _ in prepared:
+            if student_row[1] in existing:
+                report['duplicates'].append({'row': row, 'roll_no': student_row[1]})
+        prepared = [entry for entry in prepared if entry[1][1] not in existing]
+        if not prepared:
+            return
+
+    graded = grade_marksheets([(student_row, subject_rows) for _, student_row, subject_rows in prepared], scheme)
+    prepared = [(row, student_row, subject_rows) for (row, _, _), (student_row, subject_rows) in zip(prepared, graded)]
+
+    try:
+        cursor.executemany(STUDENT_INSERT, [student_row for _, student_row, _ in prepared])
+        ids = _ids_by_roll_number(cursor, [student_row[1] for _, student_row, _ in prepared])
+        cursor.executemany(SUBJECT_INSERT, [
+            (ids[student_row[1]],) + subject_row
+            for _, student_row, subject_rows in prepared
+            for subject_row in subject_rows
+        ])
+        record_students(cursor, [_summary_key(student_row) for _, student_row, _ in prepared])
+        connection.commit()
+        report['created_count'] += len(prepared)
+    except mysql.connector.Error:
+        connection.rollback()
+        _insert_rows_individually(connection, cursor, prepared, report)
+
+
+def _insert_rows_individually(connection, cursor, prepared, report):
+    """Slow path for a failed chunk: isolate the rows that cannot be inserted"""
+    for row, student_row, subject_rows in prepared:
+        try:
+            cursor.execute(STUDENT_INSERT, student_row)
+            student_id = cursor.lastrowid
+            cursor.executemany(SUBJECT_INSERT, [(student_id,) + subject_row for subject_row in subject_rows])
+            record_students(cursor, [_summary_key(student_row)])
+            connection.commit()
+            report['created_count'] += 1
+        except mysql.connector.IntegrityError:
+            connection.rollback()
+            report['duplicates'].append({'row': row, 'roll_no': student_row[1]})
+        except mysql.connector.Error as e:
+            connection.rollback()
+            report['errors'].append({'row': row, 'roll_no': student_row[1], 'error': str(e)})
+
+
+def _summary_key(student_row):
+    # (branch, semester, exam_type, percentage, grade)
+    return student_row[2:5] + student_row[7:9]
+
+
+def _existing_roll_numbers(cursor, roll_numbers):
+    placeholders = ', '.join(['%s'] * len(roll_numbers))
+    cursor.execute(f'SELECT roll_no FROM students WHERE roll_no IN ({placeholders})', roll_numbers)
+    return {row[0] for row in cursor.fetchall()}
+
+
+def _ids_by_roll_number(cursor, roll_numbers):
+    placeholders = ', '.join(['%s'] * len(roll_numbers))
+    cursor.execute(f'SELECT roll_no, id FROM students WHERE roll_no IN ({placeholders})', roll_numbers)
+    return dict(cursor.fetchall())
@@ -0,0 +1,87 @@
+"""
+Bulk verification for institutions
+
+Roll numbers (or student ids) are resolved VERIFY_BULK_CHUNK at a time with
+one students query and one subjects query per chunk, and each input value
+gets a compact result in the order it was given. Results are produced per
+chunk so the NDJSON response can stream them as they are resolved.
+"""
+
+# Request field -> students column it is matched against
+BULK_KEYS = {'roll_numbers': 'roll_no', 'ids': 'id'}
+
+RESULT_FIELDS = ('id', 'name', 'roll_no', 'branch', 'semester', 'exam_type',
+                 'total_marks', 'max_marks', 'percentage', 'grade')
+
+
+def parse_bulk_request(data, max_items):
+    """Return (column, values) from a request body, or raise ValueError"""
+    keys = [key for key in BULK_KEYS if data.get(key)]
+    if len(keys) != 1:
+        raise ValueError('Provide exactly one of: ' + ', '.join(BULK_KEYS))
+    values = data[keys[0]]
+    if not isinstance(values, list):
+        raise ValueError(f'{keys[0]} must be a list')
+    if len(values) > max_items:
+        raise ValueError(f'At most {max_items} records can be verified per request')
+
+    column = BULK_KEYS[keys[0]]
+    if column == 'id':
+        try:
+            values = [int(value) for value in values]
+        except (TypeError, ValueError):
+            raise ValueError('ids must be integers')
+    else:
+        values = [str(value).strip() for value in values]
+    return column, values
+
+
+def iter_verifications(connection, column, values, chunk_size, include_subjects=True):
+    """Yield one list of results per chunk of `values`"""
+    cursor = connection.cursor(dictionary=True)
+    try:
+        for start in range(0, len(values), chunk_size):
+            chunk = values[start:start + chunk_size]
+            yield _verify_chunk(cursor, column, chunk, include_subjects)
+    finally:
+        cursor.close()
+
+
+def _verify_chunk(cursor, column, chunk, include_subjects):
+    unique = list(dict.fromkeys(chunk))
+    placeholders = ', '.join(['%s'] * len(unique))
+    cursor.execute(f'''
+        SELECT {', '.join(RESULT_FIELDS)}, date_created
+        FROM students WHERE {column} IN ({placeholders})
+    ''', unique)
+    # roll_no comparisons in MySQL ignore case, so match them the same way here
+    key = (lambda value: value.lower()) if column == 'roll_no' else (lambda value: value)
+    students = {key(student[column]): student for student in cursor.fetchall()}
+
+    subjects = {}
+    if include_subjects and students:
+        ids = [student['id'] for student in students.values()]
+        cursor.execute(f'''
+            SELECT student_id, subject_name, marks, max_marks, grade
+            FROM subjects WHERE student_id IN ({', '.join(['%s'] * len(ids))})
+            ORDER BY student_id, id
+        ''', ids)
+        for subject in cursor.fetchall():
+            subjects.setdefault(subject['student_id'], []).append(
+                [subject['subject_name'], subject['marks'], subject['max_marks'], subject['grade']])
+
+    results = []
+    for value in chunk:
+        student = students.get(key(value))
+        if not student:
+            results.append({'query': value, 'verified': False})
+            continue
+        record = {field: student[field] for field in RESULT_FIELDS}
+        record['percentage'] = float(record['percentage'])
+        record['issued'] = student['date_created'].strftime('%Y-%m-%d') if student['date_created'] else None
+        result = {'query': value, 'verified': True, 'student': record}
+        if include_subjects:
+            # [subject_name, marks, max_marks, grade]
+            result['subjects'] = subjects.get(student['id'], [])
+        results.append(result)
+    return results
@@ -18,11 +18,78 @@ class Config:
     MYSQL_PASSWORD = os.environ.get('MYSQL_PASSWORD') or ''  # Empty password for local MySQL
     MYSQL_DATABASE = os.environ.get('MYSQL_DATABASE') or 'marksheet_db'
     
+    # Connection pool (per gunicorn worker process)
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))                   # idle connections kept open
+    DB_POOL_MAX_OVERFLOW = int(os.environ.get('DB_POOL_MAX_OVERFLOW', 10))  # extra connections under burst
+    DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', 10))          # seconds to wait for a free connection
+    DB_POOL_IDLE_TIMEOUT = int(os.environ.get('DB_POOL_IDLE_TIMEOUT', 300))  # seconds before an idle connection is dropped
+    DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', 'True').lower() == 'true'
+    
     # Upload Configuration
     UPLOAD_FOLDER = 'static/uploads'
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg'}
     
+    # Bulk import
+    BULK_INSERT_CHUNK_SIZE = int(os.environ.get('BULK_INSERT_CHUNK_SIZE', 500))  # students per INSERT/transaction
+    IMPORT_STAGING_FOLDER = os.environ.get('IMPORT_STAGING_FOLDER', 'import_staging')  # parsed imports awaiting commit
+    IMPORT_STAGING_TTL = int(os.environ.get('IMPORT_STAGING_TTL', 24 * 3600))          # seconds before uncommitted imports expire
+    IMPORT_PREVIEW_ROWS = int(os.environ.get('IMPORT_PREVIEW_ROWS', 20))               # rows per preview page
+    IMPORT_MAX_REPORTED_ERRORS = int(os.environ.get('IMPORT_MAX_REPORTED_ERRORS', 1000))  # per list in an import report
+    STREAM_IMPORT_CHUNK_ROWS = int(os.environ.get('STREAM_IMPORT_CHUNK_ROWS', 2000))      # sheet rows parsed at a time
+    STREAM_IMPORT_MAX_CONTENT_LENGTH = int(os.environ.get('STREAM_IMPORT_MAX_CONTENT_LENGTH', 1024 * 1024 * 1024))
+    
+    # Data export
+    EXPORT_BATCH_ROWS = int(os.environ.get('EXPORT_BATCH_ROWS', 1000))  # rows fetched and written per batch
+    
+    # Listings (history, search, at-risk and star lists)
+    LISTING_PAGE_SIZE = int(os.environ.get('LISTING_PAGE_SIZE', 50))          # rows per page by default
+    LISTING_MAX_PAGE_SIZE = int(os.environ.get('LISTING_MAX_PAGE_SIZE', 200)) # largest ?limit= accepted
+    
+    # Search
+    SEARCH_SUGGEST_LIMIT = int(os.environ.get('SEARCH_SUGGEST_LIMIT', 8))   # typeahead suggestions
+    
+    # Caching
+    DATA_VERSION_FILE = os.environ.get('DATA_VERSION_FILE', 'data_version.stamp')  # touched on every marksheet write
+    ANALYTICS_CACHE_TTL = int(os.environ.get('ANALYTICS_CACHE_TTL', 60))          # seconds a dashboard snapshot is reused
+    VERIFY_CACHE_SIZE = int(os.environ.get('VERIFY_CACHE_SIZE', 10000))            # verification lookups kept per worker
+    VERIFY_CACHE_SHARED_PATH = os.environ.get('VERIFY_CACHE_SHARED_PATH', '')      # SQLite file shared by workers ('' = off)
+    FRAGMENT_CACHE_SIZE = int(os.environ.get('FRAGMENT_CACHE_SIZE', 2000))         # rendered marksheet bodies kept per worker
+    
+    # Bulk verification API
+    VERIFY_BULK_MAX = int(os.environ.get('VERIFY_BULK_MAX', 5000))      # records per request
+    VERIFY_BULK_CHUNK = int(os.environ.get('VERIFY_BULK_CHUNK', 500))   # records per IN (...) query
+    VERIFY_API_KEY = os.environ.get('VERIFY_API_KEY', '')               # X-API-Key for lookups by id ('' = logged-in users only)
+    
+    # Grace marks / moderation
+    MODERATION_CHUNK = int(os.environ.get('MODERATION_CHUNK', 1000))    # students per transaction
+    MODERATION_SAMPLE = int(os.environ.get('MODERATION_SAMPLE', 100))   # students listed in a dry-run diff
+    
+    # Background jobs (imports, bulk creation, exports, clearing data)
+    JOBS_DB_PATH = os.environ.get('JOBS_DB_PATH', 'jobs.sqlite3')   # SQLite job table shared by all workers
+    JOBS_FOLDER = os.environ.get('JOBS_FOLDER', 'jobs')             # uploads and export files of jobs
+    JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 2))             # job processes per web worker
+    JOB_TTL = int(os.environ.get('JOB_TTL', 24 * 3600))             # seconds before finished jobs are removed
+    JOB_EVENTS_INTERVAL = float(os.environ.get('JOB_EVENTS_INTERVAL', 0.5))         # seconds between progress checks
+    JOB_EVENTS_STREAM_SECONDS = int(os.environ.get('JOB_EVENTS_STREAM_SECONDS', 15))  # per event stream; each holds a worker thread
+    JOB_EVENTS_RETRY_MS = int(os.environ.get('JOB_EVENTS_RETRY_MS', 1000))            # browser reconnect delay
+    
+    # Background PDF rendering
+    PDF_JOBS_FOLDER = os.environ.get('PDF_JOBS_FOLDER', 'render_jobs')       # shared by all workers
+    PDF_RENDER_WORKERS = int(os.environ.get('PDF_RENDER_WORKERS', 2))        # render processes per web worker
+    PDF_JOB_TTL = int(os.environ.get('PDF_JOB_TTL', 3600))                   # seconds before finished jobs are removed
+    PDF_BATCH_MAX_STUDENTS = int(os.environ.get('PDF_BATCH_MAX_STUDENTS', 2000))  # per class print job
+    PDF_CACHE_FOLDER = os.environ.get('PDF_CACHE_FOLDER', 'pdf_cache')
+    PDF_CACHE_MAX_BYTES = int(os.environ.get('PDF_CACHE_MAX_BYTES', 512 * 1024 * 1024))
+    
+    # Signed QR codes on marksheets
+    MARKSHEET_SIGNING_KEY = os.environ.get('MARKSHEET_SIGNING_KEY', '')  # HMAC key for QR tokens (required; never SECRET_KEY)
+    VERIFY_BASE_URL = os.environ.get('VERIFY_BASE_URL', '')     # public URL for QR links ('' = request host)
+    QR_CACHE_FOLDER = os.environ.get('QR_CACHE_FOLDER', 'qr_cache')
+    
+    # Signature and seal images (kept in memory; uploads bump this stamp so every worker reloads)
+    ASSET_VERSION_FILE = os.environ.get('ASSET_VERSION_FILE', 'assets.stamp')
+    
     # College Information
     COLLEGE_NAME = os.environ.get('COLLEGE_NAME', "GULZAR GROUP OF INSTITUTIONS")
     COLLEGE_ADDRESS = os.environ.get('COLLEGE_ADDRESS', "Academic Excellence Since 1995")
@@ -0,0 +1,116 @@
+"""
+Streaming data export
+
+Rows are read with an unbuffered cursor (the MySQL client equivalent of a
+server-side cursor) in EXPORT_BATCH_ROWS batches and written out as they
+arrive, so memory use does not depend on the size of the tables.
+
+CSV and NDJSON are streamed to the client directly. XLSX is written with
+openpyxl's write-only mode into a temporary file that is streamed and then
+deleted; nothing is left behind in static/uploads.
+"""
+
+import io
+import csv
+import json
+import tempfile
+
+from openpyxl import Workbook
+
+EXPORT_FILTERS = ('branch', 'semester', 'exam_type')
+EXPORT_FORMATS = ('xlsx', 'csv', 'ndjson')
+EXPORT_TABLES = ('students', 'subjects')
+
+SEND_CHUNK_BYTES = 64 * 1024
+
+
+def _table_query(table, filters):
+    where = ' AND '.join(f'st.{column} = %s' for column in filters) or '1=1'
+    if table == 'students':
+        query = f'SELECT st.* FROM students st WHERE {where} ORDER BY st.id'
+    else:
+        query = f'''
+            SELECT sub.* FROM subjects sub
+            JOIN students st ON sub.student_id = st.id
+            WHERE {where}
+            ORDER BY sub.student_id, sub.id
+        '''
+    return query, list(filters.values())
+
+
+def count_rows(connection, table, filters):
+    """Number of rows iter_table() will yield for `table`"""
+    query, params = _table_query(table, filters)
+    cursor = connection.cursor()
+    try:
+        cursor.execute(f'SELECT COUNT(*) FROM ({query}) counted', params)
+        return cursor.fetchone()[0]
+    finally:
+        cursor.close()
+
+
+def iter_table(connection, table, filters, batch_size, on_batch=None):
+    """Yield the column names, then batches of row tuples; on_batch(rows) is called per batch"""
+    query, params = _table_query(table, filters)
+    cursor = connection.cursor(buffered=False)
+    try:
+        cursor.execute(query, params)
+        yield list(cursor.column_names)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            if on_batch:
+                on_batch(len(rows))
+            yield rows
+    finally:
+        cursor.close()
+
+
+def stream_csv(connection, table, filters, batch_size, on_batch=None):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for batch in _batches_with_header(connection, table, filters, batch_size, on_batch):
+        writer.writerows(batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def stream_ndjson(connection, filters, batch_size, on_batch=None):
+    """Every row of both tables, one JSON object per line tagged with its table"""
+    for table in EXPORT_TABLES:
+        batches = iter_table(connection, table, filters, batch_size, on_batch)
+        columns = next(batches)
+        for rows in batches:
+            lines = []
+            for row in rows:
+                record = dict(zip(columns, row))
+                record['table'] = table
+                lines.append(json.dumps(record, default=str))
+            yield '\n'.join(lines) + '\n'
+
+
+def stream_xlsx(connection, filters, batch_size, on_batch=None):
+    """Write a two-sheet workbook to a temp file, then stream it"""
+    workbook = Workbook(write_only=True)
+    for table in EXPORT_TABLES:
+        sheet = workbook.create_sheet(title=table.capitalize())
+        for batch in _batches_with_header(connection, table, filters, batch_size, on_batch):
+            for row in batch:
+                sheet.append(row)
+
+    with tempfile.TemporaryFile() as spool:
+        workbook.save(spool)
+        spool.seek(0)
+        while True:
+            data = spool.read(SEND_CHUNK_BYTES)
+            if not data:
+                break
+            yield data
+
+
+def _batches_with_header(connection, table, filters, batch_size, on_batch=None):
+    batches = iter_table(connection, table, filters, batch_size, on_batch)
+    yield [next(batches)]
+    yield from batches
@@ -0,0 +1,31 @@
+"""
+Shared "marksheet data changed" marker
+
+Every write to students/subjects bumps the mtime of one small file. Caches
+compare it with the version they were built at, so a write in one gunicorn
+worker invalidates caches in all of them for the price of one stat() call.
+"""
+
+import os
+import time
+
+
+class DataVersion:
+    def __init__(self, path):
+        self.path = path
+        if not os.path.exists(path):
+            self.bump()
+
+    def current(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return 0
+
+    def bump(self):
+        now = time.time_ns()
+        # Strictly increase even if two writes land in the same clock tick
+        now = max(now, self.current() + 1)
+        with open(self.path, 'a'):
+            pass
+        os.utime(self.path, ns=(now, now))
@@ -0,0 +1,259 @@
+"""
+MySQL connection pool for the Student Marksheet Generator
+
+Connections are opened lazily up to DB_POOL_SIZE + DB_POOL_MAX_OVERFLOW,
+kept idle for reuse up to DB_POOL_SIZE, and health-checked on borrow.
+"""
+
+import os
+import time
+import threading
+import collections
+from contextlib import contextmanager
+
+import mysql.connector
+
+# Upper bounds (in milliseconds) of the wait-time histogram buckets
+WAIT_BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000, 5000)
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection could be borrowed within DB_POOL_TIMEOUT"""
+
+
+class PooledConnection:
+    """Wrapper around a borrowed connection; close() returns it to the pool"""
+
+    def __init__(self, pool, connection):
+        self._pool = pool
+        self._connection = connection
+
+    def __getattr__(self, name):
+        if self._connection is None:
+            raise mysql.connector.errors.OperationalError('Connection already returned to pool')
+        return getattr(self._connection, name)
+
+    def close(self):
+        if self._connection is not None:
+            connection, self._connection = self._connection, None
+            self._pool._release(connection)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ConnectionPool:
+    """Thread-safe pool of mysql.connector connections"""
+
+    def __init__(self, connect_args, pool_size=5, max_overflow=10, timeout=10,
+                 idle_timeout=300, pre_ping=True):
+        self.connect_args = dict(connect_args)
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.pre_ping = pre_ping
+
+        self._idle = collections.deque()  # (connection, returned_at)
+        self._cond = threading.Condition()
+        self._open = 0
+        self._borrowed = 0
+        self._waiting = 0
+        self._total_borrows = 0
+        self._timeouts = 0
+        self._discarded = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._wait_histogram = [0] * (len(WAIT_BUCKETS_MS) + 1)
+
+    def connect(self):
+        """Borrow a connection, waiting up to `timeout` seconds for a free slot"""
+        started = time.monotonic()
+        deadline = started + self.timeout
+        connection = None
+
+        with self._cond:
+            self._waiting += 1
+            try:
+                while True:
+                    connection = self._pop_idle()
+                    if connection is not None:
+                        break
+                    if self._open < self.pool_size + self.max_overflow:
+                        self._open += 1
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeout(
+                            f'No database connection available after {self.timeout}s '
+                            f'({self._open} open, {self._borrowed} borrowed)')
+                    self._cond.wait(remaining)
+            finally:
+                self._waiting -= 1
+
+        # Slot reserved - open or health-check outside the lock
+        try:
+            if connection is not None and self.pre_ping and not self._is_alive(connection):
+                self._close_quietly(connection)
+                with self._cond:
+                    self._discarded += 1
+                connection = None
+            if connection is None:
+                connection = mysql.connector.connect(**self.connect_args)
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+
+        waited = time.monotonic() - started
+        with self._cond:
+            self._borrowed += 1
+            self._total_borrows += 1
+            self._record_wait(waited)
+
+        return PooledConnection(self, connection)
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection for the duration of a `with` block"""
+        conn = self.connect()
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def stats(self):
+        """Snapshot of pool usage, suitable for jsonify()"""
+        with self._cond:
+            histogram = {}
+            for bound, count in zip(WAIT_BUCKETS_MS, self._wait_histogram):
+                histogram[f'<={bound}ms'] = count
+            histogram[f'>{WAIT_BUCKETS_MS[-1]}ms'] = self._wait_histogram[-1]
+            return {
+                'pool_size': self.pool_size,
+                'max_overflow': self.max_overflow,
+                'open': self._open,
+                'idle': len(self._idle),
+                'borrowed': self._borrowed,
+                'waiting': self._waiting,
+                'total_borrows': self._total_borrows,
+                'timeouts': self._timeouts,
+                'discarded': self._discarded,
+                'avg_wait_ms': round(self._wait_total * 1000 / self._total_borrows, 3) if self._total_borrows else 0,
+                'max_wait_ms': round(self._wait_max * 1000, 3),
+                'wait_histogram': histogram,
+            }
+
+    def dispose(self):
+        """Close every idle connection; borrowed ones are closed when returned"""
+        with self._cond:
+            idle = [conn for conn, _ in self._idle]
+            self._idle.clear()
+            self._open -= len(idle)
+            self._cond.notify_all()
+        for conn in idle:
+            self._close_quietly(conn)
+
+    def _pop_idle(self):
+        # Most recently returned first, so surplus connections age out
+        now = time.monotonic()
+        while self._idle:
+            connection, returned_at = self._idle.pop()
+            if self.idle_timeout and now - returned_at > self.idle_timeout:
+                self._open -= 1
+                self._discarded += 1
+                self._close_quietly(connection)
+                continue
+            return connection
+        return None
+
+    def _release(self, connection):
+        healthy = True
+        try:
+            # Never hand out a connection with an open transaction or unread rows
+            if connection.unread_result:
+                connection.consume_results()
+            if connection.in_transaction:
+                connection.rollback()
+        except Exception:
+            healthy = False
+
+        with self._cond:
+            self._borrowed -= 1
+            if healthy and len(self._idle) < self.pool_size:
+                self._idle.append((connection, time.monotonic()))
+                connection = None
+            else:
+                self._open -= 1
+                self._discarded += 1
+            self._cond.notify()
+
+        if connection is not None:
+            self._close_quietly(connection)
+
+    def _record_wait(self, waited):
+        self._wait_total += waited
+        self._wait_max = max(self._wait_max, waited)
+        waited_ms = waited * 1000
+        for index, bound in enumerate(WAIT_BUCKETS_MS):
+            if waited_ms <= bound:
+                self._wait_histogram[index] += 1
+                return
+        self._wait_histogram[-1] += 1
+
+    @staticmethod
+    def _is_alive(connection):
+        try:
+            return connection.is_connected()
+        except Exception:
+            return False
+
+    @staticmethod
+    def _close_quietly(connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+
+_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+
+def get_pool(config=None):
+    """Return the process-wide pool, creating it from `config` on first use.
+
+    `config` is any mapping with the MYSQL_* and DB_POOL_* keys (app.config);
+    when omitted the values are read from config.Config. A new pool is created
+    after fork so child processes never share sockets with their parent.
+    """
+    global _pool, _pool_pid
+    if _pool is not None and _pool_pid == os.getpid():
+        return _pool
+
+    with _pool_lock:
+        if _pool is None or _pool_pid != os.getpid():
+            if config is None:
+                from config import Config
+                config = {key: getattr(Config, key) for key in dir(Config) if key.isupper()}
+            _pool = ConnectionPool(
+                {
+                    'host': config['MYSQL_HOST'],
+                    'user': config['MYSQL_USER'],
+                    'password': config['MYSQL_PASSWORD'],
+                    'database': config['MYSQL_DATABASE'],
+                },
+                pool_size=config.get('DB_POOL_SIZE', 5),
+                max_overflow=config.get('DB_POOL_MAX_OVERFLOW', 10),
+                timeout=config.get('DB_POOL_TIMEOUT', 10),
+                idle_timeout=config.get('DB_POOL_IDLE_TIMEOUT', 300),
+                pre_ping=config.get('DB_POOL_PRE_PING', True),
+            )
+            _pool_pid = os.getpid()
+    return _pool
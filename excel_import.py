@@ -0,0 +1,158 @@
+"""
+Column-wise parsing of marks workbooks
+
+The subject columns are melted into one long (row, subject, marks) frame so
+that numeric coercion, range checks, totals and grades run over whole arrays
+instead of cell by cell.
+
+For very large files, iter_sheet_chunks() reads .xlsx (openpyxl read-only
+mode) or .csv row by row and hands out bounded DataFrames, so memory use
+does not grow with the size of the file.
+"""
+
+import io
+import csv
+from itertools import groupby, islice
+
+import numpy as np
+import openpyxl
+import pandas as pd
+
+from grading import grade_array
+
+REQUIRED_COLUMNS = ['Student Name', 'Roll Number', 'Branch', 'Semester', 'Exam Type']
+INFO_FIELDS = ['student_name', 'roll_no', 'branch', 'semester', 'exam_type']
+SUBJECT_MAX_MARKS = 100
+
+# Spreadsheet row of the first data row (row 1 is the header)
+FIRST_DATA_ROW = 2
+
+STREAM_FORMATS = ('xlsx', 'csv')
+
+
+def missing_columns(df):
+    return [col for col in REQUIRED_COLUMNS if col not in df.columns]
+
+
+def iter_sheet_chunks(source, file_format, chunk_size):
+    """Yield (DataFrame, first_row) chunks of at most chunk_size rows.
+
+    `source` is a binary file object. CSV is read straight from it; .xlsx
+    needs a seekable file (openpyxl opens it as a zip archive). Raises
+    ValueError if required columns are missing from the header.
+    """
+    if file_format == 'xlsx':
+        workbook = openpyxl.load_workbook(source, read_only=True, data_only=True)
+        try:
+            yield from _chunk_rows(workbook.active.iter_rows(values_only=True), chunk_size)
+        finally:
+            workbook.close()
+    elif file_format == 'csv':
+        text = io.TextIOWrapper(source, encoding='utf-8-sig', newline='')
+        yield from _chunk_rows(csv.reader(text), chunk_size)
+    else:
+        raise ValueError(f'Unsupported format: {file_format}')
+
+
+def _chunk_rows(rows, chunk_size):
+    header = next(rows, None)
+    columns = [str(col).strip() if col is not None else '' for col in (header or [])]
+    missing = [col for col in REQUIRED_COLUMNS if col not in columns]
+    if missing:
+        raise ValueError(f'Missing required columns: {", ".join(missing)}')
+
+    first_row = FIRST_DATA_ROW
+    while True:
+        chunk = [list(row[:len(columns)]) for row in islice(rows, chunk_size)]
+        if not chunk:
+            break
+        # Short CSV lines are padded so every row has one value per column
+        for row in chunk:
+            row.extend([None] * (len(columns) - len(row)))
+        yield pd.DataFrame(chunk, columns=columns), first_row
+        first_row += len(chunk)
+
+
+def parse_marks_frame(df, first_row=FIRST_DATA_ROW):
+    """Parse a marks sheet into (students_data, errors).
+
+    students_data holds one dict per student with every required value and
+    at least one valid subject; other rows are only reported in errors.
+    errors is a per-cell report: {'row', 'column', 'value', 'error'}, where
+    row is the spreadsheet row number starting at `first_row`.
+    """
+    if df.empty:
+        return [], []
+
+    rows = np.arange(len(df)) + first_row
+    errors = []
+
+    # Student details: blank cells become '' rather than 'nan'
+    info = pd.DataFrame({'row': rows})
+    for column, field in zip(REQUIRED_COLUMNS, INFO_FIELDS):
+        values = df[column].reset_index(drop=True)
+        info[field] = values.where(values.notna(), '').astype(str).str.strip()
+        for row in info['row'][info[field] == '']:
+            errors.append({'row': int(row), 'column': column, 'value': None, 'error': 'Required value is missing'})
+
+    # One (row, subject, raw) record per subject cell
+    subject_columns = [col for col in df.columns if col not in REQUIRED_COLUMNS]
+    if subject_columns:
+        wide = df[subject_columns].reset_index(drop=True)
+        wide.insert(0, 'row', rows)
+        marks = wide.melt(id_vars='row', var_name='subject', value_name='raw')
+    else:
+        marks = pd.DataFrame({'row': pd.Series(dtype=int), 'subject': [], 'raw': []})
+    marks['subject'] = marks['subject'].astype(str)
+
+    present = marks['raw'].notna() & (marks['raw'].astype(str).str.strip() != '')
+    values = pd.to_numeric(marks['raw'].where(present), errors='coerce')
+    not_numeric = present & values.isna()
+    out_of_range = values.notna() & ((values < 0) | (values > SUBJECT_MAX_MARKS))
+
+    for record in marks[not_numeric].itertuples(index=False):
+        errors.append({'row': int(record.row), 'column': record.subject, 'value': str(record.raw),
+                       'error': 'Marks must be a number'})
+    for record in marks[out_of_range].itertuples(index=False):
+        errors.append({'row': int(record.row), 'column': record.subject, 'value': str(record.raw),
+                       'error': f'Marks must be between 0 and {SUBJECT_MAX_MARKS}'})
+
+    valid = marks[values.notna() & ~out_of_range].copy()
+    valid['marks'] = values[valid.index].astype(int)
+    valid['grade'] = grade_array(valid['marks'] * 100 / SUBJECT_MAX_MARKS)
+    valid = valid.sort_values('row', kind='stable')  # keep the sheet's subject order
+
+    # Totals, percentage and overall grade per student
+    totals = valid.groupby('row')['marks'].agg(total_marks='sum', subject_count='count')
+    totals['max_marks'] = totals['subject_count'] * SUBJECT_MAX_MARKS
+    totals['percentage'] = (totals['total_marks'] * 100 / totals['max_marks']).round(2)
+    totals['grade'] = grade_array(totals['percentage'])
+    # Rows missing a required value would only fail again at insert time
+    complete = (info[INFO_FIELDS] != '').all(axis=1)
+    students = info[complete].join(totals, on='row', how='inner')
+
+    for row in info['row'][~info['row'].isin(totals.index)]:
+        errors.append({'row': int(row), 'column': None, 'value': None, 'error': 'No valid subject marks'})
+
+    subjects_by_row = {
+        row: [{'name': subject['subject'], 'marks': subject['marks'],
+               'max_marks': SUBJECT_MAX_MARKS, 'grade': subject['grade']} for subject in group]
+        for row, group in groupby(valid[['row', 'subject', 'marks', 'grade']].to_dict('records'),
+                                  key=lambda subject: subject['row'])
+    }
+
+    students_data = []
+    for student in students.to_dict('records'):
+        record = {field: student[field] for field in INFO_FIELDS}
+        record.update({
+            'row': int(student['row']),
+            'subjects': subjects_by_row[student['row']],
+            'total_marks': int(student['total_marks']),
+            'max_marks': int(student['max_marks']),
+            'percentage': float(student['percentage']),
+            'grade': student['grade'],
+        })
+        students_data.append(record)
+
+    errors.sort(key=lambda error: error['row'])
+    return students_data, errors
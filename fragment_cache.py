@@ -0,0 +1,91 @@
+"""
+Cache of rendered marksheet bodies
+
+The result page, the print view and the public verify page all show the
+same marksheet (templates/marksheet_body.html); only the page around it
+differs. The body is rendered once per record version and reused by every
+view, so each request only renders its small wrapper template.
+
+The record version is a hash of exactly the values the body prints, so an
+edited record (or a changed subject) gets a new entry and the old one ages
+out of the LRU; nothing has to be invalidated explicitly.
+"""
+
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+
+from markupsafe import Markup
+
+# Student columns printed in the marksheet body
+FRAGMENT_FIELDS = ('name', 'roll_no', 'branch', 'semester', 'exam_type', 'total_marks', 'max_marks',
+                   'grade', 'remarks')
+
+
+def fragment_subjects(subjects):
+    """Subject rows as the body template expects them (form data uses 'name', DB rows 'subject_name')"""
+    return [{
+        'subject_name': subject.get('subject_name', subject.get('name')),
+        'marks': subject['marks'],
+        'max_marks': subject['max_marks'],
+        'grade': subject.get('grade'),
+    } for subject in subjects]
+
+
+def record_version(student, subjects):
+    """Short hash of everything marksheet_body.html prints for this record"""
+    issued = student.get('date_created')
+    canonical = [
+        [str(student.get(field) or '') for field in FRAGMENT_FIELDS],
+        f"{float(student['percentage']):.2f}",
+        issued.strftime('%Y-%m-%d') if issued else None,
+        [[subject['subject_name'], int(subject['marks']), int(subject['max_marks']), subject['grade']]
+         for subject in subjects],
+    ]
+    encoded = json.dumps(canonical, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+
+class FragmentCache:
+    """LRU of rendered marksheet bodies keyed by (student id, record version)"""
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0}
+
+    def get(self, student, subjects, render):
+        """Return the body for this record, calling `render(subjects)` on a miss.
+
+        `subjects` may be DB rows or form data; `render` receives them
+        normalized by fragment_subjects().
+        """
+        subjects = fragment_subjects(subjects)
+        key = (student['id'], record_version(student, subjects))
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._stats['hits'] += 1
+                return self._entries[key]
+            self._stats['misses'] += 1
+
+        html = Markup(render(subjects))
+        with self._lock:
+            self._entries[key] = html
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return html
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats, entries=len(self._entries), max_entries=self.max_entries)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else None
+        return stats
@@ -0,0 +1,172 @@
+"""
+Grade scale for marksheets
+
+A GradingScheme is the single source of truth for grades: the scalar lookup
+used for one marksheet, the array lookup used when a whole workbook or
+cohort is graded at once, and the SQL CASE expressions the dashboard
+summary aggregates with all come from the same table, so Python and MySQL
+can never disagree about where a grade starts.
+
+The active scheme is GRADE_SCALE unless GRADING_SCHEME_FILE names a JSON
+file of [minimum percentage, grade, remarks] rows. After changing it, run
+`flask --app app regrade` to regrade stored marksheets and rebuild the
+summary.
+"""
+
+import os
+import json
+from bisect import bisect_right
+
+import numpy as np
+
+# (minimum percentage, grade, remarks), highest first
+GRADE_SCALE = [
+    (90, 'A+', 'Outstanding Performance'),
+    (80, 'A', 'Excellent Performance'),
+    (70, 'B+', 'Very Good Performance'),
+    (60, 'B', 'Good Performance'),
+    (50, 'C', 'Satisfactory Performance'),
+    (40, 'D', 'Needs Improvement'),
+    (0, 'F', 'Failed - Requires Re-examination'),
+]
+
+
+class GradingScheme:
+    def __init__(self, scale):
+        scale = [(float(minimum), str(grade), str(remarks)) for minimum, grade, remarks in scale]
+        minimums = [minimum for minimum, _, _ in scale]
+        if not scale or minimums[-1] != 0 or minimums != sorted(set(minimums), reverse=True):
+            raise ValueError('Grade scale must be ordered by strictly decreasing minimum, ending at 0')
+        if len({grade for _, grade, _ in scale}) != len(scale):
+            raise ValueError('Grade scale has duplicate grades')
+        self.scale = scale
+
+        # Ascending lookup tables: index i covers [_thresholds[i-1], _thresholds[i])
+        self._thresholds = [minimum for minimum, _, _ in reversed(scale)][1:]
+        self._grades = [grade for _, grade, _ in reversed(scale)]
+        self._remarks = [remarks for _, _, remarks in reversed(scale)]
+        self._grade_table = np.asarray(self._grades, dtype=object)
+        self._remarks_table = np.asarray(self._remarks, dtype=object)
+
+    @property
+    def failing_grade(self):
+        return self.scale[-1][1]
+
+    @property
+    def pass_mark(self):
+        """Lowest percentage that is not a fail"""
+        return self.scale[-2][0] if len(self.scale) > 1 else 0
+
+    @property
+    def top_mark(self):
+        """Minimum percentage of the highest grade"""
+        return self.scale[0][0]
+
+    def grade(self, percentage):
+        """Return (grade, remarks) for one percentage"""
+        index = bisect_right(self._thresholds, percentage)
+        return self._grades[index], self._remarks[index]
+
+    def _indexes(self, percentages):
+        return np.searchsorted(self._thresholds, np.asarray(percentages, dtype=float), side='right')
+
+    def grade_array(self, percentages):
+        """Grades for a whole array of percentages in one pass"""
+        return self._grade_table[self._indexes(percentages)]
+
+    def grade_and_remarks_array(self, percentages):
+        """(grades, remarks) arrays for a whole array of percentages"""
+        indexes = self._indexes(percentages)
+        return self._grade_table[indexes], self._remarks_table[indexes]
+
+    def buckets(self):
+        """[(grade, lower inclusive or None, upper exclusive or None)], highest grade first"""
+        bounds = [None] + [minimum for minimum, _, _ in self.scale]
+        return [(grade, minimum or None, bounds[i])
+                for i, (minimum, grade, _) in enumerate(self.scale)]
+
+    def case_sql(self, column='percentage'):
+        """SQL CASE expression giving the grade for `column`, matching grade()"""
+        whens = ' '.join(f"WHEN {column} >= {minimum:g} THEN {sql_string(grade)}" for minimum, grade, _ in self.scale[:-1])
+        return f"CASE {whens} ELSE {sql_string(self.failing_grade)} END"
+
+
+def sql_string(value):
+    return "'" + value.replace("'", "''") + "'"
+
+
+def load_scheme(path=None):
+    """The scheme in a JSON file of [minimum, grade, remarks] rows, or GRADE_SCALE without one"""
+    if not path:
+        return GradingScheme(GRADE_SCALE)
+    with open(path) as f:
+        return GradingScheme(json.load(f))
+
+
+SCHEME = load_scheme(os.environ.get('GRADING_SCHEME_FILE'))
+
+
+def calculate_grade(percentage):
+    """Return (grade, remarks) for one percentage under the active scheme"""
+    return SCHEME.grade(percentage)
+
+
+def grade_array(percentages):
+    """Grades for a whole array of percentages under the active scheme"""
+    return SCHEME.grade_array(percentages)
+
+
+def _id_chunks(cursor, select, chunk_size):
+    """Yield the rows of `select` (id first) chunk_size at a time, in id order"""
+    last_id = 0
+    while True:
+        cursor.execute(f'{select} WHERE id > %s ORDER BY id LIMIT %s', (last_id, chunk_size))
+        rows = cursor.fetchall()
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1][0]
+
+
+def _write_changes(cursor, table, columns, changes):
+    """One UPDATE per distinct new value: changes maps (values...) -> [ids]"""
+    assignments = ', '.join(f'{column} = %s' for column in columns)
+    for values, ids in changes.items():
+        cursor.execute(f"UPDATE {table} SET {assignments} WHERE id IN ({', '.join(['%s'] * len(ids))})",
+                       list(values) + ids)
+    return sum(len(ids) for ids in changes.values())
+
+
+def regrade(connection, scheme=SCHEME, chunk_size=5000):
+    """Recompute every stored student and subject grade under `scheme`.
+
+    Each chunk of rows is graded with one array lookup and only changed rows
+    are written, with one UPDATE ... WHERE id IN (...) per grade. Commits per
+    chunk; returns the number of (students, subjects) changed.
+    """
+    students_changed = subjects_changed = 0
+    cursor = connection.cursor()
+    try:
+        for rows in _id_chunks(cursor, 'SELECT id, percentage, grade, remarks FROM students', chunk_size):
+            grades, remarks = scheme.grade_and_remarks_array([float(row[1]) for row in rows])
+            changes = {}
+            for row, grade, remark in zip(rows, grades, remarks):
+                if (row[2], row[3]) != (grade, remark):
+                    changes.setdefault((grade, remark), []).append(row[0])
+            students_changed += _write_changes(cursor, 'students', ('grade', 'remarks'), changes)
+            connection.commit()
+
+        for rows in _id_chunks(cursor, 'SELECT id, marks, max_marks, grade FROM subjects', chunk_size):
+            grades = scheme.grade_array([row[1] / row[2] * 100 if row[2] else 0 for row in rows])
+            changes = {}
+            for row, grade in zip(rows, grades):
+                if row[3] != grade:
+                    changes.setdefault((grade,), []).append(row[0])
+            subjects_changed += _write_changes(cursor, 'subjects', ('grade',), changes)
+            connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+    return students_changed, subjects_changed
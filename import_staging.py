@@ -0,0 +1,88 @@
+"""
+On-disk staging area for Excel imports
+
+A parsed workbook is written here under a random import id instead of being
+sent back to the browser. The browser only gets a summary and a preview, and
+committing the import streams the staged rows straight into the bulk insert.
+
+    <import_id>.meta.json   owner, row count, timestamps
+    <import_id>.jsonl       one parsed student per line
+"""
+
+import os
+import re
+import json
+import time
+import uuid
+from itertools import islice
+
+IMPORT_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+
+class ImportStaging:
+    """Stage parsed import rows on disk until they are committed or expire"""
+
+    def __init__(self, folder, ttl=24 * 3600):
+        self.folder = folder
+        self.ttl = ttl
+        os.makedirs(folder, exist_ok=True)
+
+    def stage(self, students_data, owner_id, source_name):
+        """Write rows to a new staged import and return its metadata"""
+        self.cleanup()
+        import_id = uuid.uuid4().hex
+        count = 0
+        with open(self._path(import_id, 'jsonl'), 'w', encoding='utf-8') as f:
+            for student in students_data:
+                f.write(json.dumps(student, default=str))
+                f.write('\n')
+                count += 1
+
+        meta = {
+            'import_id': import_id,
+            'owner_id': owner_id,
+            'source_name': source_name,
+            'count': count,
+            'staged_at': time.time(),
+        }
+        with open(self._path(import_id, 'meta.json'), 'w') as f:
+            json.dump(meta, f)
+        return meta
+
+    def meta(self, import_id):
+        """Metadata for a staged import, or None if unknown or expired"""
+        if not IMPORT_ID_PATTERN.match(import_id or ''):
+            return None
+        try:
+            with open(self._path(import_id, 'meta.json')) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def rows(self, import_id, offset=0, limit=None):
+        """Iterate over staged rows without loading the whole file"""
+        with open(self._path(import_id, 'jsonl'), encoding='utf-8') as f:
+            stop = None if limit is None else offset + limit
+            for line in islice(f, offset, stop):
+                yield json.loads(line)
+
+    def discard(self, import_id):
+        for ext in ('meta.json', 'jsonl'):
+            try:
+                os.remove(self._path(import_id, ext))
+            except OSError:
+                pass
+
+    def cleanup(self):
+        """Delete staged imports older than ttl"""
+        cutoff = time.time() - self.ttl
+        for name in os.listdir(self.folder):
+            path = os.path.join(self.folder, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass  # Removed by another worker
+
+    def _path(self, import_id, ext):
+        return os.path.join(self.folder, f'{import_id}.{ext}')
@@ -5,7 +5,7 @@ Database initialization script for Student Marksheet Generator
 
 import mysql.connector
 import sys
-from werkzeug.security import generate_password_hash
+from migrations import migrate, seed_default_users
 
 def create_database():
     """Create the marksheet database"""
@@ -48,62 +48,14 @@ def create_database():
         # Switch to the database
         cursor.execute("USE marksheet_db")
         
-        # Create students table
-        print("📋 Creating students table...")
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS students (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                name VARCHAR(255) NOT NULL,
-                roll_no VARCHAR(50) UNIQUE NOT NULL,
-                branch VARCHAR(100) NOT NULL,
-                semester VARCHAR(20) NOT NULL,
-                exam_type VARCHAR(50) NOT NULL,
-                total_marks INT NOT NULL,
-                max_marks INT NOT NULL,
-                percentage DECIMAL(5,2) NOT NULL,
-                grade VARCHAR(10) NOT NULL,
-                remarks TEXT,
-                date_created TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                class_teacher VARCHAR(255),
-                principal VARCHAR(255)
-            )
-        ''')
-        
-        # Create subjects table
-        print("📋 Creating subjects table...")
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS subjects (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                student_id INT,
-                subject_name VARCHAR(255) NOT NULL,
-                marks INT NOT NULL,
-                max_marks INT NOT NULL,
-                grade VARCHAR(10),
-                FOREIGN KEY (student_id) REFERENCES students(id) ON DELETE CASCADE
-            )
-        ''')
-        
-        # Create users table
-        print("📋 Creating users table...")
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                username VARCHAR(100) UNIQUE NOT NULL,
-                password_hash VARCHAR(255) NOT NULL,
-                role VARCHAR(20) NOT NULL DEFAULT 'teacher',
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
+        # Create tables and indexes
+        print("📋 Applying schema migrations...")
+        applied = migrate(connection)
+        print(f"✅ Schema up to date (applied: {applied or 'none'})")
         
         # Create default users
         print("👤 Creating default users...")
-        admin_password = generate_password_hash('admin123')
-        teacher_password = generate_password_hash('teacher123')
-        
-        cursor.execute('''
-            INSERT IGNORE INTO users (username, password_hash, role) 
-            VALUES ('admin', %s, 'admin'), ('teacher', %s, 'teacher')
-        ''', (admin_password, teacher_password))
+        seed_default_users(cursor)
         
         connection.commit()
         print("✅ Default users created (admin/admin123, teacher/teacher123)")
@@ -0,0 +1,242 @@
+"""
+Tasks run by the background job queue (jobs.py)
+
+Each task runs in a job worker process, so it must not import app: it opens
+its own MySQL connection from job.config, and signals other web workers
+through the shared stamp file and cache folders instead of app objects.
+"""
+
+import os
+import datetime
+
+import pandas as pd
+
+from db_pool import get_pool
+from grading import SCHEME
+from bulk_import import bulk_insert_marksheets, new_report, merge_report
+from import_staging import ImportStaging
+from excel_import import missing_columns, parse_marks_frame, iter_sheet_chunks
+from data_export import EXPORT_TABLES, count_rows, stream_csv, stream_ndjson, stream_xlsx
+from summary import clear_summary
+from pdf_cache import PDFCache
+from qr_codes import QRCache
+from data_version import DataVersion
+
+EXPORT_MIMETYPES = {
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def _staging(config):
+    return ImportStaging(config['IMPORT_STAGING_FOLDER'], config['IMPORT_STAGING_TTL'])
+
+
+def _marksheets_changed(config):
+    DataVersion(config['DATA_VERSION_FILE']).bump()
+
+
+def import_excel(job, upload_path, source_name, owner_id):
+    """Parse an uploaded workbook and stage its rows; the result carries the preview"""
+    job.progress(0, 3, 'Reading workbook')
+    try:
+        df = pd.read_excel(upload_path)
+    except Exception as e:
+        raise ValueError(f'Error reading Excel file: {str(e)}')
+
+    missing = missing_columns(df)
+    if missing:
+        raise ValueError(f'Missing required columns: {", ".join(missing)}')
+
+    job.progress(1, 3, f'Checking {len(df)} rows')
+    students_data, errors = parse_marks_frame(df)
+    if not students_data:
+        raise ValueError('No valid student data found in Excel file')
+
+    job.progress(2, 3, 'Staging rows')
+    staged = _staging(job.config).stage(students_data, owner_id, source_name)
+    os.remove(upload_path)
+
+    return {
+        'import_id': staged['import_id'],
+        'count': staged['count'],
+        'preview': students_data[:job.config['IMPORT_PREVIEW_ROWS']],
+        'error_count': len(errors),
+        'errors': errors[:job.config['IMPORT_MAX_REPORTED_ERRORS']],
+        'message': f'Successfully processed {len(students_data)} students'
+    }
+
+
+def commit_import(job, import_id):
+    """Create marksheets for every row of a staged import.
+
+    Chunks are committed as they go, so a cancelled import keeps the rows it
+    already created; retrying reports those as duplicates and carries on.
+    """
+    staging = _staging(job.config)
+    meta = staging.meta(import_id)
+    if not meta:
+        raise ValueError('Import not found or expired')
+
+    total = meta['count']
+
+    def progress(done, report):
+        job.progress(done, total, f'{done} of {total} rows', {
+            'total': total,
+            'processed': done,
+            'inserted': report['created_count'],
+            'duplicates': len(report['duplicates']),
+            'errors': len(report['errors']),
+        })
+
+    connection = get_pool(job.config).connect()
+    try:
+        report = bulk_insert_marksheets(connection, staging.rows(import_id), SCHEME,
+                                        chunk_size=job.config['BULK_INSERT_CHUNK_SIZE'], progress=progress)
+    finally:
+        connection.close()
+        _marksheets_changed(job.config)
+    staging.discard(import_id)
+
+    # Keep the stored result small; the counts stay exact
+    report = merge_report(new_report(), report, job.config['IMPORT_MAX_REPORTED_ERRORS'])
+    return {**report, 'message': f"Successfully created {report['created_count']} marksheets"}
+
+
+def import_stream(job, upload_path, file_format):
+    """Read a very large .xlsx or .csv upload in bounded chunks, inserting each as it is parsed.
+
+    Like commit_import, chunks are committed as they go: a cancelled or
+    failed import keeps the rows it already created, and retrying reports
+    those as duplicates and carries on.
+    """
+    config = job.config
+    max_reported = config['IMPORT_MAX_REPORTED_ERRORS']
+    size = os.path.getsize(upload_path)
+    report = new_report()
+    rows_read = 0
+
+    connection = get_pool(config).connect()
+    try:
+        with open(upload_path, 'rb') as f:
+            for frame, first_row in iter_sheet_chunks(f, file_format, config['STREAM_IMPORT_CHUNK_ROWS']):
+                rows_read += len(frame)
+                students_data, errors = parse_marks_frame(frame, first_row)
+                merge_report(report, {'created_count': 0, 'duplicates': [], 'errors': errors}, max_reported)
+                chunk_report = bulk_insert_marksheets(connection, students_data, SCHEME,
+                                                      chunk_size=config['BULK_INSERT_CHUNK_SIZE'])
+                merge_report(report, chunk_report, max_reported)
+                # Rows in the file aren't known up front, so progress is by bytes read
+                job.progress(f.tell(), size, f'{rows_read} rows read', {
+                    'processed': rows_read,
+                    'inserted': report['created_count'],
+                    'duplicates': report['duplicate_count'],
+                    'errors': report['error_count'],
+                })
+    finally:
+        connection.close()
+        _marksheets_changed(config)
+    os.remove(upload_path)
+
+    return {
+        'rows_read': rows_read,
+        **report,
+        'message': f"Successfully created {report['created_count']} marksheets from {rows_read} rows"
+    }
+
+
+def export_data(job, export_format, table, filters):
+    """Write an export to the job folder; the result names the file to download"""
+    tables = [table] if export_format == 'csv' else EXPORT_TABLES
+    batch_size = job.config['EXPORT_BATCH_ROWS']
+    path = job.path(export_format)
+    tmp_path = path + '.tmp'
+
+    connection = get_pool(job.config).connect()
+    try:
+        total = sum(count_rows(connection, name, filters) for name in tables)
+        written = 0
+
+        def on_batch(rows):
+            nonlocal written
+            written += rows
+            job.progress(written, total, f'{written} of {total} rows')
+
+        if export_format == 'csv':
+            body = stream_csv(connection, table, filters, batch_size, on_batch)
+            filename = f'marksheet_{table}'
+        elif export_format == 'ndjson':
+            body = stream_ndjson(connection, filters, batch_size, on_batch)
+            filename = 'marksheet_data'
+        else:
+            body = stream_xlsx(connection, filters, batch_size, on_batch)
+            filename = 'marksheet_data'
+
+        with open(tmp_path, 'wb') as f:
+            for data in body:
+                f.write(data.encode('utf-8') if isinstance(data, str) else data)
+        os.replace(tmp_path, path)
+    finally:
+        connection.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+    filename += f"_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}.{export_format}"
+    return {
+        'format': export_format,
+        'download_name': filename,
+        'mimetype': EXPORT_MIMETYPES[export_format],
+        'rows': written,
+        'message': f'Exported {written} rows'
+    }
+
+
+def clear_all_data(job):
+    """Delete every student and subject and drop all cached renders"""
+    config = job.config
+    connection = get_pool(config).connect()
+    cursor = connection.cursor()
+    try:
+        job.progress(0, 3, 'Deleting subjects')
+        # Delete all subjects first (due to foreign key constraint)
+        cursor.execute('DELETE FROM subjects')
+        subjects_deleted = cursor.rowcount
+
+        job.progress(1, 3, 'Deleting students')
+        cursor.execute('DELETE FROM students')
+        students_deleted = cursor.rowcount
+
+        # Last chance to cancel: the ALTERs below commit implicitly
+        job.progress(2, 3, 'Resetting tables')
+        clear_summary(cursor)
+        cursor.execute('ALTER TABLE students AUTO_INCREMENT = 1')
+        cursor.execute('ALTER TABLE subjects AUTO_INCREMENT = 1')
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+        connection.close()
+
+    # Student ids restart at 1, so every cached render is now stale
+    PDFCache(config['PDF_CACHE_FOLDER'], config['PDF_CACHE_MAX_BYTES']).invalidate()
+    QRCache(config['QR_CACHE_FOLDER']).clear()
+    _marksheets_changed(config)
+
+    return {
+        'students_deleted': students_deleted,
+        'subjects_deleted': subjects_deleted,
+        'message': f'Successfully deleted {students_deleted} students and {subjects_deleted} subjects from database'
+    }
+
+
+# Job kinds accepted by the queue
+TASKS = {
+    'import_excel': import_excel,
+    'commit_import': commit_import,
+    'import_stream': import_stream,
+    'export_data': export_data,
+    'clear_all_data': clear_all_data,
+}
@@ -0,0 +1,307 @@
+"""
+Background jobs for long admin operations
+
+Imports, bulk creation, exports and clearing all data can take longer than
+a gunicorn request may run, so they are queued here and run in a process
+pool. Job state is a row in a SQLite (WAL) database shared by every worker,
+so any worker can answer a status, cancel or retry request for any job:
+
+    queued -> running -> done | failed | cancelled
+
+A task is a module-level function `task(job, **params)` (see job_tasks.py).
+It reports progress with job.progress(done, total, message, detail), which
+raises JobCancelled once a cancel has been requested, and returns a
+JSON-safe result dict. Files a task produces (e.g. an export) go in
+job.folder. `detail` holds live counters (rows inserted, duplicates, ...);
+JobQueue.watch() follows a job's changes for the /jobs/<id>/events stream.
+"""
+
+import os
+import re
+import json
+import time
+import uuid
+import sqlite3
+import threading
+
+from process_pool import ProcessPool, pid_alive
+
+JOB_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+FINISHED_STATES = ('done', 'failed', 'cancelled')
+
+# Progress is written at most this often (seconds), plus on every whole percent
+PROGRESS_INTERVAL = 0.5
+
+JOB_COLUMNS = ('id', 'kind', 'owner_id', 'params', 'state', 'progress', 'message', 'detail', 'result', 'error',
+               'cancel_requested', 'attempts', 'pid', 'created_at', 'started_at', 'finished_at')
+
+# Columns whose change is worth telling a watcher about
+WATCHED_COLUMNS = ('state', 'progress', 'message', 'detail', 'error')
+
+
+class JobCancelled(Exception):
+    """Raised inside a task by job.progress() after a cancel request"""
+
+
+class JobStore:
+    """SQLite table of jobs shared across worker processes"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._connect().execute('''
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                owner_id INTEGER,
+                params TEXT NOT NULL,
+                state TEXT NOT NULL,
+                progress REAL NOT NULL DEFAULT 0,
+                message TEXT,
+                detail TEXT,
+                result TEXT,
+                error TEXT,
+                cancel_requested INTEGER NOT NULL DEFAULT 0,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                pid INTEGER,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL
+            )
+        ''')
+        # Job tables created before live counters were added
+        columns = [row[1] for row in self._connect().execute('PRAGMA table_info(jobs)')]
+        if 'detail' not in columns:
+            self._connect().execute('ALTER TABLE jobs ADD COLUMN detail TEXT')
+
+    def _connect(self):
+        # sqlite3 connections must not cross threads or a fork
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def create(self, job_id, kind, owner_id, params):
+        self._connect().execute(
+            "INSERT INTO jobs (id, kind, owner_id, params, state, pid, created_at) VALUES (?, ?, ?, ?, 'queued', ?, ?)",
+            (job_id, kind, owner_id, json.dumps(params), os.getpid(), time.time()))
+
+    def get(self, job_id):
+        row = self._connect().execute(f"SELECT {', '.join(JOB_COLUMNS)} FROM jobs WHERE id = ?",
+                                      (job_id,)).fetchone()
+        if not row:
+            return None
+        job = dict(zip(JOB_COLUMNS, row))
+        job['params'] = json.loads(job['params'])
+        job['detail'] = json.loads(job['detail']) if job['detail'] else None
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        job['cancel_requested'] = bool(job['cancel_requested'])
+        return job
+
+    def update(self, job_id, only_if_state=None, **fields):
+        """Set columns of one job; returns False if `only_if_state` didn't match"""
+        for column in ('detail', 'result'):
+            if column in fields:
+                fields[column] = json.dumps(fields[column], default=str)
+        assignments = ', '.join(f'{column} = ?' for column in fields)
+        query = f'UPDATE jobs SET {assignments} WHERE id = ?'
+        params = list(fields.values()) + [job_id]
+        if only_if_state:
+            states = (only_if_state,) if isinstance(only_if_state, str) else tuple(only_if_state)
+            query += f" AND state IN ({', '.join(['?'] * len(states))})"
+            params += list(states)
+        return self._connect().execute(query, params).rowcount == 1
+
+    def cancel_requested(self, job_id):
+        row = self._connect().execute('SELECT cancel_requested FROM jobs WHERE id = ?', (job_id,)).fetchone()
+        return bool(row and row[0])
+
+    def delete_finished_before(self, cutoff):
+        """Delete finished jobs older than `cutoff`; returns their ids"""
+        conn = self._connect()
+        states = ', '.join(['?'] * len(FINISHED_STATES))
+        ids = [row[0] for row in conn.execute(
+            f'SELECT id FROM jobs WHERE state IN ({states}) AND finished_at < ?', FINISHED_STATES + (cutoff,))]
+        conn.executemany('DELETE FROM jobs WHERE id = ?', [(job_id,) for job_id in ids])
+        return ids
+
+
+class JobContext:
+    """What a running task sees as `job`"""
+
+    def __init__(self, store, job_id, folder, config):
+        self.id = job_id
+        self.folder = folder
+        self.config = config
+        self._store = store
+        self._written_at = 0
+        self._written_percent = None
+
+    def progress(self, done, total, message=None, detail=None):
+        """Record progress (and optional counters); raises JobCancelled if the job has been cancelled"""
+        percent = min(round(done * 100 / total, 1), 100) if total else 0
+        now = time.monotonic()
+        if int(percent) != self._written_percent or now - self._written_at >= PROGRESS_INTERVAL:
+            fields = {'progress': percent}
+            if message is not None:
+                fields['message'] = message
+            if detail is not None:
+                fields['detail'] = detail
+            self._store.update(self.id, **fields)
+            self._written_at, self._written_percent = now, int(percent)
+        if self._store.cancel_requested(self.id):
+            raise JobCancelled()
+
+    def path(self, ext):
+        """Path of a file this job produces, e.g. job.path('xlsx')"""
+        return os.path.join(self.folder, f'{self.id}.{ext}')
+
+
+_stores = {}
+
+
+def _run_job(store_path, folder, job_id, task, params, config):
+    """Runs in a worker process"""
+    store = _stores.get(store_path)
+    if store is None:
+        store = _stores[store_path] = JobStore(store_path)
+
+    job = store.get(job_id)
+    if not job or not store.update(job_id, only_if_state='queued', state='running', pid=os.getpid(),
+                                   attempts=job['attempts'] + 1, started_at=time.time(), progress=0):
+        return  # Cancelled while queued
+
+    try:
+        result = task(JobContext(store, job_id, folder, config), **params)
+    except JobCancelled:
+        store.update(job_id, state='cancelled', message='Cancelled', finished_at=time.time())
+    except Exception as e:
+        store.update(job_id, state='failed', error=str(e), finished_at=time.time())
+    else:
+        result = result or {}
+        store.update(job_id, state='done', progress=100, message=result.get('message'), result=result,
+                     finished_at=time.time())
+
+
+def throughput(job, now=None):
+    """Rows per second and seconds left for a running job whose detail counts processed/total rows"""
+    detail = job.get('detail') or {}
+    if job['state'] != 'running' or not job['started_at'] or 'processed' not in detail:
+        return None
+    elapsed = (now or time.time()) - job['started_at']
+    rate = detail['processed'] / elapsed if elapsed > 0 else 0
+    remaining = detail['total'] - detail['processed'] if 'total' in detail else None
+    return {
+        'rows_per_second': round(rate, 1),
+        'eta_seconds': round(remaining / rate) if rate and remaining is not None else None,
+    }
+
+
+class JobQueue:
+    """Submit, inspect, cancel and retry background jobs"""
+
+    def __init__(self, path, folder, tasks, config, max_workers=2, job_ttl=24 * 3600):
+        self.store = JobStore(path)
+        self.folder = folder
+        self.tasks = tasks
+        self.config = dict(config)
+        self.job_ttl = job_ttl
+        self.pool = ProcessPool(max_workers)
+        os.makedirs(folder, exist_ok=True)
+
+    def new_job_id(self):
+        """An id to name input files with before the job is submitted"""
+        return uuid.uuid4().hex
+
+    def submit(self, kind, params, owner_id=None, job_id=None):
+        """Queue a job and return its id"""
+        if kind not in self.tasks:
+            raise ValueError(f'Unknown job kind: {kind}')
+        self.cleanup()
+        job_id = job_id or self.new_job_id()
+        self.store.create(job_id, kind, owner_id, params)
+        self._start(job_id, kind, params)
+        return job_id
+
+    def _start(self, job_id, kind, params):
+        try:
+            self.pool.submit(_run_job, self.store.path, self.folder, job_id, self.tasks[kind], params, self.config,
+                             on_broken=lambda e: self._fail(job_id, 'Job process died'))
+        except Exception as e:
+            self._fail(job_id, f'Could not start job: {e}')
+            raise
+
+    def _fail(self, job_id, error):
+        self.store.update(job_id, only_if_state=('queued', 'running'), state='failed', error=error,
+                          finished_at=time.time())
+
+    def status(self, job_id):
+        """The job row as a dict, or None for unknown ids"""
+        if not JOB_ID_PATTERN.match(job_id or ''):
+            return None
+        job = self.store.get(job_id)
+        if job and job['state'] not in FINISHED_STATES and not pid_alive(job['pid']):
+            # The web worker (and its pool) went away while the job was queued or running
+            self.store.update(job_id, only_if_state=job['state'], state='failed',
+                              error='Job was interrupted by a worker restart', finished_at=time.time())
+            job = self.store.get(job_id)
+        return job
+
+    def cancel(self, job_id):
+        """Cancel a queued job now, or ask a running one to stop at its next progress report"""
+        if self.store.update(job_id, only_if_state='queued', state='cancelled', cancel_requested=1,
+                             message='Cancelled', finished_at=time.time()):
+            return True
+        return self.store.update(job_id, only_if_state='running', cancel_requested=1, message='Cancelling')
+
+    def retry(self, job_id):
+        """Queue a failed or cancelled job again with the same parameters"""
+        job = self.store.get(job_id)
+        if not job or not self.store.update(job_id, only_if_state=('failed', 'cancelled'), state='queued',
+                                            cancel_requested=0, progress=0, message=None, detail=None, error=None,
+                                            result=None, pid=os.getpid(), started_at=None, finished_at=None):
+            return False
+        self._start(job_id, job['kind'], job['params'])
+        return True
+
+    def watch(self, job_id, interval=0.5, timeout=15):
+        """Yield the job now and again whenever it changes, until it finishes or `timeout` seconds pass.
+
+        Reads are cheap (one SQLite row), so this simply polls every `interval` seconds.
+        """
+        deadline = time.monotonic() + timeout
+        last = None
+        while True:
+            job = self.status(job_id)
+            if job is None:
+                return
+            seen = tuple(json.dumps(job[column], sort_keys=True) for column in WATCHED_COLUMNS)
+            if seen != last:
+                last = seen
+                yield job
+            if job['state'] in FINISHED_STATES or time.monotonic() >= deadline:
+                return
+            time.sleep(interval)
+
+    def output_path(self, job_id, ext):
+        return os.path.join(self.folder, f'{job_id}.{ext}')
+
+    def cleanup(self):
+        """Forget finished jobs older than job_ttl and delete their files"""
+        expired = set(self.store.delete_finished_before(time.time() - self.job_ttl))
+        if not expired:
+            return
+        for name in os.listdir(self.folder):
+            if name.split('.', 1)[0] in expired:
+                try:
+                    os.remove(os.path.join(self.folder, name))
+                except OSError:
+                    pass  # Removed by another worker
+
+    def executor(self):
+        """The job process pool (one per process; recreated after fork or a dead child)"""
+        return self.pool.executor()
@@ -0,0 +1,147 @@
+"""
+ReportLab styles for the marksheet PDF
+
+Styles are built once when a process imports this module (web workers and
+render workers alike) and shared by every render. ParagraphStyle and
+TableStyle objects are only read while a document is built, so sharing them
+is safe.
+"""
+
+from types import SimpleNamespace
+
+from reportlab.lib.units import inch
+from reportlab.platypus import TableStyle
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER
+
+
+def build_layout():
+    """Create every style used by pdf_render.build_marksheet_story()"""
+    styles = getSampleStyleSheet()
+
+    return SimpleNamespace(
+        # Paragraph styles that match the web view
+        college_header=ParagraphStyle(
+            'CollegeHeader',
+            parent=styles['Heading1'],
+            fontSize=24,
+            textColor=colors.HexColor('#2563eb'),  # Blue color like web
+            alignment=TA_CENTER,
+            spaceAfter=5,
+            fontName='Helvetica-Bold'
+        ),
+        college_subtitle=ParagraphStyle(
+            'CollegeSubtitle',
+            parent=styles['Normal'],
+            fontSize=12,
+            textColor=colors.HexColor('#64748b'),  # Gray color like web
+            alignment=TA_CENTER,
+            spaceAfter=10,
+            fontStyle='italic'
+        ),
+        marksheet_title=ParagraphStyle(
+            'MarksheetTitle',
+            parent=styles['Heading2'],
+            fontSize=18,
+            fontName='Helvetica-Bold',
+            alignment=TA_CENTER,
+            textColor=colors.black,
+            spaceAfter=5
+        ),
+        exam_type=ParagraphStyle(
+            'ExamType',
+            parent=styles['Normal'],
+            fontSize=14,
+            alignment=TA_CENTER,
+            textColor=colors.HexColor('#64748b'),
+            spaceAfter=20
+        ),
+        verification=ParagraphStyle(
+            'VerificationStyle',
+            parent=styles['Normal'],
+            fontSize=10,
+            leftIndent=10,
+            alignment=TA_CENTER
+        ),
+
+        # Student details table
+        detail_widths=[1.5*inch, 2.2*inch, 1.5*inch, 1.8*inch],
+        detail_table=TableStyle([
+            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 0), (-1, -1), 11),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('LEFTPADDING', (0, 0), (-1, -1), 10),
+            ('RIGHTPADDING', (0, 0), (-1, -1), 10),
+            ('TOPPADDING', (0, 0), (-1, -1), 8),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+        ]),
+
+        # Subjects table with blue header and total rows
+        subjects_widths=[0.8*inch, 2.8*inch, 1.2*inch, 1.2*inch, 0.8*inch],
+        subjects_table=TableStyle([
+            # Header row styling (blue background like web)
+            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#3b82f6')),
+            ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, 0), 11),
+            ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
+
+            # Data rows styling
+            ('FONTNAME', (0, 1), (-1, -2), 'Helvetica'),
+            ('FONTSIZE', (0, 1), (-1, -2), 10),
+            ('ALIGN', (0, 1), (-1, -1), 'CENTER'),
+
+            # Total row styling (blue background like web)
+            ('BACKGROUND', (0, -1), (-1, -1), colors.HexColor('#3b82f6')),
+            ('TEXTCOLOR', (0, -1), (-1, -1), colors.white),
+            ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, -1), (-1, -1), 11),
+
+            # Grid and padding
+            ('GRID', (0, 0), (-1, -1), 1, colors.black),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('TOPPADDING', (0, 0), (-1, -1), 8),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+            ('LEFTPADDING', (0, 0), (-1, -1), 5),
+            ('RIGHTPADDING', (0, 0), (-1, -1), 5),
+        ]),
+
+        # Result summary table
+        summary_widths=[2*inch, 4*inch],
+        summary_table=TableStyle([
+            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 0), (-1, -1), 11),
+            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('LEFTPADDING', (0, 0), (-1, -1), 10),
+            ('TOPPADDING', (0, 0), (-1, -1), 5),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
+        ]),
+
+        # Signatures table
+        signature_widths=[2.5*inch, 1*inch, 2.5*inch],
+        signature_image_box=(1.6*inch, 0.55*inch),
+        seal_image_box=(0.9*inch, 0.9*inch),
+        signature_table=TableStyle([
+            ('FONTNAME', (0, 0), (-1, -1), 'Helvetica'),
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('TOPPADDING', (0, 0), (-1, -1), 5),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 5),
+        ]),
+
+        # Verification text with the signed QR code on the right
+        qr_size=1.1*inch,
+        verification_widths=[5.4*inch, 1.4*inch],
+        verification_table=TableStyle([
+            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+            ('ALIGN', (1, 0), (1, 0), 'CENTER'),
+        ]),
+    )
+
+
+# Shared by every render in this process
+LAYOUT = build_layout()
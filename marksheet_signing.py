@@ -0,0 +1,114 @@
+"""
+Signed verification tokens for marksheet QR codes
+
+A token carries the student id, roll number, percentage, grade and a short
+hash of every mark on the sheet, signed with HMAC-SHA256 under
+MARKSHEET_SIGNING_KEY:
+
+    <base64url(JSON payload)>.<base64url(truncated HMAC)>
+
+The app checks a scanned token with no database access (/verify/signed/<token>
+or `flask --app app verify-qr`). Changing any mark changes the hash, so a
+token cannot be reused for an edited record. The key is symmetric: anyone who
+holds it can forge tokens as well as check them, so it must never be handed
+to verifiers. Send them to the verify URL instead.
+
+MARKSHEET_SIGNING_KEY has no default. Without it no token is issued or
+accepted (SigningKeyMissing); the app then prints marksheets without a QR code.
+"""
+
+import hmac
+import json
+import base64
+import hashlib
+
+TOKEN_VERSION = 1
+
+# Truncated lengths keep the QR code small while staying far out of reach of forgery
+DIGEST_BYTES = 12
+SIGNATURE_BYTES = 16
+
+
+class InvalidToken(ValueError):
+    """Raised for a token that is malformed or whose signature does not match"""
+
+
+class SigningKeyMissing(RuntimeError):
+    """Raised when MARKSHEET_SIGNING_KEY is not configured"""
+
+    def __init__(self):
+        super().__init__('MARKSHEET_SIGNING_KEY is not set; marksheet QR codes cannot be signed or verified')
+
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+
+def marks_digest(student, subjects):
+    """Short hash of everything printed in the marks tables"""
+    canonical = [
+        student['roll_no'], student['name'], student['branch'], student['semester'], student['exam_type'],
+        int(student['total_marks']), int(student['max_marks']), f"{float(student['percentage']):.2f}",
+        student['grade'],
+        [[subject['subject_name'], int(subject['marks']), int(subject['max_marks'])]
+         for subject in sorted(subjects, key=lambda subject: subject['id'])],
+    ]
+    encoded = json.dumps(canonical, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    return _b64encode(hashlib.sha256(encoded).digest()[:DIGEST_BYTES])
+
+
+def _signature(body, key):
+    if not key:
+        raise SigningKeyMissing()
+    return hmac.new(key.encode('utf-8'), body.encode('ascii'), hashlib.sha256).digest()[:SIGNATURE_BYTES]
+
+
+def sign_marksheet(student, subjects, key):
+    payload = {
+        'v': TOKEN_VERSION,
+        'id': student['id'],
+        'r': student['roll_no'],
+        'p': f"{float(student['percentage']):.2f}",
+        'g': student['grade'],
+        'h': marks_digest(student, subjects),
+    }
+    body = _b64encode(json.dumps(payload, separators=(',', ':'), ensure_ascii=False).encode('utf-8'))
+    return f'{body}.{_b64encode(_signature(body, key))}'
+
+
+def verify_token(token, key):
+    """Return the decoded payload of a genuine token, or raise InvalidToken.
+
+    Accepts the bare token or the full URL scanned from a QR code.
+    """
+    if not key:
+        raise SigningKeyMissing()
+    token = token.strip().rstrip('/').rsplit('/', 1)[-1]
+    try:
+        body, signature = token.split('.')
+        valid = hmac.compare_digest(_b64decode(signature), _signature(body, key))
+    except (ValueError, UnicodeEncodeError):
+        raise InvalidToken('Malformed token')
+    if not valid:
+        raise InvalidToken('Signature does not match')
+
+    try:
+        payload = json.loads(_b64decode(body))
+    except ValueError:
+        raise InvalidToken('Malformed token')
+    if not isinstance(payload, dict) or payload.get('v') != TOKEN_VERSION:
+        raise InvalidToken('Unsupported token version')
+    try:
+        return {
+            'student_id': payload['id'],
+            'roll_no': payload['r'],
+            'percentage': payload['p'],
+            'grade': payload['g'],
+            'marks_digest': payload['h'],
+        }
+    except KeyError:
+        raise InvalidToken('Malformed token')
@@ -0,0 +1,271 @@
+"""
+Versioned schema migrations
+
+This is the one place the schema is defined. Each migration is applied once
+and recorded in schema_migrations, so migrate() can run against a fresh
+database or an existing one created by an older release. app.init_db(),
+init_db.py, quick_init.py and setup_railway_db.py all go through it.
+
+check_query_plans() runs EXPLAIN over the hot queries and reports any that
+fall back to a full scan of students (`flask --app app check-indexes`).
+"""
+
+from mysql.connector import errorcode
+from werkzeug.security import generate_password_hash
+
+from summary import REBUILD_SELECT, AT_RISK_BELOW, STAR_FROM, summary_matches_scheme, rebuild_summary
+
+MIGRATIONS_TABLE_DDL = '''
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INT PRIMARY KEY,
+        name VARCHAR(255) NOT NULL,
+        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+'''
+
+# Serializes migrate() across gunicorn workers and deploy scripts
+MIGRATION_LOCK = 'marksheet_schema_migrations'
+MIGRATION_LOCK_TIMEOUT = 60
+
+MIGRATE_HINT = 'The database schema is out of date; run "flask --app app migrate"'
+
+
+class SchemaOutdated(RuntimeError):
+    """A table added by a migration is missing: the database predates this release"""
+
+    def __init__(self, message=MIGRATE_HINT):
+        super().__init__(message)
+
+
+def is_missing_table(err):
+    """True if a MySQL error says a queried table does not exist"""
+    return getattr(err, 'errno', None) == errorcode.ER_NO_SUCH_TABLE
+
+
+def _create_index(table, name, columns, kind=''):
+    """Migration step that adds an index unless a previous, interrupted run already did"""
+    def step(cursor):
+        cursor.execute(f'SHOW INDEX FROM {table} WHERE Key_name = %s', (name,))
+        if not cursor.fetchall():
+            cursor.execute(f'CREATE {kind} INDEX {name} ON {table} ({columns})')
+    return step
+
+
+# The summary as of migrations 2 and 5, for the built-in grade scale. Migration
+# SQL is frozen: a custom GRADING_SCHEME_FILE is applied by rebuilding the
+# summary afterwards (see migrate()), never by editing an applied migration.
+SUMMARY_V2_DDL = '''
+    CREATE TABLE IF NOT EXISTS student_summary (
+        branch VARCHAR(100) NOT NULL,
+        semester VARCHAR(20) NOT NULL,
+        exam_type VARCHAR(50) NOT NULL,
+        student_count INT NOT NULL DEFAULT 0,
+        sum_percentage DECIMAL(14,2) NOT NULL DEFAULT 0,
+        min_percentage DECIMAL(5,2),
+        max_percentage DECIMAL(5,2),
+        passed INT NOT NULL DEFAULT 0, at_risk INT NOT NULL DEFAULT 0, star INT NOT NULL DEFAULT 0,
+        a_plus INT NOT NULL DEFAULT 0, a_grade INT NOT NULL DEFAULT 0, b_plus INT NOT NULL DEFAULT 0,
+        b_grade INT NOT NULL DEFAULT 0, c_grade INT NOT NULL DEFAULT 0, d_grade INT NOT NULL DEFAULT 0,
+        f_grade INT NOT NULL DEFAULT 0,
+        excellent INT NOT NULL DEFAULT 0, good INT NOT NULL DEFAULT 0, average INT NOT NULL DEFAULT 0,
+        poor INT NOT NULL DEFAULT 0,
+        PRIMARY KEY (branch, semester, exam_type)
+    )
+'''
+
+SUMMARY_V5_REBUILD = '''
+    INSERT INTO student_summary (branch, semester, exam_type, student_count, sum_percentage, min_percentage,
+                                 max_percentage, passed, at_risk, star, a_plus, a_grade, b_plus, b_grade,
+                                 c_grade, d_grade, f_grade, excellent, good, average, poor)
+    SELECT branch, semester, exam_type,
+           COUNT(*), SUM(percentage), MIN(percentage), MAX(percentage),
+           SUM(CASE WHEN grade != 'F' THEN 1 ELSE 0 END) AS passed,
+           SUM(CASE WHEN percentage < 40 THEN 1 ELSE 0 END) AS at_risk,
+           SUM(CASE WHEN percentage >= 90 THEN 1 ELSE 0 END) AS star,
+           SUM(CASE WHEN percentage >= 90 THEN 1 ELSE 0 END) AS a_plus,
+           SUM(CASE WHEN percentage >= 80 AND percentage < 90 THEN 1 ELSE 0 END) AS a_grade,
+           SUM(CASE WHEN percentage >= 70 AND percentage < 80 THEN 1 ELSE 0 END) AS b_plus,
+           SUM(CASE WHEN percentage >= 60 AND percentage < 70 THEN 1 ELSE 0 END) AS b_grade,
+           SUM(CASE WHEN percentage >= 50 AND percentage < 60 THEN 1 ELSE 0 END) AS c_grade,
+           SUM(CASE WHEN percentage >= 40 AND percentage < 50 THEN 1 ELSE 0 END) AS d_grade,
+           SUM(CASE WHEN percentage < 40 THEN 1 ELSE 0 END) AS f_grade,
+           SUM(CASE WHEN percentage >= 85 THEN 1 ELSE 0 END) AS excellent,
+           SUM(CASE WHEN percentage >= 70 AND percentage < 85 THEN 1 ELSE 0 END) AS good,
+           SUM(CASE WHEN percentage >= 55 AND percentage < 70 THEN 1 ELSE 0 END) AS average,
+           SUM(CASE WHEN percentage < 55 THEN 1 ELSE 0 END) AS poor
+    FROM students
+    GROUP BY branch, semester, exam_type
+'''
+
+# (version, name, steps); a step is an SQL string or a callable taking a cursor
+MIGRATIONS = [
+    (1, 'students, subjects and users', [
+        '''
+        CREATE TABLE IF NOT EXISTS students (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            roll_no VARCHAR(50) UNIQUE NOT NULL,
+            branch VARCHAR(100) NOT NULL,
+            semester VARCHAR(20) NOT NULL,
+            exam_type VARCHAR(50) NOT NULL,
+            total_marks INT NOT NULL,
+            max_marks INT NOT NULL,
+            percentage DECIMAL(5,2) NOT NULL,
+            grade VARCHAR(10) NOT NULL,
+            remarks TEXT,
+            date_created TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            class_teacher VARCHAR(255),
+            principal VARCHAR(255)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS subjects (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            student_id INT,
+            subject_name VARCHAR(255) NOT NULL,
+            marks INT NOT NULL,
+            max_marks INT NOT NULL,
+            grade VARCHAR(10),
+            FOREIGN KEY (student_id) REFERENCES students(id) ON DELETE CASCADE
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS users (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            username VARCHAR(100) UNIQUE NOT NULL,
+            password_hash VARCHAR(255) NOT NULL,
+            role VARCHAR(20) NOT NULL DEFAULT 'teacher',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+    ]),
+    (2, 'student_summary', [
+        SUMMARY_V2_DDL,
+        # Filled by migration 5
+    ]),
+    (3, 'secondary indexes on students', [
+        # Top performers, at-risk (< 40) and star (>= 90) lists
+        _create_index('students', 'idx_students_percentage', 'percentage'),
+        # Per-class filters (top performers, class PDFs, exports); covers the
+        # student_summary rebuild, which only reads these columns
+        _create_index('students', 'idx_students_class', 'branch, semester, exam_type, percentage, grade'),
+        # /history: newest first
+        _create_index('students', 'idx_students_created', 'date_created, id'),
+    ]),
+    (4, 'student search indexes', [
+        # Name prefix matches (search and typeahead); roll_no prefixes use its UNIQUE index
+        _create_index('students', 'idx_students_name', 'name'),
+        # Whole-word matches anywhere in the name
+        _create_index('students', 'ft_students_name', 'name', kind='FULLTEXT'),
+    ]),
+    (5, 'summary grade buckets follow the grading scheme', [
+        # The dashboard used 85/75/65/55 cut-offs that disagreed with the printed grades
+        'DELETE FROM student_summary',
+        SUMMARY_V5_REBUILD,
+    ]),
+]
+
+SCHEMA_TABLES = ['subjects', 'students', 'users', 'student_summary', 'schema_migrations']
+
+
+def applied_versions(cursor):
+    cursor.execute(MIGRATIONS_TABLE_DDL)
+    cursor.execute('SELECT version FROM schema_migrations')
+    return {row[0] for row in cursor.fetchall()}
+
+
+def migrate(connection):
+    """Apply pending migrations in order; returns the list of versions applied.
+
+    MySQL commits DDL implicitly, so a migration that fails part way is not
+    rolled back. Steps are written to be safe to re-run. If the active grading
+    scheme has other grades than the built-in scale the migrations were
+    written for, the summary is rebuilt for it at the end. A scheme with the
+    same grades but new cut-offs needs `flask --app app regrade`.
+    """
+    cursor = connection.cursor()
+    cursor.execute('SELECT GET_LOCK(%s, %s)', (MIGRATION_LOCK, MIGRATION_LOCK_TIMEOUT))
+    if cursor.fetchone()[0] != 1:
+        cursor.close()
+        raise RuntimeError('Timed out waiting for another migration run to finish')
+
+    applied = []
+    try:
+        done = applied_versions(cursor)
+        for version, name, steps in MIGRATIONS:
+            if version in done:
+                continue
+            print(f"Applying migration {version}: {name}")
+            for step in steps:
+                if callable(step):
+                    step(cursor)
+                else:
+                    cursor.execute(step)
+            cursor.execute('INSERT INTO schema_migrations (version, name) VALUES (%s, %s)', (version, name))
+            connection.commit()
+            applied.append(version)
+        if not summary_matches_scheme(cursor):
+            print("Rebuilding student_summary for the active grading scheme")
+            rebuild_summary(connection)
+    finally:
+        cursor.execute('SELECT RELEASE_LOCK(%s)', (MIGRATION_LOCK,))
+        cursor.fetchall()
+        cursor.close()
+    return applied
+
+
+def drop_schema(cursor):
+    """Drop every table this app owns (used by the reset-style init scripts)"""
+    cursor.execute('SET FOREIGN_KEY_CHECKS = 0')
+    for table in SCHEMA_TABLES:
+        cursor.execute(f'DROP TABLE IF EXISTS {table}')
+    cursor.execute('SET FOREIGN_KEY_CHECKS = 1')
+
+
+def seed_default_users(cursor):
+    cursor.execute('''
+        INSERT IGNORE INTO users (username, password_hash, role)
+        VALUES ('admin', %s, 'admin'), ('teacher', %s, 'teacher')
+    ''', (generate_password_hash('admin123'), generate_password_hash('teacher123')))
+
+
+# Queries that must be served from an index, with representative parameters
+HOT_QUERIES = [
+    ('history', 'SELECT * FROM students ORDER BY date_created DESC LIMIT 50', ()),
+    ('top performers', 'SELECT name, roll_no, percentage, grade FROM students ORDER BY percentage DESC LIMIT 10', ()),
+    ('top performers by class', '''
+        SELECT id, name, roll_no, percentage, grade FROM students
+        WHERE branch = %s AND semester = %s AND exam_type = %s
+        ORDER BY percentage DESC LIMIT 10
+    ''', ('CSE', '1', 'Final')),
+    ('at-risk students', f'SELECT name, roll_no, percentage FROM students WHERE percentage < {AT_RISK_BELOW:g} ORDER BY percentage ASC', ()),
+    ('star performers', f'SELECT name, roll_no, percentage FROM students WHERE percentage >= {STAR_FROM:g} ORDER BY percentage DESC', ()),
+    ('class rows', '''
+        SELECT st.* FROM students st
+        WHERE st.branch = %s AND st.semester = %s AND st.exam_type = %s
+        ORDER BY st.roll_no
+    ''', ('CSE', '1', 'Final')),
+    ('summary rebuild', REBUILD_SELECT, ()),
+    ('roll number prefix', 'SELECT id FROM students WHERE roll_no LIKE %s ORDER BY roll_no LIMIT 8', ('21CS%',)),
+    ('name prefix', 'SELECT id FROM students WHERE name LIKE %s ORDER BY name LIMIT 8', ('Ana%',)),
+    ('name words', 'SELECT id FROM students WHERE MATCH(name) AGAINST (%s IN BOOLEAN MODE)', ('+kumar*',)),
+]
+
+
+def check_query_plans(connection):
+    """EXPLAIN each hot query; return [(name, plan_row)] for full scans of students.
+
+    On a nearly empty table MySQL may legitimately prefer a scan, so run this
+    against a database with realistic data.
+    """
+    cursor = connection.cursor(dictionary=True)
+    failures = []
+    try:
+        for name, query, params in HOT_QUERIES:
+            cursor.execute(f'EXPLAIN {query}', params)
+            for plan in cursor.fetchall():
+                if plan['table'] in ('students', 'st') and plan['type'] == 'ALL':
+                    failures.append((name, plan))
+    finally:
+        cursor.close()
+    return failures
@@ -0,0 +1,185 @@
+"""
+Grace marks and moderation over stored results
+
+A rule adds (or removes) marks in one subject for a set of students, e.g.
++3 in "Mathematics" for exam_type "End Semester", capped at each subject's
+max_marks and floored at 0:
+
+    {"subject": "Mathematics", "add": 3, "exam_type": "End Semester"}
+
+plan_moderation() reads the affected subjects and their students with two
+queries and recomputes subject grades, totals, percentages and overall
+grades for all of them at once with pandas and the grading scheme.
+moderation_diff() summarizes a plan for a dry run; apply_moderation()
+writes it in chunked transactions, in student id order, one UPDATE ... CASE
+id statement per table and chunk.
+
+Each update only touches rows that still hold the values the plan was made
+from. If any row of a chunk was edited since planning, the whole chunk is
+rolled back, so a subject's gain is never applied without its student's
+total or the other way round. If a chunk fails, the chunks before it stay
+committed and ModerationFailed says how many students were moderated and
+the last student id written. Re-running the rule with "after_id" set to
+that id moderates only the rest.
+"""
+
+import pandas as pd
+
+# Optional rule filters, matched against students columns
+RULE_FILTERS = ('branch', 'semester', 'exam_type')
+
+
+def parse_rule(data):
+    """Return a validated rule dict from a request body, or raise ValueError"""
+    subject = str(data.get('subject') or '').strip()
+    if not subject:
+        raise ValueError('subject is required')
+    try:
+        add = int(data.get('add'))
+    except (TypeError, ValueError):
+        raise ValueError('add must be a whole number of marks')
+    if add == 0:
+        raise ValueError('add must not be 0')
+    filters = {key: str(data[key]).strip() for key in RULE_FILTERS if data.get(key)}
+    try:
+        after_id = int(data.get('after_id') or 0)
+    except (TypeError, ValueError):
+        raise ValueError('after_id must be a student id')
+    return {'subject': subject, 'add': add, 'filters': filters, 'after_id': after_id}
+
+
+class ModerationFailed(Exception):
+    """A chunk failed after `applied` students (up to id `last_id`) were committed"""
+
+    def __init__(self, error, applied, last_id):
+        super().__init__(str(error))
+        self.applied = applied
+        self.last_id = last_id
+
+
+def plan_moderation(connection, rule, scheme):
+    """Compute every change `rule` makes; returns (subjects, students) DataFrames of changed rows only"""
+    where = ' AND '.join(['sub.subject_name = %s', 'st.id > %s'] + [f'st.{column} = %s' for column in rule['filters']])
+    params = [rule['subject'], rule.get('after_id', 0)] + list(rule['filters'].values())
+
+    cursor = connection.cursor()
+    try:
+        cursor.execute(f'''
+            SELECT sub.id, sub.student_id, sub.marks, sub.max_marks, sub.grade
+            FROM subjects sub
+            JOIN students st ON st.id = sub.student_id
+            WHERE {where}
+        ''', params)
+        subjects = pd.DataFrame(cursor.fetchall(), columns=['id', 'student_id', 'marks', 'max_marks', 'grade'])
+
+        subjects['new_marks'] = (subjects['marks'] + rule['add']).clip(lower=0, upper=subjects['max_marks'])
+        subjects = subjects[subjects['new_marks'] != subjects['marks']].copy()
+        subjects['new_grade'] = scheme.grade_array(subjects['new_marks'] * 100 / subjects['max_marks'])
+
+        students = pd.DataFrame(columns=['id', 'roll_no', 'name', 'total_marks', 'max_marks', 'percentage',
+                                         'grade', 'remarks'])
+        if len(subjects):
+            ids = [int(student_id) for student_id in subjects['student_id'].unique()]
+            cursor.execute(f'''
+                SELECT id, roll_no, name, total_marks, max_marks, percentage, grade, remarks
+                FROM students WHERE id IN ({', '.join(['%s'] * len(ids))})
+            ''', ids)
+            students = pd.DataFrame(cursor.fetchall(), columns=students.columns).sort_values('id')
+    finally:
+        cursor.close()
+
+    gained = (subjects['new_marks'] - subjects['marks']).groupby(subjects['student_id']).sum()
+    students['new_total'] = students['total_marks'] + students['id'].map(gained).fillna(0).astype(int)
+    students['percentage'] = students['percentage'].astype(float)
+    students['new_percentage'] = (students['new_total'] * 100 / students['max_marks']).round(2)
+    grades, remarks = scheme.grade_and_remarks_array(students['new_percentage'])
+    students['new_grade'] = grades
+    students['new_remarks'] = remarks
+    return subjects, students
+
+
+def moderation_diff(subjects, students, failing_grade, sample_size=100):
+    """JSON-safe summary of a plan: counts, grade transitions and the first `sample_size` students"""
+    moved = students[students['grade'] != students['new_grade']]
+    transitions = moved.groupby(['grade', 'new_grade']).size()
+    sample = students.sort_values('roll_no').head(sample_size)
+    return {
+        'subjects_changed': len(subjects),
+        'students_changed': len(students),
+        'grades_changed': len(moved),
+        'newly_passed': int(((students['grade'] == failing_grade) & (students['new_grade'] != failing_grade)).sum()),
+        'newly_failed': int(((students['grade'] != failing_grade) & (students['new_grade'] == failing_grade)).sum()),
+        'grade_transitions': [{'from': old, 'to': new, 'count': int(count)}
+                              for (old, new), count in transitions.items()],
+        'sample': [{
+            'roll_no': row.roll_no,
+            'name': row.name,
+            'total_marks': [int(row.total_marks), int(row.new_total)],
+            'percentage': [row.percentage, float(row.new_percentage)],
+            'grade': [row.grade, row.new_grade],
+        } for row in sample.itertuples(index=False)],
+    }
+
+
+def _case_by_id(ids, values):
+    """CASE id WHEN ... END SQL and its params"""
+    params = []
+    for row_id, value in zip(ids, values):
+        params += [row_id, value]
+    return f"CASE id {' '.join(['WHEN %s THEN %s'] * len(ids))} END", params
+
+
+def _update_by_id(cursor, table, ids, columns, unless_changed):
+    """UPDATE `table` SET column = CASE id WHEN ... END for every id, in one statement.
+
+    `unless_changed` is (column, planned values): if any row's column no
+    longer holds the planned value, raises so the chunk can be rolled back.
+    Every planned row changes, so MySQL's changed-row count must equal len(ids).
+    """
+    assignments = []
+    params = []
+    for column, values in columns.items():
+        case, case_params = _case_by_id(ids, values)
+        assignments.append(f'{column} = {case}')
+        params += case_params
+    guard_column, planned = unless_changed
+    guard, guard_params = _case_by_id(ids, planned)
+    cursor.execute(f"UPDATE {table} SET {', '.join(assignments)} "
+                   f"WHERE id IN ({', '.join(['%s'] * len(ids))}) AND {guard_column} = {guard}",
+                   params + ids + guard_params)
+    if cursor.rowcount != len(ids):
+        raise RuntimeError(f'{len(ids) - cursor.rowcount} {table} rows changed since the plan was made')
+
+
+def apply_moderation(connection, subjects, students, chunk_size=1000):
+    """Write a plan, `chunk_size` students (and their subjects) per transaction.
+
+    Returns the number of students written; raises ModerationFailed if a
+    chunk fails.
+    """
+    applied = last_id = 0
+    cursor = connection.cursor()
+    try:
+        for start in range(0, len(students), chunk_size):
+            chunk = students.iloc[start:start + chunk_size]
+            chunk_subjects = subjects[subjects['student_id'].isin(chunk['id'])]
+
+            _update_by_id(cursor, 'subjects', [int(value) for value in chunk_subjects['id']], {
+                'marks': [int(value) for value in chunk_subjects['new_marks']],
+                'grade': list(chunk_subjects['new_grade']),
+            }, ('marks', [int(value) for value in chunk_subjects['marks']]))
+            _update_by_id(cursor, 'students', [int(value) for value in chunk['id']], {
+                'total_marks': [int(value) for value in chunk['new_total']],
+                'percentage': [float(value) for value in chunk['new_percentage']],
+                'grade': list(chunk['new_grade']),
+                'remarks': list(chunk['new_remarks']),
+            }, ('total_marks', [int(value) for value in chunk['total_marks']]))
+            connection.commit()
+            applied += len(chunk)
+            last_id = int(chunk['id'].iloc[-1])
+    except Exception as e:
+        connection.rollback()
+        raise ModerationFailed(e, applied, last_id) from e
+    finally:
+        cursor.close()
+    return applied
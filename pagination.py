@@ -0,0 +1,113 @@
+"""
+Keyset pagination for listings
+
+A page is fetched as "the next N rows after the last row you saw" in a
+fixed ordering that ends with the primary key, e.g. (date_created, id).
+With a matching index every page costs the same, however deep it is,
+unlike LIMIT/OFFSET which reads and throws away all earlier rows.
+
+The position is handed to clients as an opaque, signed cursor. It is
+bound to one listing, so it cannot be edited or replayed against another.
+"""
+
+import datetime
+import decimal
+
+from itsdangerous import BadSignature, URLSafeSerializer
+
+
+class CursorError(ValueError):
+    """Raised for a cursor that was tampered with or belongs to another listing"""
+
+
+class Keyset:
+    """An ordering such as [('date_created', 'DESC'), ('id', 'DESC')].
+
+    `columns` are SQL expressions (qualified if the query joins); `keys` are
+    the names the same values have in the fetched rows.
+    """
+
+    def __init__(self, name, columns, keys=None):
+        self.name = name
+        self.columns = columns
+        self.keys = keys or [column.split('.')[-1] for column, _ in columns]
+
+    def order_by(self):
+        return ', '.join(f'{column} {direction}' for column, direction in self.columns)
+
+    def after(self, values):
+        """WHERE clause (and params) selecting rows that sort after `values`.
+
+        Expanded to (a > x) OR (a = x AND b > y) so MySQL can use a range scan.
+        """
+        clauses = []
+        params = []
+        for i, (column, direction) in enumerate(self.columns):
+            op = '<' if direction == 'DESC' else '>'
+            parts = [f'{prev} = %s' for prev, _ in self.columns[:i]] + [f'{column} {op} %s']
+            clauses.append(f"({' AND '.join(parts)})")
+            params.extend(values[:i + 1])
+        return f"({' OR '.join(clauses)})", params
+
+    def values(self, row):
+        if isinstance(row, dict):
+            return [_jsonable(row[key]) for key in self.keys]
+        return [_jsonable(getattr(row, key)) for key in self.keys]
+
+
+def _jsonable(value):
+    if isinstance(value, datetime.datetime):
+        return value.strftime('%Y-%m-%d %H:%M:%S.%f')
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    return value
+
+
+class CursorCodec:
+    def __init__(self, secret_key):
+        self.secret_key = secret_key
+
+    def encode(self, keyset, values):
+        return URLSafeSerializer(self.secret_key, salt=f'cursor:{keyset.name}').dumps(values)
+
+    def decode(self, keyset, token):
+        try:
+            values = URLSafeSerializer(self.secret_key, salt=f'cursor:{keyset.name}').loads(token)
+        except BadSignature:
+            raise CursorError('Invalid cursor')
+        if not isinstance(values, list) or len(values) != len(keyset.columns):
+            raise CursorError('Invalid cursor')
+        return values
+
+
+def fetch_page(cursor, codec, keyset, select, where, params, after, page_size, projection=None):
+    """Run `select` + WHERE + keyset ORDER BY for one page.
+
+    `select` is everything up to the WHERE, `where` a list of conditions and
+    `after` the client's cursor (or None for the first page). Returns
+    (rows, next_cursor); next_cursor is None on the last page.
+
+    With a records.Projection, `cursor` is a tuple cursor and the rows
+    are returned as its records.
+    """
+    where = list(where)
+    params = list(params)
+    if after:
+        condition, after_params = keyset.after(codec.decode(keyset, after))
+        where.append(condition)
+        params += after_params
+
+    query = select
+    if where:
+        query += ' WHERE ' + ' AND '.join(where)
+    query += f' ORDER BY {keyset.order_by()} LIMIT %s'
+
+    # One extra row tells us whether there is another page
+    cursor.execute(query, params + [page_size + 1])
+    rows = cursor.fetchall()
+    if projection:
+        rows = projection.rows(rows)
+    if len(rows) <= page_size:
+        return rows, None
+    rows = rows[:page_size]
+    return rows, codec.encode(keyset, keyset.values(rows[-1]))
@@ -0,0 +1,125 @@
+"""
+Content-addressed cache for rendered marksheet PDFs
+
+A PDF is stored under a fingerprint of everything that goes into it (the
+student row, its subject rows and the Config fields printed on the page), so
+an unchanged record is never rendered twice and a changed one can never be
+served stale. The folder is kept under PDF_CACHE_MAX_BYTES by evicting the
+least recently used files; hits bump a file's mtime. A student's older
+renders are never hit again, so they are left for eviction too.
+"""
+
+import os
+import json
+import time
+import hashlib
+
+# Bump when pdf_render changes the layout so old cached files are not reused
+RENDER_VERSION = 2
+
+# Eviction frees space down to this share of max_bytes, so the next puts
+# don't each have to scan the folder again
+EVICT_TO = 0.9
+
+# Seconds between full scans of the folder size; puts in between only add to
+# a running total, since other processes also write to the folder
+RESCAN_SECONDS = 60
+
+# Config values that appear in the rendered PDF
+CACHE_CONFIG_KEYS = ('COLLEGE_NAME',)
+
+
+def marksheet_fingerprint(student, subjects, config, qr_data=None, assets=None):
+    """Stable hash of the inputs to render_marksheet_pdf(); qr_data is the QR code's content"""
+    payload = {
+        'version': RENDER_VERSION,
+        'qr': qr_data,
+        'assets': {name: etag for name, (etag, _) in (assets or {}).items()},
+        'student': student,
+        'subjects': sorted(subjects, key=lambda subject: subject['id']),
+        'config': {key: config[key] for key in CACHE_CONFIG_KEYS},
+    }
+    encoded = json.dumps(payload, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+
+class PDFCache:
+    """Size-bounded LRU directory of rendered PDFs"""
+
+    def __init__(self, folder, max_bytes):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        # Folder size at the last scan plus this process's puts since
+        self._size = None
+        self._scanned_at = 0
+        os.makedirs(folder, exist_ok=True)
+
+    def path_for(self, student_id, key):
+        return os.path.join(self.folder, f'{student_id}_{key}.pdf')
+
+    def get(self, student_id, key):
+        """Return the cached path for this fingerprint, or None"""
+        path = self.path_for(student_id, key)
+        try:
+            os.utime(path)  # Mark as recently used
+        except OSError:
+            return None
+        return path
+
+    def put(self, student_id, key, render):
+        """Store a new entry; `render(path)` must write the PDF to `path`"""
+        path = self.path_for(student_id, key)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        try:
+            render(tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        if self._size is None or time.time() - self._scanned_at > RESCAN_SECONDS:
+            self.evict()
+        else:
+            self._size += os.path.getsize(path)
+            if self._size > self.max_bytes:
+                self.evict()
+        return path
+
+    def invalidate(self, student_id=None):
+        """Drop cached PDFs for one student, or for everyone"""
+        prefix = f'{student_id}_' if student_id is not None else ''
+        for name in os.listdir(self.folder):
+            path = os.path.join(self.folder, name)
+            if name.startswith(prefix) and name.endswith('.pdf'):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass  # Removed by another worker
+        self._size = None
+
+    def evict(self):
+        """Remove least recently used files until the folder fits max_bytes (down to EVICT_TO of it)"""
+        entries = []
+        total = 0
+        for name in os.listdir(self.folder):
+            if not name.endswith('.pdf'):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.folder, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+            total += stat.st_size
+
+        if total > self.max_bytes:
+            entries.sort()
+            for _, size, name in entries:
+                if total <= self.max_bytes * EVICT_TO:
+                    break
+                try:
+                    os.remove(os.path.join(self.folder, name))
+                except OSError:
+                    pass
+                total -= size
+        self._size = total
+        self._scanned_at = time.time()
@@ -0,0 +1,210 @@
+"""
+PDF rendering for marksheets
+
+Kept free of Flask and database access so it can run in worker processes:
+callers fetch the rows and pass them in as plain dicts.
+
+Signature and seal images arrive as {name: (etag, png)} (see assets.py) and
+are decoded once per process and version, then reused for every document.
+"""
+
+import io
+
+from PIL import Image as PILImage
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import inch
+from reportlab.lib.utils import ImageReader
+from reportlab.platypus import SimpleDocTemplate, Table, Paragraph, Spacer, PageBreak, Image, Flowable
+
+from marksheet_layout import LAYOUT
+
+
+# etag -> ImageReader, shared by every document rendered in this process
+_IMAGE_READERS = {}
+_MAX_IMAGE_READERS = 16
+
+
+class _AssetImage(Flowable):
+    """Draws a shared, already-decoded image at a fixed size"""
+
+    def __init__(self, reader, width, height):
+        super().__init__()
+        self.reader = reader
+        self.width = width
+        self.height = height
+        self.hAlign = 'CENTER'
+
+    def wrap(self, available_width, available_height):
+        return self.width, self.height
+
+    def draw(self):
+        self.canv.drawImage(self.reader, 0, 0, self.width, self.height, mask='auto')
+
+
+def _asset_image(assets, name, max_width, max_height):
+    """Flowable for an uploaded asset scaled to fit the box, or '' if it is missing"""
+    if name not in assets:
+        return ''
+    etag, png = assets[name]
+    reader = _IMAGE_READERS.get(etag)
+    if reader is None:
+        if len(_IMAGE_READERS) >= _MAX_IMAGE_READERS:
+            _IMAGE_READERS.clear()
+        image = PILImage.open(io.BytesIO(png))
+        image.load()
+        reader = _IMAGE_READERS[etag] = ImageReader(image)
+    width, height = reader.getSize()
+    scale = min(max_width / width, max_height / height)
+    return _AssetImage(reader, width * scale, height * scale)
+
+
+def render_marksheet_pdf(student, subjects, output, college_name, layout=LAYOUT, qr_png=None, assets=None):
+    """Render one marksheet to `output` (a file path or binary file object).
+
+    `qr_png` is the verification QR code image and `assets` the signature
+    and seal images, if any.
+    """
+    doc = _new_document(output)
+    doc.build(build_marksheet_story(student, subjects, college_name, layout, qr_png, assets))
+
+
+def render_marksheet_pdf_bytes(student, subjects, college_name, qr_png=None, assets=None):
+    """Render one marksheet and return the PDF as bytes (picklable result for worker processes)"""
+    buffer = io.BytesIO()
+    render_marksheet_pdf(student, subjects, buffer, college_name, qr_png=qr_png, assets=assets)
+    return buffer.getvalue()
+
+
+def render_class_pdf(entries, output, college_name, assets=None):
+    """Render several marksheets into one document, one page per student.
+
+    `entries` is a list of (student, subjects, qr_png) triples; qr_png may be None.
+    """
+    story = []
+    for student, subjects, qr_png in entries:
+        if story:
+            story.append(PageBreak())
+        story.extend(build_marksheet_story(student, subjects, college_name, qr_png=qr_png, assets=assets))
+    _new_document(output).build(story)
+
+
+def _new_document(output):
+    # Create PDF with exact same layout as web view
+    return SimpleDocTemplate(output, pagesize=A4, topMargin=0.5*inch, bottomMargin=0.5*inch, 
+                             leftMargin=0.5*inch, rightMargin=0.5*inch)
+
+
+def build_marksheet_story(student, subjects, college_name, layout=LAYOUT, qr_png=None, assets=None):
+    """Flowables for one marksheet page"""
+    story = []
+
+    # Header section - exactly like web view
+    story.append(Paragraph(college_name, layout.college_header))
+    story.append(Paragraph('Academic Excellence Since 1995', layout.college_subtitle))
+    story.append(Paragraph('ACADEMIC MARKSHEET', layout.marksheet_title))
+    story.append(Paragraph(student['exam_type'], layout.exam_type))
+
+    # Student details table with exact web layout
+    student_details = [
+        ['<b>Student Name:</b>', student['name'], '<b>Roll Number:</b>', student['roll_no']],
+        ['<b>Branch:</b>', student['branch'], '<b>Semester:</b>', student['semester']],
+        ['<b>Exam Type:</b>', student['exam_type'], '<b>Result Date:</b>', student['date_created'].strftime('%B %d, %Y')]
+    ]
+
+    detail_table = Table(student_details, colWidths=layout.detail_widths)
+    detail_table.setStyle(layout.detail_table)
+
+    story.append(detail_table)
+    story.append(Spacer(1, 20))
+
+    # Subjects table - exactly matching web design with blue header
+    header_data = [['S.No.', 'Subject', 'Marks Obtained', 'Maximum Marks', 'Grade']]
+    subject_rows = []
+
+    for i, subject in enumerate(subjects, 1):
+        subject_rows.append([
+            str(i),
+            subject['subject_name'],
+            str(subject['marks']),
+            str(subject['max_marks']),
+            subject['grade']
+        ])
+
+    # Add total row
+    total_row = [['TOTAL', '', str(student['total_marks']), str(student['max_marks']), student['grade']]]
+
+    # Combine all table data
+    table_data = header_data + subject_rows + total_row
+
+    subjects_table = Table(table_data, colWidths=layout.subjects_widths)
+    subjects_table.setStyle(layout.subjects_table)
+
+    story.append(subjects_table)
+    story.append(Spacer(1, 20))
+
+    # Result summary section
+    summary_data = [
+        ['<b>Total Marks:</b>', f"{student['total_marks']}/{student['max_marks']}"],
+        ['<b>Percentage:</b>', f"{student['percentage']:.2f}%"],
+        ['<b>Grade:</b>', student['grade']],
+        ['<b>Remarks:</b>', student['remarks']]
+    ]
+
+    summary_table = Table(summary_data, colWidths=layout.summary_widths)
+    summary_table.setStyle(layout.summary_table)
+
+    story.append(summary_table)
+    story.append(Spacer(1, 25))
+
+    # Signatures section (if enabled)
+    if student.get('class_teacher') or student.get('principal'):
+        if student.get('class_teacher'):
+            sig_row = ['Class Teacher', '', 'Principal']
+            name_row = [student.get('class_teacher', ''), '', student.get('principal', '')]
+        else:
+            sig_row = ['', '', 'Principal']
+            name_row = ['', '', student.get('principal', '')]
+
+        signature_data = [sig_row, name_row]
+
+        # Uploaded signatures above the lines, college seal between them
+        assets = assets or {}
+        image_row = [
+            _asset_image(assets, 'teacher_signature', *layout.signature_image_box) if student.get('class_teacher') else '',
+            _asset_image(assets, 'college_seal', *layout.seal_image_box),
+            _asset_image(assets, 'principal_signature', *layout.signature_image_box) if student.get('principal') else '',
+        ]
+        if any(image_row):
+            signature_data.append(image_row)
+
+        signature_data += [
+            ['_________________', '', '_________________'],
+            ['', '', '']
+        ]
+
+        signature_table = Table(signature_data, colWidths=layout.signature_widths)
+        signature_table.setStyle(layout.signature_table)
+
+        story.append(signature_table)
+        story.append(Spacer(1, 15))
+
+    # Verification section, with the signed QR code beside it when available
+    verification_text = f"""
+    <b>Digital Verification</b><br/>
+    This marksheet is digitally verified and authentic.<br/>
+    <b>Verified by {college_name}</b><br/>
+    Student ID: {student['id']}
+    """
+    verification = Paragraph(verification_text, layout.verification)
+
+    story.append(Spacer(1, 10))
+    if qr_png:
+        qr_image = Image(io.BytesIO(qr_png), width=layout.qr_size, height=layout.qr_size)
+        verification_table = Table([[verification, qr_image]], colWidths=layout.verification_widths)
+        verification_table.setStyle(layout.verification_table)
+        story.append(verification_table)
+    else:
+        story.append(verification)
+    story.append(Spacer(1, 10))
+
+    return story
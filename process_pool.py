@@ -0,0 +1,82 @@
+"""
+Process pools for background work
+
+Each web worker owns its pools. A pool is recreated after fork (children
+must never share their parent's pool) and after it breaks: when one child
+dies abruptly (OOM kill, a segfault in ReportLab or Pillow),
+concurrent.futures marks the whole pool broken and fails every later
+submit, so the broken pool is replaced instead of being reused.
+
+Children are started by a fork server (spawn where there is none), not
+forked from the web worker: under threaded gunicorn workers another thread
+may hold a lock (logging, the DB pool, an import) at the moment of a fork,
+and the forked child would wait on it forever. Everything submitted must
+therefore be a module-level function with picklable arguments.
+"""
+
+import os
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+
+def pid_alive(pid):
+    """True if a process with this pid exists on this host"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        pass  # Exists but belongs to someone else
+    return True
+
+
+class ProcessPool:
+    """ProcessPoolExecutor that survives forks and dead children"""
+
+    def __init__(self, max_workers):
+        self.max_workers = max_workers
+        self._executor = None
+        self._executor_pid = None
+        self._lock = threading.Lock()
+
+    def executor(self):
+        """A working executor for this process"""
+        with self._lock:
+            # _broken is set by concurrent.futures once a child has died
+            if (self._executor is None or self._executor_pid != os.getpid()
+                    or getattr(self._executor, '_broken', False)):
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                     mp_context=multiprocessing.get_context(START_METHOD))
+                self._executor_pid = os.getpid()
+            return self._executor
+
+    def _discard(self, executor):
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+        executor.shutdown(wait=False)
+
+    def submit(self, fn, *args, on_broken=None):
+        """Submit fn(*args), replacing a broken pool once.
+
+        `on_broken(error)` is called if the pool breaks before the call
+        finishes (its child, or another one, died), since such a call never
+        reports back on its own.
+        """
+        executor = self.executor()
+        try:
+            future = executor.submit(fn, *args)
+        except BrokenProcessPool:
+            self._discard(executor)
+            future = self.executor().submit(fn, *args)
+
+        if on_broken:
+            def check(done):
+                if not done.cancelled() and isinstance(done.exception(), BrokenProcessPool):
+                    on_broken(done.exception())
+            future.add_done_callback(check)
+        return future
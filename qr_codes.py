@@ -0,0 +1,58 @@
+"""
+Cached QR code images
+
+QR PNGs are generated once per distinct content (the signed verification
+URL of a marksheet) and kept in QR_CACHE_FOLDER, shared by every worker.
+A record's QR only changes when its signed token does, i.e. when the marks
+or the signing key change.
+"""
+
+import io
+import os
+import hashlib
+
+import qrcode
+
+
+def make_qr_png(data):
+    qr = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_M, box_size=6, border=2)
+    qr.add_data(data)
+    qr.make(fit=True)
+    buffer = io.BytesIO()
+    qr.make_image(fill_color='black', back_color='white').save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+class QRCache:
+    def __init__(self, folder):
+        self.folder = folder
+        os.makedirs(folder, exist_ok=True)
+
+    def path_for(self, data):
+        return os.path.join(self.folder, hashlib.sha256(data.encode('utf-8')).hexdigest()[:32] + '.png')
+
+    def png(self, data):
+        """PNG bytes of the QR code for `data`, generated on first use (None without data)"""
+        if not data:
+            return None
+        path = self.path_for(data)
+        try:
+            with open(path, 'rb') as f:
+                return f.read()
+        except OSError:
+            pass
+
+        png = make_qr_png(data)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(png)
+        os.replace(tmp_path, path)
+        return png
+
+    def clear(self):
+        for name in os.listdir(self.folder):
+            if name.endswith('.png'):
+                try:
+                    os.remove(os.path.join(self.folder, name))
+                except OSError:
+                    pass
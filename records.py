@@ -0,0 +1,54 @@
+"""
+Projected student columns for read paths
+
+Listing endpoints used to fetch `SELECT *` through dictionary cursors, so
+every row was a dict of all 14 students columns (remarks TEXT included).
+
+A Projection names the columns one endpoint actually shows. JSON listings
+select just those columns into dictionary-cursor rows, which the JSON
+encoder walks natively. Pages rendered by templates (history) fetch them
+through a plain tuple cursor into a __slots__ record class instead: no
+per-row dict, and templates read them by attribute as before.
+
+benchmarks/bench_records.py compares records with projected dicts.
+"""
+
+import dataclasses
+
+
+def record_type(name, fields):
+    """A __slots__ class with one attribute per field, built positionally: Row(*values)"""
+    return dataclasses.make_dataclass(name, fields, slots=True, eq=False)
+
+
+class Projection:
+    """The students columns one endpoint needs, and the record type that holds them"""
+
+    def __init__(self, name, columns, table='students', alias=''):
+        self.columns = tuple(columns)
+        self.table = table
+        self.alias = alias
+        self.row = record_type(name, self.columns)
+
+    def select(self):
+        """SELECT ... FROM part of a query (add WHERE/ORDER BY after it)"""
+        prefix = f'{self.alias}.' if self.alias else ''
+        source = f'{self.table} {self.alias}' if self.alias else self.table
+        return f"SELECT {', '.join(prefix + column for column in self.columns)} FROM {source}"
+
+    def rows(self, tuples):
+        row = self.row
+        return [row(*values) for values in tuples]
+
+    def fetch_all(self, cursor, query, params=()):
+        """Run `query` on a tuple cursor (connection.cursor()) and return records"""
+        cursor.execute(query, params)
+        return self.rows(cursor.fetchall())
+
+
+# Per-endpoint column sets
+LISTING = Projection('ListingRow', ['id', 'name', 'roll_no', 'branch', 'semester', 'exam_type', 'percentage'])
+PERFORMER = Projection('PerformerRow', ['id', 'name', 'roll_no', 'branch', 'semester', 'exam_type',
+                                        'total_marks', 'max_marks', 'percentage', 'grade'])
+HISTORY = Projection('HistoryRow', ['id', 'name', 'roll_no', 'branch', 'semester', 'exam_type', 'total_marks',
+                                    'max_marks', 'percentage', 'grade', 'remarks', 'date_created'])
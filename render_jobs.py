@@ -0,0 +1,158 @@
+"""
+Background PDF rendering queue
+
+Jobs run in a process pool so slow ReportLab builds never hold a web worker.
+Job state lives on disk in PDF_JOBS_FOLDER (not in memory), so any gunicorn
+worker can answer a status or download request for a job another one queued:
+
+    <job_id>.json   job metadata, written when the job is queued
+    <job_id>.pdf    the finished file (written atomically)
+    <job_id>.error  failure message
+
+Single-marksheet jobs render through the PDF cache, so a marksheet that
+was already rendered (by a job, a download or a class ZIP) is not rendered
+again; the job's .pdf is a hard link to the cached file.
+
+A job whose render process died, or whose web worker (and with it the
+pool) went away, is reported as failed rather than pending forever.
+"""
+
+import os
+import re
+import json
+import time
+import uuid
+import shutil
+
+from pdf_render import render_marksheet_pdf, render_class_pdf
+from process_pool import ProcessPool, pid_alive
+
+JOB_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+
+def _render_job(job_id, student, subjects, college_name, folder, pdf_cache, cache_key, qr_png=None, assets=None):
+    """Runs in a worker process: render into the PDF cache (unless another job already did) and link the job to it"""
+    def render(path):
+        cached_path = pdf_cache.get(student['id'], cache_key)
+        if not cached_path:
+            cached_path = pdf_cache.put(student['id'], cache_key,
+                                        lambda tmp_path: render_marksheet_pdf(student, subjects, tmp_path, college_name,
+                                                                              qr_png=qr_png, assets=assets))
+        _link(cached_path, path)
+
+    _write_pdf(folder, job_id, render)
+
+
+def _render_class_job(job_id, entries, college_name, folder, assets=None):
+    """Runs in a worker process: a whole class in one document, written straight to disk"""
+    _write_pdf(folder, job_id, lambda path: render_class_pdf(entries, path, college_name, assets))
+
+
+def _write_pdf(folder, job_id, render):
+    """Call render(path) and publish the file atomically, or record the error"""
+    final_path = os.path.join(folder, f'{job_id}.pdf')
+    tmp_path = final_path + '.tmp'
+    try:
+        render(tmp_path)
+        os.replace(tmp_path, final_path)
+    except Exception as e:
+        _write_error(folder, job_id, str(e))
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _link(source, path):
+    """Give the job its own name for a cached file, so cache eviction can't pull it from under a download"""
+    try:
+        os.link(source, path)
+    except OSError:
+        shutil.copyfile(source, path)  # Different filesystem, or no hard links
+
+
+def _write_error(folder, job_id, message):
+    if not os.path.exists(os.path.join(folder, f'{job_id}.pdf')):
+        with open(os.path.join(folder, f'{job_id}.error'), 'w') as f:
+            f.write(message)
+
+
+class RenderQueue:
+    """Submit marksheet PDFs for rendering and look up their status"""
+
+    def __init__(self, folder, max_workers=2, job_ttl=3600):
+        self.folder = folder
+        self.max_workers = max_workers
+        self.job_ttl = job_ttl
+        self.pool = ProcessPool(max_workers)
+        os.makedirs(folder, exist_ok=True)
+
+    def submit(self, student, subjects, college_name, download_name, pdf_cache, cache_key, qr_png=None, assets=None):
+        """Queue a render, stored in `pdf_cache` under `cache_key`, and return its job id"""
+        return self._queue({'student_id': student['id'], 'download_name': download_name},
+                           _render_job, student, subjects, college_name, self.folder, pdf_cache, cache_key,
+                           qr_png, assets)
+
+    def submit_class(self, entries, college_name, download_name, assets=None):
+        """Queue one merged PDF of (student, subjects, qr_png) entries and return its job id"""
+        return self._queue({'student_count': len(entries), 'download_name': download_name},
+                           _render_class_job, entries, college_name, self.folder, assets)
+
+    def _queue(self, meta, render, *args):
+        self.cleanup()
+        job_id = uuid.uuid4().hex
+        with open(self._path(job_id, 'json'), 'w') as f:
+            json.dump({
+                'job_id': job_id,
+                **meta,
+                'queued_at': time.time(),
+                'pid': os.getpid(),
+            }, f)
+        try:
+            self.pool.submit(render, job_id, *args,
+                             on_broken=lambda e: _write_error(self.folder, job_id, 'Render process died'))
+        except Exception as e:
+            _write_error(self.folder, job_id, f'Could not start render: {e}')
+            raise
+        return job_id
+
+    def status(self, job_id):
+        """Return the job metadata plus its state, or None for unknown ids"""
+        if not JOB_ID_PATTERN.match(job_id or '') or not os.path.exists(self._path(job_id, 'json')):
+            return None
+
+        with open(self._path(job_id, 'json')) as f:
+            job = json.load(f)
+
+        if os.path.exists(self._path(job_id, 'pdf')):
+            job['state'] = 'done'
+        elif os.path.exists(self._path(job_id, 'error')):
+            job['state'] = 'failed'
+            with open(self._path(job_id, 'error')) as f:
+                job['error'] = f.read()
+        elif job.get('pid') and not pid_alive(job['pid']):
+            # The web worker that queued it (and its render pool) is gone
+            _write_error(self.folder, job_id, 'Render was interrupted by a worker restart')
+            return self.status(job_id)
+        else:
+            job['state'] = 'pending'
+        return job
+
+    def pdf_path(self, job_id):
+        return self._path(job_id, 'pdf')
+
+    def cleanup(self):
+        """Delete job files older than job_ttl"""
+        cutoff = time.time() - self.job_ttl
+        for name in os.listdir(self.folder):
+            path = os.path.join(self.folder, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass  # Removed by another worker
+
+    def _path(self, job_id, ext):
+        return os.path.join(self.folder, f'{job_id}.{ext}')
+
+    def executor(self):
+        """The render process pool (one per process; recreated after fork or when broken)"""
+        return self.pool.executor()
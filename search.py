@@ -0,0 +1,109 @@
+"""
+Student search for the history page and the typeahead endpoint
+
+Matches come from three indexed lookups instead of a LIKE '%q%' scan:
+
+- roll number prefix (the roll_no UNIQUE index), exact matches first
+- name prefix (idx_students_name)
+- whole words anywhere in the name (the ft_students_name FULLTEXT index),
+  ranked by MySQL's relevance score
+
+Results are paged with a keyset cursor on (score, id).
+
+Typeahead only uses the two prefix lookups, each a bounded index range scan.
+"""
+
+import re
+
+from pagination import Keyset, fetch_page
+
+# Rank of each kind of match; FULLTEXT relevance scores stay well below these
+EXACT_ROLL_SCORE = 3000
+ROLL_PREFIX_SCORE = 2000
+NAME_PREFIX_SCORE = 1000
+
+# InnoDB's default innodb_ft_min_token_size; shorter words are not indexed
+FULLTEXT_MIN_TOKEN = 3
+
+SEARCH_COLUMNS = '''st.id, st.name, st.roll_no, st.branch, st.semester, st.exam_type,
+                    st.total_marks, st.max_marks, st.percentage, st.grade, st.remarks, st.date_created'''
+
+
+def like_prefix(query):
+    """LIKE pattern matching values that start with `query` literally"""
+    return re.sub(r'([\\%_])', r'\\\1', query) + '%'
+
+
+def fulltext_terms(query):
+    """BOOLEAN MODE expression requiring every indexable word, each as a prefix.
+
+    Operators typed by the user are dropped rather than interpreted. Returns
+    '' when no word is long enough to be in the FULLTEXT index.
+    """
+    words = re.findall(r'\w+', query)
+    return ' '.join(f'+{word}*' for word in words if len(word) >= FULLTEXT_MIN_TOKEN)
+
+
+# Ranked results page by (score, id), both descending
+SEARCH_KEYSET = Keyset('search', [('hits.score', 'DESC'), ('st.id', 'DESC')], keys=['score', 'id'])
+
+
+def search_students(connection, codec, query, page_size, after=None):
+    """Ranked matches for `query`: exact roll, roll prefix, name prefix, then name words.
+
+    Returns (rows, next_cursor) like pagination.fetch_page().
+    """
+    query = query.strip()
+    prefix = like_prefix(query)
+    branches = [
+        f'SELECT id, {EXACT_ROLL_SCORE} AS score FROM students WHERE roll_no = %s',
+        f'SELECT id, {ROLL_PREFIX_SCORE} FROM students WHERE roll_no LIKE %s',
+        f'SELECT id, {NAME_PREFIX_SCORE} FROM students WHERE name LIKE %s',
+    ]
+    params = [query, prefix, prefix]
+
+    terms = fulltext_terms(query)
+    if terms:
+        branches.append('''
+            SELECT id, MATCH(name) AGAINST (%s IN BOOLEAN MODE) FROM students
+            WHERE MATCH(name) AGAINST (%s IN BOOLEAN MODE)
+        ''')
+        params += [terms, terms]
+
+    select = f'''
+        SELECT {SEARCH_COLUMNS}, hits.score
+        FROM (
+            SELECT id, MAX(score) AS score
+            FROM ({' UNION ALL '.join(branches)}) matches
+            GROUP BY id
+        ) hits
+        JOIN students st ON st.id = hits.id
+    '''
+    cursor = connection.cursor(dictionary=True)
+    try:
+        return fetch_page(cursor, codec, SEARCH_KEYSET, select, [], params, after, page_size)
+    finally:
+        cursor.close()
+
+
+def suggest_students(connection, query, limit):
+    """Up to `limit` roll-number and name prefix matches for typeahead"""
+    prefix = like_prefix(query.strip())
+    cursor = connection.cursor(dictionary=True)
+    try:
+        cursor.execute('''
+            (SELECT id, name, roll_no, branch, semester, 0 AS kind FROM students
+             WHERE roll_no LIKE %s ORDER BY roll_no LIMIT %s)
+            UNION
+            (SELECT id, name, roll_no, branch, semester, 1 AS kind FROM students
+             WHERE name LIKE %s ORDER BY name LIMIT %s)
+            ORDER BY kind, IF(kind = 0, roll_no, name)
+            LIMIT %s
+        ''', (prefix, limit, prefix, limit, limit))
+        suggestions = {}
+        for row in cursor.fetchall():
+            row.pop('kind')
+            suggestions.setdefault(row['id'], row)
+        return list(suggestions.values())
+    finally:
+        cursor.close()
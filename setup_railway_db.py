@@ -5,7 +5,7 @@ Run this to initialize your Railway MySQL database
 """
 
 import mysql.connector
-from werkzeug.security import generate_password_hash
+from migrations import migrate, drop_schema, seed_default_users
 import os
 
 # Railway MySQL credentials (from environment variables)
@@ -34,72 +34,17 @@ try:
     
     # Drop existing tables (for clean setup)
     print("\n🗑️  Dropping existing tables (if any)...")
-    cursor.execute('SET FOREIGN_KEY_CHECKS = 0')
-    cursor.execute('DROP TABLE IF EXISTS subjects')
-    cursor.execute('DROP TABLE IF EXISTS students')
-    cursor.execute('DROP TABLE IF EXISTS users')
-    cursor.execute('SET FOREIGN_KEY_CHECKS = 1')
+    drop_schema(cursor)
     print("✅ Old tables removed")
     
-    # Create students table
-    print("\n📝 Creating students table...")
-    cursor.execute('''
-        CREATE TABLE students (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            name VARCHAR(255) NOT NULL,
-            roll_no VARCHAR(50) UNIQUE NOT NULL,
-            branch VARCHAR(100) NOT NULL,
-            semester VARCHAR(20) NOT NULL,
-            exam_type VARCHAR(50) NOT NULL,
-            total_marks INT NOT NULL,
-            max_marks INT NOT NULL,
-            percentage DECIMAL(5,2) NOT NULL,
-            grade VARCHAR(10) NOT NULL,
-            remarks TEXT,
-            date_created TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            class_teacher VARCHAR(255),
-            principal VARCHAR(255)
-        )
-    ''')
-    print("✅ Students table created")
-    
-    # Create subjects table
-    print("\n📚 Creating subjects table...")
-    cursor.execute('''
-        CREATE TABLE subjects (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            student_id INT,
-            subject_name VARCHAR(255) NOT NULL,
-            marks INT NOT NULL,
-            max_marks INT NOT NULL,
-            grade VARCHAR(10),
-            FOREIGN KEY (student_id) REFERENCES students(id) ON DELETE CASCADE
-        )
-    ''')
-    print("✅ Subjects table created")
-    
-    # Create users table
-    print("\n👥 Creating users table...")
-    cursor.execute('''
-        CREATE TABLE users (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            username VARCHAR(100) UNIQUE NOT NULL,
-            password_hash VARCHAR(255) NOT NULL,
-            role VARCHAR(20) NOT NULL DEFAULT 'teacher',
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    ''')
-    print("✅ Users table created")
+    # Create tables and indexes
+    print("\n📝 Applying schema migrations...")
+    migrate(connection)
+    print("✅ Tables created")
     
     # Create default users
     print("\n🔐 Creating default users...")
-    admin_password = generate_password_hash('admin123')
-    teacher_password = generate_password_hash('teacher123')
-    
-    cursor.execute('''
-        INSERT INTO users (username, password_hash, role) 
-        VALUES ('admin', %s, 'admin'), ('teacher', %s, 'teacher')
-    ''', (admin_password, teacher_password))
+    seed_default_users(cursor)
     
     connection.commit()
     print("✅ Default users created")
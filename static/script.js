@@ -5,7 +5,10 @@ let subjectCount = 1;
 document.addEventListener('DOMContentLoaded', function() {
     initializeForm();
     attachEventListeners();
-    updateMarksCalculation();
+    // Pages other than the generate form (e.g. history) load this file for its job helpers
+    if (document.getElementById('totalMarks')) {
+        updateMarksCalculation();
+    }
     initializeExcelUpload();
     initializeMobileMenu();
 });
@@ -206,34 +209,29 @@ function updateMarksCalculation() {
     percentageElement.className = getPercentageClass(percentage);
 }
 
+// Grading scheme rendered by the server (grading.py), so the preview matches the saved grade
+let gradeScale = null;
+
+function getGradeScale() {
+    if (!gradeScale) {
+        const element = document.getElementById('grade-scale');
+        gradeScale = element ? JSON.parse(element.textContent) : [[0, 'F', '']];
+    }
+    return gradeScale;
+}
+
 // Calculate grade based on percentage
 function calculateGrade(percentage) {
-    if (percentage >= 90) {
-        return { grade: 'A+', remarks: 'Outstanding Performance' };
-    } else if (percentage >= 80) {
-        return { grade: 'A', remarks: 'Excellent Performance' };
-    } else if (percentage >= 70) {
-        return { grade: 'B+', remarks: 'Very Good Performance' };
-    } else if (percentage >= 60) {
-        return { grade: 'B', remarks: 'Good Performance' };
-    } else if (percentage >= 50) {
-        return { grade: 'C', remarks: 'Satisfactory Performance' };
-    } else if (percentage >= 40) {
-        return { grade: 'D', remarks: 'Needs Improvement' };
-    } else {
-        return { grade: 'F', remarks: 'Failed - Requires Re-examination' };
-    }
+    const scale = getGradeScale();
+    // The server grades the percentage as stored, to two decimals
+    const rounded = Math.round(percentage * 100) / 100;
+    const [, grade, remarks] = scale.find(([minimum]) => rounded >= minimum) || scale[scale.length - 1];
+    return { grade, remarks };
 }
 
 // Get CSS class for percentage styling
 function getPercentageClass(percentage) {
-    if (percentage >= 90) return 'grade-aplus';
-    if (percentage >= 80) return 'grade-a';
-    if (percentage >= 70) return 'grade-bplus';
-    if (percentage >= 60) return 'grade-b';
-    if (percentage >= 50) return 'grade-c';
-    if (percentage >= 40) return 'grade-d';
-    return 'grade-f';
+    return `grade-${calculateGrade(percentage).grade.toLowerCase().replace('+', 'plus')}`;
 }
 
 // Validate file upload
@@ -600,33 +598,31 @@ function importExcelData(file) {
     const formData = new FormData();
     formData.append('excel_file', file);
 
-    fetch('/import_excel', {
-        method: 'POST',
-        body: formData
-    })
-    .then(response => response.json())
-    .then(data => {
+    postJob('/import_excel', { body: formData })
+    .then(queued => trackJob(queued, `Importing ${file.name}`))
+    .then(job => {
+        const data = job.result;
         hideFileProcessing();
         
-        if (data.success) {
-            populateFormWithExcelData(data.data);
-            showUploadSuccess(`Successfully imported data for ${data.data.length} student(s)!`);
-            
-            // Hide excel section after successful import
-            const uploadSection = document.getElementById('excelUploadSection');
-            const toggleBtn = document.getElementById('toggleExcelUpload');
-            uploadSection.style.display = 'none';
-            toggleBtn.textContent = '📊 Import from Excel';
-            toggleBtn.classList.remove('btn-secondary');
-            toggleBtn.classList.add('btn-primary');
-            
-        } else {
-            showUploadError('Error importing Excel file: ' + data.message);
+        populateFormWithExcelData(data.preview, data.count, data.import_id);
+        let message = `Successfully imported data for ${data.count} student(s)!`;
+        if (data.error_count) {
+            const first = data.errors[0];
+            message += ` ${data.error_count} problem(s) skipped, e.g. row ${first.row}${first.column ? ' / ' + first.column : ''}: ${first.error}`;
         }
+        showUploadSuccess(message);
+        
+        // Hide excel section after successful import
+        const uploadSection = document.getElementById('excelUploadSection');
+        const toggleBtn = document.getElementById('toggleExcelUpload');
+        uploadSection.style.display = 'none';
+        toggleBtn.textContent = '📊 Import from Excel';
+        toggleBtn.classList.remove('btn-secondary');
+        toggleBtn.classList.add('btn-primary');
     })
     .catch(error => {
         hideFileProcessing();
-        showUploadError('Error processing file: ' + error.message);
+        showUploadError('Error importing Excel file: ' + error.message);
         console.error('Excel import error:', error);
     })
     .finally(() => {
@@ -635,7 +631,7 @@ function importExcelData(file) {
     });
 }
 
-function populateFormWithExcelData(studentsData) {
+function populateFormWithExcelData(studentsData, totalCount, importId) {
     if (studentsData.length === 0) return;
     
     // For now, populate with the first student's data
@@ -667,21 +663,21 @@ function populateFormWithExcelData(studentsData) {
     updateMarksCalculation();
     
     // If multiple students, show option to process them all
-    if (studentsData.length > 1) {
-        showMultipleStudentsOption(studentsData);
+    if (totalCount > 1) {
+        showMultipleStudentsOption(studentsData[0], totalCount, importId);
     }
 }
 
-function showMultipleStudentsOption(studentsData) {
+function showMultipleStudentsOption(firstStudent, totalCount, importId) {
     const notification = document.createElement('div');
     notification.className = 'file-success';
     notification.innerHTML = `
         <div class="success-text">
-            Found ${studentsData.length} students in Excel file. Currently showing data for: ${studentsData[0].student_name}
+            Found ${totalCount} students in Excel file. Currently showing data for: ${firstStudent.student_name}
         </div>
         <div style="margin-top: 1rem; text-align: center;">
             <button type="button" class="btn-primary" onclick="processBulkStudents()">
-                Process All ${studentsData.length} Students
+                Process All ${totalCount} Students
             </button>
         </div>
     `;
@@ -689,37 +685,39 @@ function showMultipleStudentsOption(studentsData) {
     const uploadSection = document.getElementById('excelUploadSection');
     uploadSection.appendChild(notification);
     
-    // Store data for bulk processing
-    window.bulkStudentsData = studentsData;
+    // The rows stay staged on the server; only the import id is kept here
+    window.bulkImport = { id: importId, count: totalCount };
 }
 
 function processBulkStudents() {
-    if (!window.bulkStudentsData) return;
+    if (!window.bulkImport) return;
     
     // Redirect to bulk processing page or handle bulk creation
-    const confirmation = confirm(`This will create marksheets for all ${window.bulkStudentsData.length} students. Continue?`);
+    const confirmation = confirm(`This will create marksheets for all ${window.bulkImport.count} students. Continue?`);
     
     if (confirmation) {
-        fetch('/bulk_create_marksheets', {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json',
-            },
-            body: JSON.stringify({
-                students: window.bulkStudentsData
-            })
-        })
-        .then(response => response.json())
-        .then(data => {
-            if (data.success) {
-                alert(`Successfully created marksheets for ${data.created_count} students!`);
-                window.location.href = '/history';
-            } else {
-                alert('Error creating bulk marksheets: ' + data.message);
+        postJob(`/import_excel/${window.bulkImport.id}/commit`)
+        .then(queued => trackJob(queued, `Creating ${window.bulkImport.count} marksheets`))
+        .then(job => {
+            const data = job.result;
+            let summary = `Successfully created marksheets for ${data.created_count} students!`;
+            if (data.duplicate_count) {
+                summary += `\nSkipped ${data.duplicate_count} duplicate roll number(s).`;
+            }
+            if (data.error_count) {
+                summary += `\n${data.error_count} row(s) had errors, e.g. row ${data.errors[0].row}: ${data.errors[0].error}`;
             }
+            alert(summary);
+            window.location.href = '/history';
         })
         .catch(error => {
-            alert('Error processing bulk students: ' + error.message);
+            if (error.message === 'Cancelled') {
+                // Chunks are committed as they go; the rows created so far stay
+                alert('Bulk import aborted. Marksheets created before the abort were kept.');
+                window.location.href = '/history';
+                return;
+            }
+            alert('Error creating bulk marksheets: ' + error.message);
         });
     }
 }
@@ -870,6 +868,244 @@ function setButtonLoading(button, isLoading = true) {
     }
 }
 
+// Background Jobs
+// Long operations (imports, bulk creation, exports, clearing data) answer with
+// a job id; trackJob follows /jobs/<id>/events (or polls /jobs/<id>) and
+// shows progress, live counters, rate and ETA, with cancel and retry.
+const JOB_POLL_INTERVAL = 1000;
+
+function postJob(url, options = {}) {
+    return fetch(url, { method: 'POST', ...options })
+        .then(response => response.json())
+        .then(data => {
+            if (!data.success) {
+                throw new Error(data.message);
+            }
+            return data;
+        });
+}
+
+function createJobPanel(title) {
+    const panel = document.createElement('div');
+    panel.className = 'job-panel';
+    panel.innerHTML = `
+        <div class="job-panel-title"></div>
+        <div class="job-panel-bar"><div class="job-panel-fill"></div></div>
+        <div class="job-panel-message">Queued...</div>
+        <div class="job-panel-detail"></div>
+        <div class="job-panel-actions">
+            <button type="button" class="btn-secondary job-retry" style="display: none;">Retry</button>
+            <button type="button" class="btn-secondary job-cancel">Cancel</button>
+        </div>
+    `;
+    panel.querySelector('.job-panel-title').textContent = title;
+    document.body.appendChild(panel);
+    return panel;
+}
+
+function updateJobPanel(panel, job) {
+    const failed = job.state === 'failed';
+    panel.classList.toggle('failed', failed);
+    panel.querySelector('.job-panel-fill').style.width = `${job.progress}%`;
+    panel.querySelector('.job-panel-message').textContent = failed
+        ? `Failed: ${job.error}`
+        : `${Math.floor(job.progress)}%${job.message ? ' - ' + job.message : ''}`;
+    panel.querySelector('.job-panel-detail').textContent = formatJobDetail(job);
+    panel.querySelector('.job-retry').style.display = failed ? '' : 'none';
+    panel.querySelector('.job-cancel').textContent = failed ? 'Close' : 'Cancel';
+}
+
+function formatDuration(seconds) {
+    const minutes = Math.floor(seconds / 60);
+    const rest = String(seconds % 60).padStart(2, '0');
+    return minutes >= 60 ? `${Math.floor(minutes / 60)}h ${minutes % 60}m` : `${minutes}:${rest}`;
+}
+
+function formatJobDetail(job) {
+    // Live counters of a bulk insert: inserted / duplicates / errors, rate and ETA
+    const detail = job.detail;
+    if (!detail || detail.processed === undefined) return '';
+    
+    const parts = [
+        `${detail.inserted.toLocaleString()} inserted`,
+        `${detail.duplicates.toLocaleString()} duplicates`,
+        `${detail.errors.toLocaleString()} errors`
+    ];
+    if (job.throughput) {
+        parts.push(`${Math.round(job.throughput.rows_per_second).toLocaleString()} rows/s`);
+        if (job.throughput.eta_seconds !== null) {
+            parts.push(`ETA ${formatDuration(job.throughput.eta_seconds)}`);
+        }
+    }
+    return parts.join(' · ');
+}
+
+function trackJob(queued, title) {
+    // Resolves with the finished job (job.result holds the operation's report)
+    const panel = createJobPanel(title);
+    const jobUrl = queued.status_url;
+    let failedJob = null;
+    
+    return new Promise((resolve, reject) => {
+        const finish = (callback, value) => {
+            panel.remove();
+            callback(value);
+        };
+        
+        // Returns true once the job has reached a final state
+        const handle = job => {
+            updateJobPanel(panel, job);
+            if (job.state === 'done') {
+                finish(resolve, job);
+            } else if (job.state === 'cancelled') {
+                finish(reject, new Error('Cancelled'));
+            } else if (job.state === 'failed') {
+                failedJob = job;
+            } else {
+                return false;
+            }
+            return true;
+        };
+        
+        const poll = () => {
+            fetch(jobUrl)
+                .then(response => response.json())
+                .then(data => {
+                    if (!data.success) {
+                        throw new Error(data.message);
+                    }
+                    if (!handle(data.job)) {
+                        setTimeout(poll, JOB_POLL_INTERVAL);
+                    }
+                })
+                .catch(error => finish(reject, error));
+        };
+        
+        const follow = () => {
+            if (typeof EventSource === 'undefined') {
+                poll();
+                return;
+            }
+            // The server ends each stream after a while; EventSource reconnects by itself
+            const source = new EventSource(`${jobUrl}/events`);
+            const onEvent = event => {
+                if (handle(JSON.parse(event.data))) {
+                    source.close();
+                }
+            };
+            ['progress', 'done', 'failed', 'cancelled'].forEach(name => source.addEventListener(name, onEvent));
+            source.onerror = () => {
+                // A refused stream (not a reconnect) closes for good; fall back to polling
+                if (source.readyState === EventSource.CLOSED) {
+                    poll();
+                }
+            };
+        };
+        
+        panel.querySelector('.job-cancel').addEventListener('click', () => {
+            if (failedJob) {
+                finish(reject, new Error(failedJob.error));
+                return;
+            }
+            postJob(`${jobUrl}/cancel`).catch(error => showNotification(error.message, 'error'));
+        });
+        
+        panel.querySelector('.job-retry').addEventListener('click', () => {
+            postJob(`${jobUrl}/retry`)
+                .then(() => {
+                    failedJob = null;
+                    updateJobPanel(panel, { state: 'queued', progress: 0, message: 'Queued' });
+                    follow();
+                })
+                .catch(error => showNotification(error.message, 'error'));
+        });
+        
+        follow();
+    });
+}
+
+function downloadClassPdf(event) {
+    // A merged class PDF is rendered as a background job; the ZIP streams as before
+    const form = event.currentTarget;
+    if (form.elements.format.value !== 'pdf') return;
+    event.preventDefault();
+    
+    const params = new URLSearchParams(new FormData(form));
+    fetch(`${form.action}?${params}`)
+        .then(response => response.json())
+        .then(data => {
+            if (!data.success) {
+                throw new Error(data.message);
+            }
+            showNotification(`Rendering ${data.student_count} marksheets...`, 'info');
+            return waitForRender(data);
+        })
+        .then(downloadUrl => {
+            window.location.href = downloadUrl;
+        })
+        .catch(error => showNotification('Class PDF failed: ' + error.message, 'error'));
+}
+
+function downloadMarksheetPdf(button, renderUrl) {
+    // Cached PDFs download straight away; others are rendered by a background job first
+    button.disabled = true;
+    fetch(renderUrl, { method: 'POST' })
+        .then(response => response.json().then(data => ({ status: response.status, data })))
+        .then(({ status, data }) => {
+            if (!data.success) {
+                throw new Error(data.message);
+            }
+            if (status !== 202) {
+                return data.download_url;
+            }
+            showNotification('Rendering PDF...', 'info');
+            return waitForRender(data);
+        })
+        .then(downloadUrl => {
+            window.location.href = downloadUrl;
+        })
+        .catch(error => showNotification('PDF download failed: ' + error.message, 'error'))
+        .finally(() => {
+            button.disabled = false;
+        });
+}
+
+function waitForRender(queued) {
+    // Polls /render_jobs/<id> until the PDF is ready; resolves with its download URL
+    return new Promise((resolve, reject) => {
+        const poll = () => {
+            fetch(queued.status_url)
+                .then(response => response.json())
+                .then(data => {
+                    if (!data.success) {
+                        throw new Error(data.message);
+                    }
+                    if (data.job.state === 'done') {
+                        resolve(queued.download_url);
+                    } else if (data.job.state === 'failed') {
+                        reject(new Error(data.job.error));
+                    } else {
+                        setTimeout(poll, JOB_POLL_INTERVAL);
+                    }
+                })
+                .catch(reject);
+        };
+        poll();
+    });
+}
+
+function exportData(event) {
+    // Same export as the plain link, written by a background job and then downloaded
+    event.preventDefault();
+    const url = event.currentTarget.href;
+    postJob(url)
+        .then(queued => trackJob(queued, 'Exporting data'))
+        .then(job => {
+            window.location.href = job.download_url;
+        })
+        .catch(error => showNotification('Export failed: ' + error.message, 'error'));
+}
+
 // Enhanced Analytics Functions for Dashboard
 function initializeAnalytics() {
     loadPerformanceMetrics();
@@ -882,53 +1118,40 @@ function loadPerformanceMetrics() {
         .then(response => response.json())
         .then(data => {
             if (data.success) {
-                displayPerformanceMetrics(data.metrics);
+                displayPerformanceMetrics(data.metrics, data.legend);
             }
         })
         .catch(error => console.error('Error loading performance metrics:', error));
 }
 
-function displayPerformanceMetrics(metrics) {
+function displayPerformanceMetrics(metrics, legend) {
     const metricsContainer = document.querySelector('.performance-metrics');
-    if (!metricsContainer) return;
+    if (!metricsContainer || !legend) return;
     
-    metricsContainer.innerHTML = `
-        <div class="metric-card excellent">
-            <div class="metric-header">
-                <span class="metric-title">Excellent (A+/A)</span>
-                <span class="metric-icon">🏆</span>
-            </div>
-            <div class="metric-value">${metrics.excellent || 0}</div>
-            <div class="metric-description">Students with 85%+ marks</div>
-        </div>
-        
-        <div class="metric-card good">
-            <div class="metric-header">
-                <span class="metric-title">Good (B+/B)</span>
-                <span class="metric-icon">👍</span>
-            </div>
-            <div class="metric-value">${metrics.good || 0}</div>
-            <div class="metric-description">Students with 70-84% marks</div>
-        </div>
-        
-        <div class="metric-card average">
-            <div class="metric-header">
-                <span class="metric-title">Average (C)</span>
-                <span class="metric-icon">📊</span>
-            </div>
-            <div class="metric-value">${metrics.average || 0}</div>
-            <div class="metric-description">Students with 55-69% marks</div>
-        </div>
-        
-        <div class="metric-card poor">
-            <div class="metric-header">
-                <span class="metric-title">Needs Improvement</span>
-                <span class="metric-icon">📈</span>
-            </div>
-            <div class="metric-value">${metrics.poor || 0}</div>
-            <div class="metric-description">Students below 55% marks</div>
-        </div>
-    `;
+    // The bands (label, range) come from the server with the counts
+    metricsContainer.innerHTML = '';
+    legend.forEach(band => {
+        metricsContainer.appendChild(createStatCard(band.label, metrics[band.key] || 0,
+                                                    `Students with ${band.range} marks`, band.key));
+    });
+}
+
+function createStatCard(icon, value, description, className) {
+    // Same markup as the server-rendered stat cards on the dashboard
+    const card = document.createElement('div');
+    card.className = `stat-card ${className || ''}`.trim();
+    const iconElement = document.createElement('div');
+    iconElement.className = 'stat-icon';
+    iconElement.textContent = icon;
+    const info = document.createElement('div');
+    info.className = 'stat-info';
+    const valueElement = document.createElement('h3');
+    valueElement.textContent = value;
+    const descriptionElement = document.createElement('p');
+    descriptionElement.textContent = description;
+    info.append(valueElement, descriptionElement);
+    card.append(iconElement, info);
+    return card;
 }
 
 function loadTopPerformers() {
@@ -1046,7 +1269,7 @@ function showAtRiskStudents() {
         .then(response => response.json())
         .then(data => {
             if (data.success && data.students.length > 0) {
-                displayAtRiskStudents(data.students);
+                displayAtRiskStudents(data.students, data.next_cursor);
             } else {
                 alert('No at-risk students found or unable to fetch data.');
             }
@@ -1057,7 +1280,22 @@ function showAtRiskStudents() {
         });
 }
 
-function displayAtRiskStudents(students) {
+function renderAtRiskItems(students) {
+    return students.map(student => `
+        <div class="student-item">
+            <div class="student-info">
+                <h4>${student.name}</h4>
+                <p>Roll: ${student.roll_no} | Branch: ${student.branch}</p>
+                <p>Semester: ${student.semester} | Exam: ${student.exam_type}</p>
+            </div>
+            <div class="student-score danger">
+                ${student.percentage}%
+            </div>
+        </div>
+    `).join('');
+}
+
+function displayAtRiskStudents(students, nextCursor) {
     const modal = document.createElement('div');
     modal.className = 'modal-overlay';
     modal.innerHTML = `
@@ -1068,20 +1306,10 @@ function displayAtRiskStudents(students) {
             </div>
             <div class="modal-body">
                 <div class="students-list">
-                    ${students.map(student => `
-                        <div class="student-item">
-                            <div class="student-info">
-                                <h4>${student.name}</h4>
-                                <p>Roll: ${student.roll_no} | Branch: ${student.branch}</p>
-                                <p>Semester: ${student.semester} | Exam: ${student.exam_type}</p>
-                            </div>
-                            <div class="student-score danger">
-                                ${student.percentage}%
-                            </div>
-                        </div>
-                    `).join('')}
+                    ${renderAtRiskItems(students)}
                 </div>
                 <div class="modal-actions">
+                    <button class="btn-secondary load-more">Load More</button>
                     <button class="btn-primary" onclick="exportAtRiskData()">Export List</button>
                     <button class="btn-secondary" onclick="this.closest('.modal-overlay').remove()">Close</button>
                 </div>
@@ -1089,6 +1317,24 @@ function displayAtRiskStudents(students) {
         </div>
     `;
     document.body.appendChild(modal);
+    
+    // Further pages are fetched on demand with the cursor from the previous page
+    const list = modal.querySelector('.students-list');
+    const loadMore = modal.querySelector('.load-more');
+    loadMore.style.display = nextCursor ? '' : 'none';
+    loadMore.addEventListener('click', function() {
+        loadMore.disabled = true;
+        fetch('/api/at_risk_students?after=' + encodeURIComponent(nextCursor))
+            .then(response => response.json())
+            .then(data => {
+                if (!data.success) throw new Error(data.message);
+                list.insertAdjacentHTML('beforeend', renderAtRiskItems(data.students));
+                nextCursor = data.next_cursor;
+                loadMore.style.display = nextCursor ? '' : 'none';
+            })
+            .catch(error => console.error('Error fetching at-risk students:', error))
+            .finally(() => { loadMore.disabled = false; });
+    });
 }
 
 function analyzePerformance() {
@@ -1106,7 +1352,8 @@ function generateCertificates() {
         .then(response => response.json())
         .then(data => {
             if (data.success && data.students.length > 0) {
-                const confirmed = confirm(`Generate certificates for ${data.students.length} star performers?`);
+                const count = data.students.length + (data.next_cursor ? '+' : '');
+                const confirmed = confirm(`Generate certificates for ${count} star performers?`);
                 if (confirmed) {
                     // Implement certificate generation logic
                     alert('Certificate generation feature will be implemented soon!');
@@ -1126,30 +1373,25 @@ function exportAtRiskData() {
 }
 
 // Enhanced Analytics with Grade Distribution
-function updateGradeDistribution(distribution) {
+function updateGradeDistribution(distribution, legend) {
     const container = document.querySelector('.grade-cards-grid');
-    if (!container || !distribution) return;
-    
-    const grades = [
-        { key: 'a_plus', name: 'A+', range: '90-100%', icon: '🌟', color: 'excellent' },
-        { key: 'a_grade', name: 'A', range: '85-89%', icon: '⭐', color: 'very-good' },
-        { key: 'b_plus', name: 'B+', range: '75-84%', icon: '👍', color: 'good' },
-        { key: 'b_grade', name: 'B', range: '65-74%', icon: '📈', color: 'average' },
-        { key: 'c_grade', name: 'C', range: '55-64%', icon: '📊', color: 'below-average' },
-        { key: 'd_grade', name: 'D', range: '40-54%', icon: '⚠️', color: 'poor' },
-        { key: 'f_grade', name: 'F', range: '0-39%', icon: '❌', color: 'fail' }
-    ];
-    
-    // Animate grade cards
-    grades.forEach((grade, index) => {
+    if (!container || !distribution || !legend) return;
+    
+    // The legend comes from the server's grading scheme: [{key, grade, range}], highest grade first
+    container.innerHTML = '';
+    legend.forEach((entry, index) => {
+        const count = distribution[entry.key] || 0;
+        const share = distribution.total ? (count * 100 / distribution.total).toFixed(1) : '0.0';
+        const color = index === 0 ? 'success' : (index === legend.length - 1 ? 'danger' : '');
+        const card = createStatCard(entry.grade, count, `${entry.range} · ${share}%`, `grade-card ${color}`);
+        container.appendChild(card);
+        
+        // Animate grade cards
         setTimeout(() => {
-            const card = container.querySelector(`.grade-card.${grade.color}`);
-            if (card) {
-                card.style.transform = 'translateY(-5px)';
-                setTimeout(() => {
-                    card.style.transform = 'translateY(0)';
-                }, 200);
-            }
+            card.style.transform = 'translateY(-5px)';
+            setTimeout(() => {
+                card.style.transform = 'translateY(0)';
+            }, 200);
         }, index * 100);
     });
 }
@@ -1170,8 +1412,8 @@ function refreshDashboardData() {
     .then(responses => Promise.all(responses.map(r => r.json())))
     .then(([metrics, distribution, semesters]) => {
         // Update dashboard with new data
-        if (metrics.success) displayPerformanceMetrics(metrics.data);
-        if (distribution.success) updateGradeDistribution(distribution.data);
+        if (metrics.success) displayPerformanceMetrics(metrics.metrics, metrics.legend);
+        if (distribution.success) updateGradeDistribution(distribution.data, distribution.legend);
         if (semesters.success) updateSemesterStats(semesters.data);
     })
     .catch(error => {
@@ -1199,7 +1441,9 @@ function updateSemesterStats(stats) {
 }
 
 // Auto-refresh dashboard every 5 minutes
-setInterval(refreshDashboardData, 300000);
+if (document.getElementById('chart-data')) {
+    setInterval(refreshDashboardData, 300000);
+}
 
 // Add CSS animations
 const style = document.createElement('style');
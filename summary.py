@@ -0,0 +1,182 @@
+"""
+Materialized per-class summary of student results
+
+student_summary holds one row per (branch, semester, exam_type) with the
+count, sum, min and max of percentages plus every counter the dashboard
+shows. Writers update it in the same transaction as the students they
+insert, so analytics read O(classes) rows instead of scanning students.
+
+rebuild_summary() recomputes the whole table from students, for drift
+repair and for databases created before the table existed.
+
+Grade buckets, the pass mark and the star cut-off come from the active
+grading scheme (grading.py), so the dashboard counts the same grades that
+are printed on the marksheets.
+"""
+
+import re
+
+from grading import SCHEME, sql_string
+
+
+def bucket_key(grade):
+    """Counter column for a grade: 'A+' -> a_plus, 'B' -> b_grade"""
+    key = re.sub(r'\W', '', grade.lower().replace('+', '_plus'))
+    return key if grade.endswith('+') else f'{key}_grade'
+
+
+# Dashboard grade buckets, one per grade: (key, lower bound inclusive, upper bound exclusive)
+GRADE_BUCKETS = [(bucket_key(grade), lower, upper) for grade, lower, upper in SCHEME.buckets()]
+
+
+def range_label(lower, upper):
+    """'80-90%' for [80, 90); the top and bottom buckets run to 100 and from 0"""
+    return f"{lower or 0:g}-{100 if upper is None else upper:g}%"
+
+
+# What the dashboard prints on each grade card, highest grade first
+GRADE_LEGEND = [{'key': bucket_key(grade), 'grade': grade, 'range': range_label(lower, upper)}
+                for grade, lower, upper in SCHEME.buckets()]
+
+# /api/performance_metrics buckets. These are percentage bands, not grades:
+# the grading scheme decides which grades they span.
+PERFORMANCE_BUCKETS = [
+    ('excellent', 85, None),
+    ('good', 70, 85),
+    ('average', 55, 70),
+    ('poor', None, 55),
+]
+
+PERFORMANCE_LABELS = {'excellent': 'Excellent', 'good': 'Good', 'average': 'Average', 'poor': 'Needs Improvement'}
+
+PERFORMANCE_LEGEND = [{'key': key, 'label': PERFORMANCE_LABELS[key], 'range': range_label(lower, upper)}
+                      for key, lower, upper in PERFORMANCE_BUCKETS]
+
+AT_RISK_BELOW = SCHEME.pass_mark
+STAR_FROM = SCHEME.top_mark
+
+COUNTER_KEYS = ['passed', 'at_risk', 'star'] + [key for key, _, _ in GRADE_BUCKETS + PERFORMANCE_BUCKETS]
+
+SUMMARY_COLUMNS = ['student_count', 'sum_percentage', 'min_percentage', 'max_percentage'] + COUNTER_KEYS
+
+SUMMARY_TABLE_DDL = f'''
+    CREATE TABLE IF NOT EXISTS student_summary (
+        branch VARCHAR(100) NOT NULL,
+        semester VARCHAR(20) NOT NULL,
+        exam_type VARCHAR(50) NOT NULL,
+        student_count INT NOT NULL DEFAULT 0,
+        sum_percentage DECIMAL(14,2) NOT NULL DEFAULT 0,
+        min_percentage DECIMAL(5,2),
+        max_percentage DECIMAL(5,2),
+        {', '.join(f'{key} INT NOT NULL DEFAULT 0' for key in COUNTER_KEYS)},
+        PRIMARY KEY (branch, semester, exam_type)
+    )
+'''
+
+_ADDITIVE = ['student_count', 'sum_percentage'] + COUNTER_KEYS
+
+SUMMARY_UPSERT = f'''
+    INSERT INTO student_summary (branch, semester, exam_type, {', '.join(SUMMARY_COLUMNS)})
+    VALUES ({', '.join(['%s'] * (3 + len(SUMMARY_COLUMNS)))})
+    ON DUPLICATE KEY UPDATE
+        {', '.join(f'{column} = {column} + VALUES({column})' for column in _ADDITIVE)},
+        min_percentage = LEAST(COALESCE(min_percentage, VALUES(min_percentage)), VALUES(min_percentage)),
+        max_percentage = GREATEST(COALESCE(max_percentage, VALUES(max_percentage)), VALUES(max_percentage))
+'''
+
+
+def bucket_sql(key, lower, upper):
+    """SUM(...) counting students whose percentage falls in [lower, upper)"""
+    conditions = []
+    if lower is not None:
+        conditions.append(f'percentage >= {lower:g}')
+    if upper is not None:
+        conditions.append(f'percentage < {upper:g}')
+    return f"SUM(CASE WHEN {' AND '.join(conditions)} THEN 1 ELSE 0 END) AS {key}"
+
+
+REBUILD_SELECT = f'''
+    SELECT branch, semester, exam_type,
+           COUNT(*), SUM(percentage), MIN(percentage), MAX(percentage),
+           SUM(CASE WHEN grade != {sql_string(SCHEME.failing_grade)} THEN 1 ELSE 0 END) AS passed,
+           SUM(CASE WHEN percentage < {AT_RISK_BELOW:g} THEN 1 ELSE 0 END) AS at_risk,
+           SUM(CASE WHEN percentage >= {STAR_FROM:g} THEN 1 ELSE 0 END) AS star,
+           {', '.join(bucket_sql(*bucket) for bucket in GRADE_BUCKETS + PERFORMANCE_BUCKETS)}
+    FROM students
+    GROUP BY branch, semester, exam_type
+'''
+
+REBUILD_QUERY = f'''
+    INSERT INTO student_summary (branch, semester, exam_type, {', '.join(SUMMARY_COLUMNS)}){REBUILD_SELECT}'''
+
+
+def _in_bucket(percentage, lower, upper):
+    return (lower is None or percentage >= lower) and (upper is None or percentage < upper)
+
+
+def summary_rows(students):
+    """Aggregate (branch, semester, exam_type, percentage, grade) tuples into upsert rows"""
+    groups = {}
+    for branch, semester, exam_type, percentage, grade in students:
+        # Match the DECIMAL(5,2) value stored in students
+        percentage = round(float(percentage), 2)
+        counters = {
+            'passed': grade != SCHEME.failing_grade,
+            'at_risk': percentage < AT_RISK_BELOW,
+            'star': percentage >= STAR_FROM,
+        }
+        for key, lower, upper in GRADE_BUCKETS + PERFORMANCE_BUCKETS:
+            counters[key] = _in_bucket(percentage, lower, upper)
+
+        group = groups.get((branch, semester, exam_type))
+        if group is None:
+            group = groups[(branch, semester, exam_type)] = dict.fromkeys(_ADDITIVE, 0)
+            group['min_percentage'] = group['max_percentage'] = percentage
+        group['student_count'] += 1
+        group['sum_percentage'] += percentage
+        group['min_percentage'] = min(group['min_percentage'], percentage)
+        group['max_percentage'] = max(group['max_percentage'], percentage)
+        for key in COUNTER_KEYS:
+            group[key] += int(counters[key])
+
+    return [key + tuple(round(group[column], 2) if column == 'sum_percentage' else group[column]
+                        for column in SUMMARY_COLUMNS)
+            for key, group in groups.items()]
+
+
+def record_students(cursor, students):
+    """Add newly inserted students to the summary. Call before the insert is committed."""
+    rows = summary_rows(students)
+    if rows:
+        cursor.executemany(SUMMARY_UPSERT, rows)
+
+
+def clear_summary(cursor):
+    cursor.execute('DELETE FROM student_summary')
+
+
+def summary_matches_scheme(cursor):
+    """True if student_summary has a counter column for every grade of the active scheme"""
+    cursor.execute('SHOW COLUMNS FROM student_summary')
+    return [row[0] for row in cursor.fetchall()][3:] == SUMMARY_COLUMNS
+
+
+def rebuild_summary(connection):
+    """Recompute student_summary from students in one transaction; returns the number of classes"""
+    cursor = connection.cursor()
+    try:
+        cursor.execute(SUMMARY_TABLE_DDL)
+        if not summary_matches_scheme(cursor):
+            # The grading scheme's grades changed; DDL commits, so the table is briefly empty
+            cursor.execute('DROP TABLE student_summary')
+            cursor.execute(SUMMARY_TABLE_DDL)
+        clear_summary(cursor)
+        cursor.execute(REBUILD_QUERY)
+        classes = cursor.rowcount
+        connection.commit()
+        return classes
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
@@ -0,0 +1,159 @@
+"""
+Read-through cache for public verification lookups
+
+/verify and /verify/<id> are unauthenticated and arrive in bursts (QR scans
+right after results are published, institutions checking whole batches).
+Lookups are cached as plain payloads ({'student': ..., 'subjects': [...]},
+or None for "no such result") keyed by roll number or id:
+
+- an in-process LRU of VERIFY_CACHE_SIZE entries, and
+- optionally a SQLite file shared by every gunicorn worker on the host
+  (VERIFY_CACHE_SHARED_PATH), checked before going to MySQL.
+
+Entries are tagged with the shared data version, so any marksheet write or
+clear makes every cached lookup stale in all workers at once.
+"""
+
+import os
+import json
+import sqlite3
+import datetime
+import decimal
+import threading
+from collections import OrderedDict
+
+
+def verification_payload(student, subjects):
+    """Normalize DB rows into the cached form (JSON-safe apart from datetimes)"""
+    if not student:
+        return None
+    student = {key: float(value) if isinstance(value, decimal.Decimal) else value
+               for key, value in student.items()}
+    return {'student': student, 'subjects': [dict(subject) for subject in subjects]}
+
+
+def _dumps(payload):
+    def default(value):
+        if isinstance(value, datetime.datetime):
+            return {'__datetime__': value.isoformat()}
+        return str(value)
+    return json.dumps(payload, default=default)
+
+
+def _loads(text):
+    def hook(obj):
+        if '__datetime__' in obj:
+            return datetime.datetime.fromisoformat(obj['__datetime__'])
+        return obj
+    return json.loads(text, object_hook=hook)
+
+
+class SharedTier:
+    """SQLite table of (key, data version, payload) shared across worker processes"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._pruned_version = None
+        self._connect().execute('''
+            CREATE TABLE IF NOT EXISTS verify_cache (
+                key TEXT PRIMARY KEY,
+                version INTEGER NOT NULL,
+                payload TEXT NOT NULL
+            )
+        ''')
+
+    def _connect(self):
+        # sqlite3 connections must not cross threads or a fork
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def get(self, key, version):
+        """Return (found, payload)"""
+        row = self._connect().execute(
+            'SELECT payload FROM verify_cache WHERE key = ? AND version = ?', (key, version)).fetchone()
+        return (True, _loads(row[0])) if row else (False, None)
+
+    def put(self, key, version, payload):
+        conn = self._connect()
+        if self._pruned_version != version:
+            conn.execute('DELETE FROM verify_cache WHERE version != ?', (version,))
+            self._pruned_version = version
+        conn.execute('INSERT OR REPLACE INTO verify_cache (key, version, payload) VALUES (?, ?, ?)',
+                     (key, version, _dumps(payload)))
+
+
+class VerifyCache:
+    """LRU of verification payloads in front of an optional SharedTier"""
+
+    def __init__(self, data_version, max_entries, shared_path=None):
+        self.data_version = data_version
+        self.max_entries = max_entries
+        self.shared = SharedTier(shared_path) if shared_path else None
+        self._entries = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'shared_hits': 0, 'misses': 0}
+
+    def lookup(self, key, load):
+        """Return the payload for `key`, calling `load()` (and caching its result) on a miss.
+
+        Exceptions from load() propagate and nothing is cached.
+        """
+        version = self.data_version.current()
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+                self._version = version
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._stats['hits'] += 1
+                return self._entries[key]
+
+        if self.shared:
+            try:
+                found, payload = self.shared.get(key, version)
+            except sqlite3.Error as e:
+                print(f"Verify cache error: {e}")
+                found = False
+            if found:
+                self._count('shared_hits')
+                self._remember(key, payload, version)
+                return payload
+
+        self._count('misses')
+        payload = load()
+        self._remember(key, payload, version)
+        if self.shared:
+            try:
+                self.shared.put(key, version, payload)
+            except sqlite3.Error as e:
+                print(f"Verify cache error: {e}")
+        return payload
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats, entries=len(self._entries), max_entries=self.max_entries,
+                         shared=bool(self.shared))
+        lookups = stats['hits'] + stats['shared_hits'] + stats['misses']
+        stats['hit_rate'] = round((stats['hits'] + stats['shared_hits']) / lookups, 4) if lookups else None
+        return stats
+
+    def _count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def _remember(self, key, payload, version):
+        with self._lock:
+            # A write may have landed while we were loading; don't cache under the new version
+            if version != self._version:
+                return
+            self._entries[key] = payload
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)